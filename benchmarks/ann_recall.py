@@ -0,0 +1,92 @@
+"""
+Recall and latency of the RAG search index backends against exact search.
+
+Runs offline on synthetic clustered embeddings (no API calls). The clusters
+overlap and queries fall between them, so an approximate index must probe
+several lists to find every neighbour and recall rises with n_probe:
+
+    python benchmarks/ann_recall.py --rows 200000 --dim 256 --k 10
+
+For each backend configuration it reports build time, mean query latency and
+recall@k relative to the flat (exact) index.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'phase_1'))
+
+from workflow_agents.vector_index import FlatIndex, IVFIndex, recall_at_k
+from workflow_agents.vector_store import VectorStore
+
+
+def synthetic_embeddings(rows, dim, clusters, spread, seed):
+    """
+    Vectors scattered around random cluster centres, like topical document chunks.
+
+    ``spread`` is the scale of the noise relative to that of the centres; at the default 2.0
+    the clusters overlap, so the nearest neighbours of a vector are often in other clusters.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=rows)
+    vectors = centres[labels] + spread * rng.standard_normal((rows, dim)).astype(np.float32)
+    return vectors, centres
+
+
+def synthetic_queries(centres, count, spread, seed):
+    """Queries between two random cluster centres plus noise, so their neighbours span several clusters."""
+    rng = np.random.default_rng(seed)
+    first, second = rng.integers(0, len(centres), size=(2, count))
+    weights = rng.random((count, 1)).astype(np.float32)
+    queries = weights * centres[first] + (1 - weights) * centres[second]
+    return queries + spread * rng.standard_normal(queries.shape).astype(np.float32)
+
+
+def time_queries(index, queries, k):
+    """Return the mean search latency in milliseconds."""
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, k=k)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=2.0, help="noise scale relative to the cluster centres")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors, centres = synthetic_embeddings(args.rows, args.dim, args.clusters, args.spread, args.seed)
+    store = VectorStore.from_embeddings(vectors, [{"text": ""} for _ in range(args.rows)])
+    queries = synthetic_queries(centres, args.queries, args.spread, args.seed + 1)
+
+    exact = FlatIndex().build(store)
+    print(f"{args.rows} rows x {args.dim} dims, {args.queries} queries, k={args.k}")
+    print(f"{'backend':<28}{'build s':>10}{'query ms':>12}{'recall@k':>12}")
+    print(f"{'flat':<28}{0.0:>10.2f}{time_queries(exact, queries, args.k):>12.3f}{1.0:>12.3f}")
+
+    start = time.perf_counter()
+    ivf = IVFIndex(n_lists=args.n_lists, seed=args.seed).build(store)
+    build_seconds = time.perf_counter() - start
+    for n_probe in args.n_probe:
+        ivf.n_probe = n_probe
+        latency = time_queries(ivf, queries, args.k)
+        recall = recall_at_k(ivf, exact, queries, k=args.k)
+        label = f"ivf n_lists={len(ivf.lists)} n_probe={n_probe}"
+        print(f"{label:<28}{build_seconds:>10.2f}{latency:>12.3f}{recall:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+End-to-end benchmarks of routing, RAG and the phase 2 workflow against a local fake OpenAI server.
+
+Every API call goes over HTTP to ``tests/fake_openai.py`` (no network, no API
+credits), with configurable latency, token throughput and rate limiting:
+
+    python benchmarks/end_to_end.py --latency lognormal:0.05,0.3 --tokens-per-second 400
+    python benchmarks/end_to_end.py --only routing rag --routes 3 30 300 --rag-kb 64 512
+    python benchmarks/end_to_end.py --compare benchmarks/results/end_to_end-<commit>.json
+
+Each benchmark runs at several scales. Results, with the commit and server
+settings, are written as JSON to ``--output`` so runs can be compared across
+commits; ``--compare`` prints the change of every timing against an earlier file.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src', 'phase_1'))
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from fake_openai import FakeOpenAIServer, filler_text, parse_latency, request_text
+from workflow_agents.base_agents import RAGKnowledgePromptAgent, RoutingAgent
+from workflow_agents.clients import close_shared_clients
+from workflow_agents.embedding_cache import configure_embedding_cache
+
+
+API_KEY = "fake-benchmark-key"
+
+# Worker answers that pass the structural checks of each workflow evaluator
+WORKER_ANSWERS = {
+    "Product Manager": "As a support agent, I want incoming emails routed automatically so that I can answer customers faster.",
+    "Program Manager": (
+        "Feature Name: Automatic email routing\nDescription: Routes each incoming email to the right team.\n"
+        "Key Functionality: Classification and assignment rules.\nUser Benefit: Faster first responses."
+    ),
+    "Development Engineer": (
+        "Task ID: T-1\nTask Title: Build the email classifier\nRelated User Story: Automatic routing\n"
+        "Description: Classify incoming emails by topic.\nAcceptance Criteria: 90% of emails reach the right team.\n"
+        "Estimated Effort: 3 days\nDependencies: None"
+    ),
+}
+STEP_KINDS = [
+    ("user stories", "Define the user stories for the product"),
+    ("features", "Group the user stories into product features"),
+    ("tasks", "Define the development tasks for the product features"),
+]
+
+
+def workflow_responder(plan_steps, answer_tokens):
+    """
+    Return a responder driving the workflow: a plan of ``plan_steps`` steps, accepting
+    verdicts, and worker answers that pass the evaluators' local checks.
+
+    The plan is made of independent areas, each a chain of stories -> features -> tasks.
+    """
+    def respond(request):
+        text = request_text(request)
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            if '"steps"' in text:
+                steps = []
+                for index in range(plan_steps):
+                    area, position = divmod(index, len(STEP_KINDS))
+                    artifact, description = STEP_KINDS[position]
+                    first = area * len(STEP_KINDS) + 1
+                    steps.append({
+                        "id": str(index + 1),
+                        "text": f"{description} (area {area + 1})",
+                        "depends_on": [str(step_id) for step_id in range(first, index + 1)],
+                        "artifact": f"{artifact} {area + 1}",
+                    })
+                return json.dumps({"steps": steps})
+            return json.dumps({"verdict": "Yes", "reasons": "The answer meets the criteria.", "instructions": ""})
+        for role, answer in WORKER_ANSWERS.items():
+            if f"You are a {role}" in text:
+                return f"{answer}\n\n{filler_text(text, answer_tokens)}"
+        return filler_text(text, answer_tokens)
+    return respond
+
+
+def timed(func, *args):
+    """Return (result, seconds) of a call."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def server_counts(server, before):
+    """Return the server's request and token counters accumulated since ``before``."""
+    return {name: value - before.get(name, 0) for name, value in server.stats.items()}
+
+
+def bench_routing(server, routes, queries):
+    """Time routing with ``routes`` routes: the first (cold) route embeds every description."""
+    configure_embedding_cache(path=None)
+    before = dict(server.stats)
+    router = RoutingAgent(API_KEY, [
+        {"name": f"route {i}", "description": filler_text(f"route {i}", 24), "func": lambda prompt: prompt}
+        for i in range(routes)
+    ])
+    _, cold_seconds = timed(router.route, "first question about the product")
+    start = time.perf_counter()
+    for i in range(queries):
+        router.route(f"question {i} about the {filler_text(str(i), 8)}")
+    warm_ms = (time.perf_counter() - start) * 1000 / queries
+    return {"cold_route_seconds": cold_seconds, "route_ms": warm_ms, **server_counts(server, before)}
+
+
+def bench_rag(server, kilobytes, queries, workdir):
+    """Time chunking and embedding ``kilobytes`` KB of knowledge, then RAG queries against it."""
+    configure_embedding_cache(path=None)
+    before = dict(server.stats)
+    paragraphs, size = [], 0
+    while size < kilobytes * 1024:
+        paragraph = f"Section {len(paragraphs)}. " + filler_text(f"paragraph {len(paragraphs)}", 120)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    agent = RAGKnowledgePromptAgent(API_KEY, "You are a helpful assistant.", index_name=f"bench-{kilobytes}kb",
+                                    index_dir=workdir)
+    chunks, chunk_seconds = timed(agent.chunk_text, "\n\n".join(paragraphs))
+    _, embed_seconds = timed(agent.calculate_embeddings)
+    start = time.perf_counter()
+    for i in range(queries):
+        agent.find_prompt_in_knowledge(f"What does section {i} say about the {filler_text(str(i), 6)}?")
+    query_ms = (time.perf_counter() - start) * 1000 / queries
+    return {"chunks": len(chunks), "chunk_seconds": chunk_seconds, "index_seconds": embed_seconds,
+            "query_ms": query_ms, **server_counts(server, before)}
+
+
+def bench_workflow(server, plan_steps, answer_tokens, timeout):
+    """Run ``src/phase_2/agentic_workflow.py`` end to end with a plan of ``plan_steps`` steps."""
+    server.responder = workflow_responder(plan_steps, answer_tokens)
+    before = dict(server.stats)
+    with tempfile.TemporaryDirectory() as workdir:
+        trace_path = os.path.join(workdir, "trace.jsonl")
+        env = dict(os.environ, OPENAI_API_KEY=API_KEY, OPENAI_BASE_URL=server.base_url, TRACE_PATH=trace_path,
+                   LOG_LEVEL="WARNING", STREAM_OUTPUT="0", EMBEDDING_CACHE_PATH="",
+                   WORKFLOW_RUNS_DIR=os.path.join(workdir, "runs"))
+        env.pop("COMPLETION_CACHE_PATH", None)
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "agentic_workflow.py"], cwd=os.path.join(ROOT, "src", "phase_2"), env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=timeout,
+        )
+        seconds = time.perf_counter() - start
+        if completed.returncode != 0:
+            raise RuntimeError(f"agentic_workflow.py failed:\n{completed.stderr[-2000:]}")
+        with open(trace_path, encoding="utf-8") as trace_file:
+            spans = [json.loads(line) for line in trace_file]
+    server.responder = None
+    step_seconds = [span["duration_seconds"] for span in spans if span["kind"] == "step"]
+    return {"seconds": seconds, "steps": len(step_seconds), "longest_step_seconds": max(step_seconds, default=0.0),
+            **server_counts(server, before)}
+
+
+def git_commit():
+    """Return the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print how each timing changed relative to an earlier results file."""
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    previous = {(r["benchmark"], json.dumps(r["scale"], sort_keys=True)): r["metrics"] for r in baseline["results"]}
+    print(f"\nCompared with {baseline.get('commit') or baseline_path}:")
+    print(f"{'benchmark':<30}{'metric':<22}{'before':>12}{'after':>12}{'change':>10}")
+    for result in results:
+        old = previous.get((result["benchmark"], json.dumps(result["scale"], sort_keys=True)))
+        if old is None:
+            continue
+        label = f"{result['benchmark']} {json.dumps(result['scale'])}"
+        for metric, value in result["metrics"].items():
+            if not (metric.endswith("seconds") or metric.endswith("_ms")) or not old.get(metric):
+                continue
+            change = (value - old[metric]) / old[metric]
+            print(f"{label[:30]:<30}{metric:<22}{old[metric]:>12.3f}{value:>12.3f}{change:>+10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=["routing", "rag", "workflow"], default=["routing", "rag", "workflow"])
+    parser.add_argument("--latency", default="lognormal:0.05,0.3",
+                        help="per-request latency: SECONDS, fixed:S, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--tokens-per-second", type=float, default=400)
+    parser.add_argument("--completion-tokens", type=int, default=128)
+    parser.add_argument("--rate-limit-every", type=int, default=None)
+    parser.add_argument("--routes", type=int, nargs="+", default=[3, 30, 300])
+    parser.add_argument("--route-queries", type=int, default=20)
+    parser.add_argument("--rag-kb", type=int, nargs="+", default=[64, 512])
+    parser.add_argument("--rag-queries", type=int, default=10)
+    parser.add_argument("--plan-steps", type=int, nargs="+", default=[3, 9])
+    parser.add_argument("--workflow-timeout", type=float, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None,
+                        help="results file. Defaults to benchmarks/results/end_to_end-<commit>.json")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    server = FakeOpenAIServer(latency=parse_latency(args.latency), tokens_per_second=args.tokens_per_second,
+                              completion_tokens=args.completion_tokens, rate_limit_every=args.rate_limit_every,
+                              seed=args.seed)
+    results = []
+    with server, tempfile.TemporaryDirectory() as workdir:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        runs = []
+        if "routing" in args.only:
+            runs += [("routing", {"routes": n}, lambda n=n: bench_routing(server, n, args.route_queries)) for n in args.routes]
+        if "rag" in args.only:
+            runs += [("rag", {"kb": kb}, lambda kb=kb: bench_rag(server, kb, args.rag_queries, workdir)) for kb in args.rag_kb]
+        if "workflow" in args.only:
+            runs += [("workflow", {"plan_steps": n},
+                      lambda n=n: bench_workflow(server, n, args.completion_tokens, args.workflow_timeout))
+                     for n in args.plan_steps]
+        for name, scale, run in runs:
+            metrics = run()
+            close_shared_clients()
+            results.append({"benchmark": name, "scale": scale, "metrics": metrics})
+            summary = ", ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                                for key, value in metrics.items())
+            print(f"{name} {json.dumps(scale)}: {summary}")
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"end_to_end-{(commit or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as output_file:
+        json.dump({
+            "commit": commit,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "server": {"latency": args.latency, "tokens_per_second": args.tokens_per_second,
+                       "completion_tokens": args.completion_tokens, "rate_limit_every": args.rate_limit_every,
+                       "seed": args.seed},
+            "results": results,
+        }, output_file, indent=2)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
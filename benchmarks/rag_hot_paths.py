@@ -0,0 +1,227 @@
+"""
+CPU microbenchmarks of the RAG retrieval engine's local hot paths.
+
+Runs offline on a synthetic corpus and random embeddings (no API calls):
+
+    python benchmarks/rag_hot_paths.py --chunks 1000 10000 100000
+    python benchmarks/rag_hot_paths.py --chunks 1000000 --dtype float16 --chunk-size 500
+    python benchmarks/rag_hot_paths.py --compare benchmarks/results/rag_hot_paths-<commit>.json
+
+For each corpus size it times every local stage of ``RAGKnowledgePromptAgent``:
+chunking into the chunks CSV, reading the CSV back, building the vector store,
+saving it, loading it (memory-mapped and fully read), building the search index,
+top-k search, and the pairwise ``calculate_similarity``. It reports per-stage
+seconds, throughput and the peak RSS after each stage. Every size runs in its own
+process, so peak RSS is per size. At 3072 dimensions a float32 store takes
+12 KB per chunk, i.e. about 12 GB at 1M chunks (half with ``--dtype float16``).
+Results are written as JSON for comparison across commits.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'phase_1'))
+
+from workflow_agents.base_agents import RAGKnowledgePromptAgent
+from workflow_agents.chunking import READ_BLOCK_SIZE
+from workflow_agents.vector_index import FlatIndex
+from workflow_agents.vector_store import VectorStore, reindex, store_paths
+
+from end_to_end import compare, git_commit
+
+
+WORDS = ("email", "router", "customer", "support", "ticket", "priority", "response", "team", "agent", "queue",
+         "classification", "escalation", "workflow", "feature", "story", "task", "latency", "message", "rule", "model")
+
+
+def peak_rss_mb():
+    """Return the process's peak resident set size so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def corpus_blocks(chars, seed):
+    """Yield about ``chars`` characters of synthetic prose in READ_BLOCK_SIZE blocks, with no repeated sections."""
+    rng = np.random.default_rng(seed)
+    sentences = [" ".join(rng.choice(WORDS, size=rng.integers(8, 20))).capitalize() + "." for _ in range(512)]
+    emitted = 0
+    section = 0
+    while emitted < chars:
+        parts = []
+        size = 0
+        while size < min(READ_BLOCK_SIZE, chars - emitted):
+            # Numbered sections keep every chunk distinct, as the store keeps one row per unique chunk
+            paragraph = f"Section {section}. " + " ".join(sentences[(section * 7 + i) % len(sentences)] for i in range(6))
+            parts.append(paragraph + "\n\n")
+            size += len(paragraph) + 2
+            section += 1
+        block = "".join(parts)[:chars - emitted]
+        emitted += len(block)
+        yield block
+
+
+def run_scale(chunks, dim, dtype, chunk_size, queries, k, similarity_pairs, seed, workdir):
+    """Time every stage for a corpus of about ``chunks`` chunks; returns the metrics dict."""
+    metrics = {}
+
+    def stage(name, seconds, items=None, megabytes=None):
+        metrics[f"{name}_seconds"] = seconds
+        if items is not None and seconds > 0:
+            metrics[f"{name}_per_second"] = items / seconds
+        if megabytes is not None and seconds > 0:
+            metrics[f"{name}_mb_per_second"] = megabytes / seconds
+        metrics[f"{name}_peak_rss_mb"] = peak_rss_mb()
+
+    agent = RAGKnowledgePromptAgent("unused-key", "You are a helpful assistant.", chunk_size=chunk_size,
+                                    chunk_overlap=0, embedding_dtype=dtype, index_name="bench", index_dir=workdir)
+
+    # Chunking: split the corpus at natural breaks and write the chunks CSV
+    start = time.perf_counter()
+    written = agent.chunk_stream(corpus_blocks(chunks * chunk_size, seed))
+    stage("chunk", time.perf_counter() - start, items=written)
+    metrics["chunks"] = written
+
+    # CSV read back, as calculate_embeddings does
+    start = time.perf_counter()
+    records = pd.read_csv(agent.chunks_path, encoding='utf-8', keep_default_na=False).to_dict('records')
+    stage("read_chunks", time.perf_counter() - start, items=len(records),
+          megabytes=os.path.getsize(agent.chunks_path) / 1e6)
+
+    # Store build; the time spent inventing random embeddings is not counted
+    rng = np.random.default_rng(seed)
+    generation_seconds = 0.0
+
+    def embed(texts):
+        nonlocal generation_seconds
+        started = time.perf_counter()
+        vectors = rng.standard_normal((len(texts), dim), dtype=np.float32)
+        generation_seconds += time.perf_counter() - started
+        return vectors
+
+    start = time.perf_counter()
+    store, _ = reindex(None, records, embed, dtype=dtype)
+    stage("build", time.perf_counter() - start - generation_seconds, items=len(store))
+    del records
+
+    start = time.perf_counter()
+    store.save(agent.vector_store_path)
+    store_megabytes = sum(os.path.getsize(path) for path in store_paths(agent.vector_store_path)) / 1e6
+    stage("save", time.perf_counter() - start, megabytes=store_megabytes)
+    metrics["store_mb"] = store_megabytes
+    queries_matrix = np.asarray(store.vectors[:queries], dtype=np.float32)
+    del store
+
+    start = time.perf_counter()
+    mapped = VectorStore.load(agent.vector_store_path)
+    stage("load_mmap", time.perf_counter() - start, megabytes=store_megabytes)
+
+    start = time.perf_counter()
+    loaded = VectorStore.load(agent.vector_store_path, mmap=False)
+    stage("load_full", time.perf_counter() - start, megabytes=store_megabytes)
+    del loaded
+
+    start = time.perf_counter()
+    index = FlatIndex().build(mapped)
+    stage("index_build", time.perf_counter() - start)
+
+    # First query pages the memory-mapped vectors in; time it apart from the steady state
+    start = time.perf_counter()
+    index.search(queries_matrix[0], k=k)
+    metrics["first_search_seconds"] = time.perf_counter() - start
+    start = time.perf_counter()
+    for query in queries_matrix:
+        index.search(query, k=k)
+    seconds = time.perf_counter() - start
+    stage("search", seconds, items=len(queries_matrix))
+    metrics["search_ms"] = seconds * 1000 / len(queries_matrix)
+
+    pairs = min(similarity_pairs, len(mapped))
+    vectors = np.asarray(mapped.vectors[:pairs], dtype=np.float32)
+    start = time.perf_counter()
+    for row in range(pairs):
+        agent.calculate_similarity(queries_matrix[0], vectors[row])
+    stage("pairwise_similarity", time.perf_counter() - start, items=pairs)
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="characters per chunk")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--similarity-pairs", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None,
+                        help="results file. Defaults to benchmarks/results/rag_hot_paths-<commit>.json")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        with tempfile.TemporaryDirectory() as workdir:
+            metrics = run_scale(args.chunks[0], args.dim, args.dtype, args.chunk_size, args.queries, args.k,
+                                args.similarity_pairs, args.seed, workdir)
+        print(json.dumps(metrics))
+        return
+
+    commit = git_commit()
+    results = []
+    for chunks in args.chunks:
+        # A fresh process per size, so its peak RSS is not inflated by earlier sizes
+        command = [sys.executable, os.path.abspath(__file__), "--worker", "--chunks", str(chunks),
+                   "--dim", str(args.dim), "--dtype", args.dtype, "--chunk-size", str(args.chunk_size),
+                   "--queries", str(args.queries), "--k", str(args.k),
+                   "--similarity-pairs", str(args.similarity_pairs), "--seed", str(args.seed)]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Benchmark of {chunks} chunks failed:\n{completed.stderr[-2000:]}")
+        metrics = json.loads(completed.stdout.strip().splitlines()[-1])
+        results.append({"benchmark": "rag_hot_paths", "scale": {"chunks": chunks}, "metrics": metrics})
+
+        print(f"\n{metrics['chunks']} chunks x {args.dim} dims ({args.dtype}), store {metrics['store_mb']:.1f} MB")
+        print(f"{'stage':<22}{'seconds':>10}{'throughput':>16}{'peak RSS MB':>14}")
+        for name in ("chunk", "read_chunks", "build", "save", "load_mmap", "load_full", "index_build", "search",
+                     "pairwise_similarity"):
+            if f"{name}_per_second" in metrics:
+                throughput = f"{metrics[f'{name}_per_second']:,.0f}/s"
+            elif f"{name}_mb_per_second" in metrics:
+                throughput = f"{metrics[f'{name}_mb_per_second']:,.0f} MB/s"
+            else:
+                throughput = "-"
+            print(f"{name:<22}{metrics[f'{name}_seconds']:>10.3f}{throughput:>16}{metrics[f'{name}_peak_rss_mb']:>14.0f}")
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         f"rag_hot_paths-{(commit or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as output_file:
+        json.dump({
+            "commit": commit,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "settings": {"dim": args.dim, "dtype": args.dtype, "chunk_size": args.chunk_size,
+                         "queries": args.queries, "k": args.k, "seed": args.seed},
+            "results": results,
+        }, output_file, indent=2)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
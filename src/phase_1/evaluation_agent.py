@@ -1,11 +1,16 @@
 # TODO: 1 - Import EvaluationAgent and KnowledgeAugmentedPromptAgent classes
 from workflow_agents.base_agents import EvaluationAgent, KnowledgeAugmentedPromptAgent
+from workflow_agents.logs import configure_logging
+import logging
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Show every step of the agent's work: prompts, responses and scores, untruncated
+configure_logging(logging.DEBUG, max_chars=None)
+
 openai_api_key = os.getenv("OPENAI_API_KEY")
 prompt = "What is the capital of France?"
 
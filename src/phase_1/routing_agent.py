@@ -1,11 +1,16 @@
 # TODO: 1 - Import the KnowledgeAugmentedPromptAgent and RoutingAgent
 from workflow_agents.base_agents import KnowledgeAugmentedPromptAgent, RoutingAgent
+from workflow_agents.logs import configure_logging
+import logging
 import os
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Show every step of the agent's work: prompts, responses and scores, untruncated
+configure_logging(logging.DEBUG, max_chars=None)
+
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
 persona = "You are a college professor"
@@ -1,12 +1,346 @@
 # TODO: 1 - import the OpenAI class from the openai library
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 import numpy as np
 import pandas as pd
-import re
+import asyncio
+import concurrent.futures
+import contextvars
 import csv
+import difflib
+import inspect
+import json
+import logging
+import os
+import time
 import uuid
 from datetime import datetime
 
+from .clients import get_client
+from .completion_cache import completion_key, get_completion_cache
+from .embedding_cache import get_embedding_cache
+from .executor import call_agent
+from .logs import Truncated
+from .rate_limits import get_rate_limiter
+from .single_flight import get_single_flight
+from .chunking import READ_BLOCK_SIZE, iter_chunks, read_blocks
+from .tokens import count_tokens
+from .tracing import current_span, span, traced
+from .validators import fix_instructions, run_validators
+from .vector_index import create_index
+from .vector_store import VectorStore, reindex, store_exists
+
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+# The embeddings endpoint accepts at most 2048 inputs and 300k tokens per request;
+# the token default leaves headroom for estimated counts.
+EMBEDDING_BATCH_SIZE = 2048
+EMBEDDING_BATCH_TOKENS = 250000
+# Completion length assumed when reserving tokens per minute for a request without max_tokens
+EXPECTED_COMPLETION_TOKENS = 256
+
+
+def _openai_client(api_key):
+    """Return the pooled OpenAI client for ``api_key``, shared by all agents."""
+    return get_client(api_key, factory=OpenAI)
+
+
+def _async_openai_client(api_key):
+    """Return the pooled AsyncOpenAI client for ``api_key`` on the running event loop."""
+    return get_client(api_key, factory=AsyncOpenAI, scope=asyncio.get_running_loop())
+
+
+def _usage_tokens(response, prompt_text, completion_text=None, model="gpt-3.5-turbo"):
+    """Return (prompt, completion) token counts from a response's usage, estimated when it reports none."""
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None) if completion_text is not None else 0
+    if isinstance(prompt_tokens, int) and isinstance(completion_tokens, int):
+        return prompt_tokens, completion_tokens
+    completion_text = completion_text if isinstance(completion_text, str) else ""
+    return count_tokens(prompt_text, model), count_tokens(completion_text, model)
+
+
+def _messages_text(params):
+    """Return the text of a chat request's messages, for estimating its prompt tokens."""
+    return "\n".join(m["content"] for m in params.get("messages", ()) if isinstance(m.get("content"), str))
+
+
+def _request_tokens(params):
+    """Estimate the tokens a chat request uses against the rate limit: its prompt plus the expected completion."""
+    return count_tokens(_messages_text(params), params.get("model")) + (params.get("max_tokens") or EXPECTED_COMPLETION_TOKENS)
+
+
+def _embedding(api_key, text):
+    """Return the embedding of ``text``, calling the API only on an embedding cache miss."""
+    with span("embedding", kind="embedding", model=EMBEDDING_MODEL, inputs=1) as call:
+        cache = get_embedding_cache()
+        cached = cache.get(EMBEDDING_MODEL, text)
+        if cached is not None:
+            call.set(cache_hit=True)
+            return cached.tolist()
+
+        client = _openai_client(api_key)
+        response, shared = get_single_flight().do(("embedding", EMBEDDING_MODEL, text), lambda: get_rate_limiter().call(
+            EMBEDDING_MODEL, count_tokens(text, EMBEDDING_MODEL), lambda: client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=text,
+                encoding_format="float"
+            )))
+        embedding = response.data[0].embedding
+        if shared:
+            call.set(cache_hit=False, coalesced=True)
+            return list(embedding)
+        if call.recording:
+            call.set(cache_hit=False, prompt_tokens=_usage_tokens(response, text, model=EMBEDDING_MODEL)[0])
+        cache.put(EMBEDDING_MODEL, text, embedding)
+        return embedding
+
+
+async def _aembedding(api_key, text):
+    """Async counterpart of ``_embedding``."""
+    with span("embedding", kind="embedding", model=EMBEDDING_MODEL, inputs=1) as call:
+        cache = get_embedding_cache()
+        cached = cache.get(EMBEDDING_MODEL, text)
+        if cached is not None:
+            call.set(cache_hit=True)
+            return cached.tolist()
+
+        client = _async_openai_client(api_key)
+        response, shared = await get_single_flight().ado(("embedding", EMBEDDING_MODEL, text), lambda: get_rate_limiter().acall(
+            EMBEDDING_MODEL, count_tokens(text, EMBEDDING_MODEL), lambda: client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=text,
+                encoding_format="float"
+            )))
+        embedding = response.data[0].embedding
+        if shared:
+            call.set(cache_hit=False, coalesced=True)
+            return list(embedding)
+        if call.recording:
+            call.set(cache_hit=False, prompt_tokens=_usage_tokens(response, text, model=EMBEDDING_MODEL)[0])
+        cache.put(EMBEDDING_MODEL, text, embedding)
+        return embedding
+
+
+def _cacheable_completion(params):
+    """Return the completion cache if ``params`` describe a deterministic (temperature=0) request, else None."""
+    if params.get("temperature") != 0:
+        return None
+    return get_completion_cache()
+
+
+def _flight_key(params):
+    """Return the single-flight key of a deterministic (temperature=0) chat request, else None: sampled requests are meant to differ."""
+    if params.get("temperature") != 0:
+        return None
+    return ("chat.completion", completion_key(params))
+
+
+def _chat_completion(client, **params):
+    """Return the text of a chat completion, served from the completion cache when it is enabled."""
+    with span("chat.completion", kind="llm", model=params.get("model")) as call:
+        cache = _cacheable_completion(params)
+        if cache is not None:
+            cached = cache.get(params)
+            if cached is not None:
+                call.set(cache_hit=True)
+                return cached
+        response, shared = get_single_flight().do(_flight_key(params), lambda: get_rate_limiter().call(
+            params.get("model"), _request_tokens(params), lambda: client.chat.completions.create(**params)))
+        content = response.choices[0].message.content
+        if shared:
+            call.set(cache_hit=False, coalesced=True)
+            return content
+        _record_completion(call, response, params, content)
+        if cache is not None and isinstance(content, str):
+            cache.put(params, content)
+        return content
+
+
+async def _achat_completion(client, **params):
+    """Async counterpart of ``_chat_completion``, for an AsyncOpenAI client."""
+    with span("chat.completion", kind="llm", model=params.get("model")) as call:
+        cache = _cacheable_completion(params)
+        if cache is not None:
+            cached = cache.get(params)
+            if cached is not None:
+                call.set(cache_hit=True)
+                return cached
+        response, shared = await get_single_flight().ado(_flight_key(params), lambda: get_rate_limiter().acall(
+            params.get("model"), _request_tokens(params), lambda: client.chat.completions.create(**params)))
+        content = response.choices[0].message.content
+        if shared:
+            call.set(cache_hit=False, coalesced=True)
+            return content
+        _record_completion(call, response, params, content)
+        if cache is not None and isinstance(content, str):
+            cache.put(params, content)
+        return content
+
+
+def _record_completion(call, response, params, content):
+    """Set the token counts of an API-served chat completion on its span."""
+    if call.recording:
+        prompt_tokens, completion_tokens = _usage_tokens(response, _messages_text(params), content, params.get("model"))
+        call.set(cache_hit=False, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+def _stream_chat_completion(client, **params):
+    """
+    Return an iterator over the text of a chat completion as it is generated.
+
+    A cached completion is yielded in one piece; a streamed one is stored in the cache once complete.
+    The completion's span nests under the span current now, e.g. the agent method returning the
+    iterator, not under whichever span is current where the iterator is consumed.
+    """
+    return _completion_stream(current_span(), client, params)
+
+
+def _completion_stream(parent, client, params):
+    """Generator behind ``_stream_chat_completion``; its span is a child of ``parent``."""
+    with span("chat.completion", kind="llm", activate=False, parent=parent, model=params.get("model"), stream=True) as call:
+        cache = _cacheable_completion(params)
+        if cache is not None:
+            cached = cache.get(params)
+            if cached is not None:
+                call.set(cache_hit=True)
+                yield cached
+                return
+        parts = []
+        started = time.perf_counter()
+        # The limiter covers sending the request; once the stream has started it is consumed outside it
+        stream = get_rate_limiter().call(params.get("model"), _request_tokens(params),
+                                         lambda: client.chat.completions.create(stream=True, **params))
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                if not parts:
+                    call.set(time_to_first_token=time.perf_counter() - started)
+                parts.append(delta)
+                yield delta
+        _record_completion(call, None, params, "".join(parts))
+        if cache is not None:
+            cache.put(params, "".join(parts))
+
+
+def _astream_chat_completion(client, **params):
+    """Async counterpart of ``_stream_chat_completion``, for an AsyncOpenAI client; returns an async iterator."""
+    return _acompletion_stream(current_span(), client, params)
+
+
+async def _acompletion_stream(parent, client, params):
+    """Async generator behind ``_astream_chat_completion``; its span is a child of ``parent``."""
+    with span("chat.completion", kind="llm", activate=False, parent=parent, model=params.get("model"), stream=True) as call:
+        cache = _cacheable_completion(params)
+        if cache is not None:
+            cached = cache.get(params)
+            if cached is not None:
+                call.set(cache_hit=True)
+                yield cached
+                return
+        parts = []
+        started = time.perf_counter()
+        stream = await get_rate_limiter().acall(params.get("model"), _request_tokens(params),
+                                                lambda: client.chat.completions.create(stream=True, **params))
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                if not parts:
+                    call.set(time_to_first_token=time.perf_counter() - started)
+                parts.append(delta)
+                yield delta
+        _record_completion(call, None, params, "".join(parts))
+        if cache is not None:
+            cache.put(params, "".join(parts))
+
+
+def _accepts_stream(func):
+    """Return whether an agent method takes a ``stream`` argument."""
+    try:
+        return "stream" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _embedding_batches(texts, batch_size, max_batch_tokens):
+    """Split ``texts`` into consecutive batches within the input-count and token limits."""
+    batch, batch_tokens = [], 0
+    for text in texts:
+        tokens = count_tokens(text, EMBEDDING_MODEL)
+        if batch and (len(batch) >= batch_size or batch_tokens + tokens > max_batch_tokens):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def _batch_vectors(response, inputs):
+    """
+    Return the embeddings of a batched embeddings response in input order, placed by each item's index.
+
+    Raises:
+    ValueError: If the response does not hold exactly one embedding per input.
+    """
+    vectors = [None] * inputs
+    if len(response.data) != inputs:
+        raise ValueError(f"Embedding response has {len(response.data)} embeddings for {inputs} inputs")
+    for item in response.data:
+        if not isinstance(item.index, int) or not 0 <= item.index < inputs or vectors[item.index] is not None:
+            raise ValueError(f"Embedding response has an unexpected or repeated index: {item.index!r}")
+        vectors[item.index] = item.embedding
+    return vectors
+
+
+def _embeddings(api_key, texts, batch_size=EMBEDDING_BATCH_SIZE, max_batch_tokens=EMBEDDING_BATCH_TOKENS):
+    """
+    Embeds many texts with as few requests as possible.
+
+    Cached texts are served from the embedding cache; the remaining distinct texts are
+    sent in batches of up to ``batch_size`` inputs and ``max_batch_tokens`` tokens.
+
+    Returns:
+    list: One float32 vector per input text, in input order.
+    """
+    with span("embeddings", kind="embedding", model=EMBEDDING_MODEL, inputs=len(texts)) as call:
+        cache = get_embedding_cache()
+        results = [None] * len(texts)
+        missing = {}
+        for i, text in enumerate(texts):
+            cached = cache.get(EMBEDDING_MODEL, text)
+            if cached is not None:
+                results[i] = cached
+            else:
+                missing.setdefault(text, []).append(i)
+        call.set(cache_hits=len(texts) - sum(len(indices) for indices in missing.values()))
+
+        if missing:
+            client = _openai_client(api_key)
+            for batch in _embedding_batches(list(missing), batch_size, max_batch_tokens):
+                tokens = sum(count_tokens(text, EMBEDDING_MODEL) for text in batch)
+                response, shared = get_single_flight().do(("embeddings", EMBEDDING_MODEL, tuple(batch)), lambda: get_rate_limiter().call(
+                    EMBEDDING_MODEL, tokens, lambda: client.embeddings.create(
+                        model=EMBEDDING_MODEL,
+                        input=batch,
+                        encoding_format="float"
+                    )))
+                if call.recording and shared:
+                    call.set(coalesced=call.attributes.get("coalesced", 0) + 1)
+                elif call.recording:
+                    prompt_tokens = _usage_tokens(response, "\n".join(batch), model=EMBEDDING_MODEL)[0]
+                    call.set(requests=call.attributes.get("requests", 0) + 1,
+                             prompt_tokens=call.attributes.get("prompt_tokens", 0) + prompt_tokens)
+                embedded = list(zip(batch, _batch_vectors(response, len(batch))))
+                cache.put_many(EMBEDDING_MODEL, embedded)
+                for text, embedding in embedded:
+                    vector = np.asarray(embedding, dtype=np.float32)
+                    for i in missing[text]:
+                        results[i] = vector
+        return results
+
 
 # DirectPromptAgent class definition
 class DirectPromptAgent:
@@ -20,19 +354,39 @@ class DirectPromptAgent:
         # TODO: 2 - Define an attribute named openai_api_key to store the OpenAI API key provided to this class.
         self.openai_api_key = openai_api_key
 
-    def respond(self, prompt):
-        """Generate a response using the OpenAI API."""
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
-        response = client.chat.completions.create(
+    def _messages(self, prompt):
+        """Build the chat messages for a prompt."""
+        # TODO: 4 - Provide the user's prompt here. Do not add a system prompt.
+        return [{"role": "user", "content": prompt}]
+
+    @traced()
+    def respond(self, prompt, stream=False):
+        """Generate a response using the OpenAI API. With stream=True, returns an iterator over the response text as it arrives."""
+        client = _openai_client(self.openai_api_key)
+        if stream:
+            return _stream_chat_completion(client, model="gpt-3.5-turbo", messages=self._messages(prompt), temperature=0)
+        response_text = _chat_completion(
+            client,
             model="gpt-3.5-turbo",  # TODO: 3 - Specify the model to use (gpt-3.5-turbo)
-            messages=[
-                # TODO: 4 - Provide the user's prompt here. Do not add a system prompt.
-                {"role": "user", "content": prompt}
-            ],
+            messages=self._messages(prompt),
             temperature=0
         )
         # TODO: 5 - Return only the textual content of the response (not the full JSON response).
-        return response.choices[0].message.content
+        return response_text
+
+    @traced()
+    async def arespond(self, prompt, stream=False):
+        """Async counterpart of respond, using AsyncOpenAI. With stream=True, returns an async iterator over the response text."""
+        client = _async_openai_client(self.openai_api_key)
+        if stream:
+            return _astream_chat_completion(client, model="gpt-3.5-turbo", messages=self._messages(prompt), temperature=0)
+        response_text = await _achat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=self._messages(prompt),
+            temperature=0
+        )
+        return response_text
 
 
 # AugmentedPromptAgent class definition
@@ -48,23 +402,45 @@ class AugmentedPromptAgent:
         self.persona = persona
         self.openai_api_key = openai_api_key
 
-    def respond(self, input_text):
-        """Generate a response using OpenAI API."""
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
+    def _messages(self, input_text):
+        """Build the chat messages: the persona as system prompt, then the input."""
+        return [
+            # TODO: 3 - Add a system prompt instructing the agent to assume the defined persona and explicitly forget previous context.
+            {"role": "system", "content": f"You are {self.persona}. Forget all previous context."},
+            {"role": "user", "content": input_text}
+        ]
+
+    @traced()
+    def respond(self, input_text, stream=False):
+        """Generate a response using OpenAI API. With stream=True, returns an iterator over the response text as it arrives."""
+        client = _openai_client(self.openai_api_key)
+        if stream:
+            return _stream_chat_completion(client, model="gpt-3.5-turbo", messages=self._messages(input_text), temperature=0)
 
         # TODO: 2 - Declare a variable 'response' that calls OpenAI's API for a chat completion.
-        response = client.chat.completions.create(
+        response_text = _chat_completion(
+            client,
             model="gpt-3.5-turbo",
-            messages=[
-                # TODO: 3 - Add a system prompt instructing the agent to assume the defined persona and explicitly forget previous context.
-                {"role": "system", "content": f"You are {self.persona}. Forget all previous context."},
-                {"role": "user", "content": input_text}
-            ],
+            messages=self._messages(input_text),
             temperature=0
         )
 
         # TODO: 4 - Return only the textual content of the response, not the full JSON payload.
-        return response.choices[0].message.content
+        return response_text
+
+    @traced()
+    async def arespond(self, input_text, stream=False):
+        """Async counterpart of respond, using AsyncOpenAI. With stream=True, returns an async iterator over the response text."""
+        client = _async_openai_client(self.openai_api_key)
+        if stream:
+            return _astream_chat_completion(client, model="gpt-3.5-turbo", messages=self._messages(input_text), temperature=0)
+        response_text = await _achat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=self._messages(input_text),
+            temperature=0
+        )
+        return response_text
 
 
 # KnowledgeAugmentedPromptAgent class definition
@@ -72,19 +448,99 @@ class KnowledgeAugmentedPromptAgent:
     """
     An agent that uses both a persona and specific knowledge to generate responses.
     It is instructed to use only the provided knowledge and ignore its own inherent knowledge.
+
+    With a ``knowledge_token_budget``, knowledge longer than the budget is split into
+    sections that are embedded once; each call then only inlines the sections most
+    similar to the input, so prompt size follows the question instead of the knowledge.
     """
     
-    def __init__(self, openai_api_key, persona, knowledge):
-        """Initialize the agent with provided attributes."""
+    def __init__(self, openai_api_key, persona, knowledge, knowledge_token_budget=None, section_tokens=250):
+        """
+        Initialize the agent with provided attributes.
+
+        Parameters:
+        openai_api_key (str): API key for accessing OpenAI.
+        persona (str): Persona description for the agent.
+        knowledge (str): Knowledge the agent must answer from.
+        knowledge_token_budget (int): Maximum knowledge tokens per prompt. Defaults to None (always inline all knowledge).
+        section_tokens (int): Size of the sections long knowledge is split into, in tokens. Defaults to 250.
+        """
         self.persona = persona
         # TODO: 1 - Create an attribute to store the agent's knowledge.
         self.knowledge = knowledge
         self.openai_api_key = openai_api_key
+        self.knowledge_token_budget = knowledge_token_budget
+        self.section_tokens = section_tokens
+        self._knowledge_tokens = None
+        self._sections = None
+        self._sections_key = None
+
+    @property
+    def knowledge_tokens(self):
+        """Token count of the full knowledge."""
+        if self._knowledge_tokens is None or self._knowledge_tokens[0] is not self.knowledge:
+            self._knowledge_tokens = (self.knowledge, count_tokens(self.knowledge))
+        return self._knowledge_tokens[1]
+
+    def _compacts(self):
+        """Return whether the knowledge exceeds the budget and has to be trimmed per prompt."""
+        return self.knowledge_token_budget is not None and self.knowledge_tokens > self.knowledge_token_budget
+
+    def _section_store(self):
+        """Return the embedded knowledge sections, splitting and embedding them on first use."""
+        key = (self.knowledge, self.section_tokens)
+        if self._sections is None or self._sections_key != key:
+            logger.warning(
+                "Knowledge of %d tokens exceeds the budget of %d; each prompt gets only its most relevant sections.",
+                self.knowledge_tokens, self.knowledge_token_budget,
+            )
+            records = list(iter_chunks(self.knowledge, chunk_size=self.section_tokens, chunk_overlap=0, unit="tokens"))
+            embeddings = _embeddings(self.openai_api_key, [record["text"] for record in records])
+            self._sections = VectorStore.from_embeddings(embeddings, records)
+            self._sections_key = key
+        return self._sections
 
-    def respond(self, input_text):
-        """Generate a response using the OpenAI API."""
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
-        
+    def _select_sections(self, store, input_embedding):
+        """
+        Pack the sections most similar to the input into the token budget, in document order.
+
+        The first section is always kept, since knowledge usually opens with instructions
+        on how to use the rest.
+        """
+        rows = [0] + [row for row, _ in store.search(input_embedding, k=len(store)) if row != 0]
+        selected, used_tokens = [], 0
+        for row in rows:
+            tokens = count_tokens(store.records[row]["text"])
+            if selected and used_tokens + tokens > self.knowledge_token_budget:
+                continue
+            selected.append(row)
+            used_tokens += tokens
+        return "\n\n".join(store.records[row]["text"] for row in sorted(selected))
+
+    def relevant_knowledge(self, input_text):
+        """
+        Returns the knowledge to inline for ``input_text``: all of it when it fits the budget,
+        otherwise the most relevant sections.
+
+        Parameters:
+        input_text (str): The prompt being answered.
+
+        Returns:
+        str: The knowledge for the system message.
+        """
+        if not self._compacts():
+            return self.knowledge
+        return self._select_sections(self._section_store(), _embedding(self.openai_api_key, input_text))
+
+    async def arelevant_knowledge(self, input_text):
+        """Async counterpart of relevant_knowledge; the prompt embedding uses AsyncOpenAI."""
+        if not self._compacts():
+            return self.knowledge
+        store = await asyncio.to_thread(self._section_store)
+        return self._select_sections(store, await _aembedding(self.openai_api_key, input_text))
+
+    def _messages(self, input_text, knowledge=None):
+        """Build the chat messages: persona and knowledge (all of it by default) as system prompt, then the input."""
         # TODO: 2 - Construct a system message including:
         #           - The persona with the following instruction:
         #             "You are _persona_ knowledge-based assistant. Forget all previous context."
@@ -94,20 +550,45 @@ class KnowledgeAugmentedPromptAgent:
         #             "Answer the prompt based on this knowledge, not your own."
         system_message = (
             f"You are {self.persona} knowledge-based assistant. Forget all previous context.\n"
-            f"Use only the following knowledge to answer, do not use your own knowledge: {self.knowledge}\n"
+            f"Use only the following knowledge to answer, do not use your own knowledge: "
+            f"{self.knowledge if knowledge is None else knowledge}\n"
             f"Answer the prompt based on this knowledge, not your own."
         )
-        
-        response = client.chat.completions.create(
+        return [
+            {"role": "system", "content": system_message},
+            # TODO: 3 - Add the user's input prompt here as a user message.
+            {"role": "user", "content": input_text}
+        ]
+
+    @traced()
+    def respond(self, input_text, stream=False):
+        """Generate a response using the OpenAI API. With stream=True, returns an iterator over the response text as it arrives."""
+        client = _openai_client(self.openai_api_key)
+        messages = self._messages(input_text, self.relevant_knowledge(input_text))
+        if stream:
+            return _stream_chat_completion(client, model="gpt-3.5-turbo", messages=messages, temperature=0)
+        response_text = _chat_completion(
+            client,
             model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_message},
-                # TODO: 3 - Add the user's input prompt here as a user message.
-                {"role": "user", "content": input_text}
-            ],
+            messages=messages,
             temperature=0
         )
-        return response.choices[0].message.content
+        return response_text
+
+    @traced()
+    async def arespond(self, input_text, stream=False):
+        """Async counterpart of respond, using AsyncOpenAI. With stream=True, returns an async iterator over the response text."""
+        messages = self._messages(input_text, await self.arelevant_knowledge(input_text))
+        client = _async_openai_client(self.openai_api_key)
+        if stream:
+            return _astream_chat_completion(client, model="gpt-3.5-turbo", messages=messages, temperature=0)
+        response_text = await _achat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=messages,
+            temperature=0
+        )
+        return response_text
 
 
 # RAGKnowledgePromptAgent class definition
@@ -115,9 +596,15 @@ class RAGKnowledgePromptAgent:
     """
     An agent that uses Retrieval-Augmented Generation (RAG) to find knowledge from a large corpus
     and leverages embeddings to respond to prompts based solely on retrieved information.
+
+    The vector store is kept in memory once it is built or first loaded, so repeated
+    queries do not touch the disk. Chunking new knowledge discards it.
     """
 
-    def __init__(self, openai_api_key, persona, chunk_size=2000, chunk_overlap=100):
+    def __init__(self, openai_api_key, persona, chunk_size=2000, chunk_overlap=100, chunk_unit="chars",
+                 embedding_batch_size=EMBEDDING_BATCH_SIZE, embedding_batch_tokens=EMBEDDING_BATCH_TOKENS,
+                 embedding_dtype="float32", top_k=3, similarity_threshold=None, context_tokens=2000,
+                 index_backend="flat", index_params=None, index_name=None, index_dir=".rag_index"):
         """
         Initializes the RAGKnowledgePromptAgent with API credentials and configuration settings.
 
@@ -126,16 +613,48 @@ class RAGKnowledgePromptAgent:
         persona (str): Persona description for the agent.
         chunk_size (int): The size of text chunks for embedding. Defaults to 2000.
         chunk_overlap (int): Overlap between consecutive chunks. Defaults to 100.
+        chunk_unit (str): Unit of chunk_size and chunk_overlap, 'chars' or 'tokens'. Defaults to 'chars'.
+        embedding_batch_size (int): Maximum chunks sent per embeddings request. Defaults to 2048.
+        embedding_batch_tokens (int): Maximum estimated tokens per embeddings request. Defaults to 250000.
+        embedding_dtype (str): Precision of the stored vectors, 'float32' or 'float16'. Defaults to 'float32'.
+        top_k (int): Number of most similar chunks retrieved per prompt. Defaults to 3.
+        similarity_threshold (float): Minimum cosine similarity of a retrieved chunk. Defaults to None (no minimum).
+        context_tokens (int): Token budget for the retrieved chunks passed to the LLM. Defaults to 2000.
+        index_backend (str): Search index, 'flat' (exact) or 'ivf' (approximate). Defaults to 'flat'.
+        index_params (dict): Tuning parameters for the search index, e.g. {'n_probe': 16}. Defaults to None.
+        index_name (str): Name of a persistent index that later agents re-index incrementally.
+            Defaults to None, which gives this agent its own throwaway files.
+        index_dir (str): Directory holding named indexes. Defaults to '.rag_index'.
         """
         self.persona = persona
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.chunk_unit = chunk_unit
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_batch_tokens = embedding_batch_tokens
+        self.embedding_dtype = embedding_dtype
+        self.top_k = top_k
+        self.similarity_threshold = similarity_threshold
+        self.context_tokens = context_tokens
+        self.index_backend = index_backend
+        self.index_params = index_params or {}
         self.openai_api_key = openai_api_key
-        self.unique_filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.csv"
+        self.index_name = index_name
+        if index_name:
+            self.unique_filename = f"{index_name}.csv"
+            self.chunks_path = os.path.join(index_dir, f"chunks-{self.unique_filename}")
+            self.vector_store_path = os.path.join(index_dir, f"embeddings-{index_name}")
+        else:
+            self.unique_filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.csv"
+            self.chunks_path = f"chunks-{self.unique_filename}"
+            self.vector_store_path = f"embeddings-{os.path.splitext(self.unique_filename)[0]}"
+        self.embedded_chunks = 0
+        self._set_index(None, None)
 
     def get_embedding(self, text):
         """
         Fetches the embedding vector for given text using OpenAI's embedding API.
+        Previously embedded text is served from the shared embedding cache.
 
         Parameters:
         text (str): Text to embed.
@@ -143,13 +662,19 @@ class RAGKnowledgePromptAgent:
         Returns:
         list: The embedding vector.
         """
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
-        response = client.embeddings.create(
-            model="text-embedding-3-large",
-            input=text,
-            encoding_format="float"
-        )
-        return response.data[0].embedding
+        return _embedding(self.openai_api_key, text)
+
+    def get_embeddings(self, texts):
+        """
+        Fetches embeddings for many texts using batched embedding requests.
+
+        Parameters:
+        texts (list): Texts to embed.
+
+        Returns:
+        list: One float32 vector per text, in the same order.
+        """
+        return _embeddings(self.openai_api_key, texts, self.embedding_batch_size, self.embedding_batch_tokens)
 
     def calculate_similarity(self, vector_one, vector_two):
         """
@@ -165,6 +690,20 @@ class RAGKnowledgePromptAgent:
         vec1, vec2 = np.array(vector_one), np.array(vector_two)
         return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
 
+    def _write_chunks(self, blocks):
+        """Chunk streamed text into the chunks CSV, yielding each chunk once it has been written."""
+        self._set_index(None, None)
+        fieldnames = ["chunk_hash", "text", "chunk_size", "start_char", "end_char"]
+        directory = os.path.dirname(self.chunks_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.chunks_path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            for chunk in iter_chunks(blocks, self.chunk_size, self.chunk_overlap, unit=self.chunk_unit):
+                writer.writerow({k: chunk[k] for k in fieldnames})
+                yield chunk
+
     def chunk_text(self, text):
         """
         Splits text into manageable chunks, attempting natural breaks.
@@ -175,78 +714,205 @@ class RAGKnowledgePromptAgent:
         Returns:
         list: List of dictionaries containing chunk metadata.
         """
-        separator = "\n"
-        text = re.sub(r'\s+', ' ', text).strip()
+        return list(self._write_chunks([text]))
 
-        if len(text) <= self.chunk_size:
-            return [{"chunk_id": 0, "text": text, "chunk_size": len(text)}]
-
-        chunks, start, chunk_id = [], 0, 0
+    def chunk_stream(self, blocks):
+        """
+        Splits streamed text into chunks without holding the text or the chunks in memory.
 
-        while start < len(text):
-            end = min(start + self.chunk_size, len(text))
-            if separator in text[start:end]:
-                end = start + text[start:end].rindex(separator) + len(separator)
+        Parameters:
+        blocks (iterable): Consecutive pieces of the text.
 
-            chunks.append({
-                "chunk_id": chunk_id,
-                "text": text[start:end],
-                "chunk_size": end - start,
-                "start_char": start,
-                "end_char": end
-            })
+        Returns:
+        int: Number of chunks written.
+        """
+        return sum(1 for _ in self._write_chunks(blocks))
 
-            start = end - self.chunk_overlap
-            chunk_id += 1
+    def chunk_file(self, path, block_size=READ_BLOCK_SIZE):
+        """
+        Splits a text file into chunks, reading it block by block.
 
-        with open(f"chunks-{self.unique_filename}", 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=["text", "chunk_size"])
-            writer.writeheader()
-            for chunk in chunks:
-                writer.writerow({k: chunk[k] for k in ["text", "chunk_size"]})
+        Parameters:
+        path (str): Knowledge file to chunk.
+        block_size (int): Characters read per block. Defaults to 1 MiB.
 
-        return chunks
+        Returns:
+        int: Number of chunks written.
+        """
+        return self.chunk_stream(read_blocks(path, block_size))
 
+    @traced()
     def calculate_embeddings(self):
         """
-        Calculates embeddings for each chunk and stores them in a CSV file.
+        Calculates embeddings for the chunks and saves them as a binary vector store.
+
+        If a store already exists at vector_store_path, it is updated in place: chunks it
+        already holds (by content hash) keep their vectors, removed chunks are tombstoned,
+        and only new chunks are embedded, in batched requests. The number embedded is
+        kept in embedded_chunks.
 
         Returns:
         DataFrame: DataFrame containing text chunks and their embeddings.
         """
-        df = pd.read_csv(f"chunks-{self.unique_filename}", encoding='utf-8')
-        df['embeddings'] = df['text'].apply(self.get_embedding)
-        df.to_csv(f"embeddings-{self.unique_filename}", encoding='utf-8', index=False)
+        # Read text and hashes as strings, or a chunk such as '2024' would come back as a number
+        df = pd.read_csv(self.chunks_path, encoding='utf-8', keep_default_na=False, dtype={'text': str, 'chunk_hash': str})
+        previous = VectorStore.load(self.vector_store_path) if store_exists(self.vector_store_path) else None
+        store, self.embedded_chunks = reindex(
+            previous, df.to_dict('records'), self.get_embeddings, dtype=self.embedding_dtype
+        )
+        store.save(self.vector_store_path)
+        self._set_index(store, self.vector_store_path)
+        rows = {record['chunk_hash']: row for row, record in enumerate(store.records) if not record.get('deleted')}
+        df['embeddings'] = [store.vectors[rows[chunk_hash]] for chunk_hash in df['chunk_hash']]
         return df
 
-    def find_prompt_in_knowledge(self, prompt):
+    def load_index(self, path=None):
+        """
+        Loads a vector store from disk and keeps it for subsequent queries.
+
+        Parameters:
+        path (str): Store path without extension. Defaults to this agent's vector_store_path.
+
+        Returns:
+        VectorStore: The loaded index.
+        """
+        path = path or self.vector_store_path
+        self._set_index(VectorStore.load(path), path)
+        self.vector_store_path = path
+        return self._index
+
+    def save_index(self, path=None):
+        """
+        Writes the in-memory index to disk.
+
+        Parameters:
+        path (str): Store path without extension. Defaults to this agent's vector_store_path.
+
+        Returns:
+        str: The path the index was saved to.
+        """
+        if self._index is None:
+            raise ValueError("No index to save; call calculate_embeddings() or load_index() first.")
+        path = path or self.vector_store_path
+        # A store already on disk at this path is memory-mapped from it; rewriting it is a no-op.
+        if path != self._index_path:
+            self._index.save(path)
+            self._index_path = path
+        self.vector_store_path = path
+        return path
+
+    def _set_index(self, store, path):
+        """Replace the in-memory vector store and drop the search index built over the old one."""
+        self._index, self._index_path = store, path
+        self._search_index = None
+
+    @property
+    def index(self):
+        """The in-memory vector store, loaded from vector_store_path on first access."""
+        if self._index is None:
+            self.load_index()
+        return self._index
+
+    @property
+    def search_index(self):
+        """The index_backend search index over the vector store, built on first access."""
+        if self._search_index is None:
+            self._search_index = create_index(self.index_backend, **self.index_params).build(self.index)
+        return self._search_index
+
+    def retrieve(self, prompt):
+        """
+        Finds the chunks most similar to a prompt.
+
+        Up to top_k chunks scoring at least similarity_threshold are returned, best first.
+
+        Parameters:
+        prompt (str): User input prompt.
+
+        Returns:
+        list: (chunk text, similarity) pairs.
+        """
+        return self._search(self.get_embedding(prompt))
+
+    async def aretrieve(self, prompt):
+        """Async counterpart of retrieve; only the prompt embedding is awaited."""
+        return self._search(await _aembedding(self.openai_api_key, prompt))
+
+    def _search(self, prompt_embedding):
+        """Return the (chunk text, similarity) pairs best matching a prompt embedding."""
+        store = self.index
+        matches = self.search_index.search(prompt_embedding, k=self.top_k, min_similarity=self.similarity_threshold)
+        return [(store.records[row]['text'], score) for row, score in matches]
+
+    def build_context(self, chunks):
+        """
+        Joins retrieved chunks, best first, until the context token budget is spent.
+
+        The best chunk is always kept, even if it alone exceeds the budget.
+
+        Parameters:
+        chunks (list): (chunk text, similarity) pairs, best first.
+
+        Returns:
+        str: The context passed to the LLM.
+        """
+        selected, used_tokens = [], 0
+        for text, _ in chunks:
+            tokens = count_tokens(text)
+            if selected and used_tokens + tokens > self.context_tokens:
+                break
+            selected.append(text)
+            used_tokens += tokens
+        return "\n\n".join(selected)
+
+    @traced()
+    def find_prompt_in_knowledge(self, prompt, stream=False):
         """
         Finds and responds to a prompt based on similarity with embedded knowledge.
 
         Parameters:
         prompt (str): User input prompt.
+        stream (bool): Return an iterator over the response text as it arrives. Defaults to False.
 
         Returns:
-        str: Response derived from the most similar chunk in knowledge.
+        str: Response derived from the most similar chunks in knowledge.
         """
-        prompt_embedding = self.get_embedding(prompt)
-        df = pd.read_csv(f"embeddings-{self.unique_filename}", encoding='utf-8')
-        df['embeddings'] = df['embeddings'].apply(lambda x: np.array(eval(x)))
-        df['similarity'] = df['embeddings'].apply(lambda emb: self.calculate_similarity(prompt_embedding, emb))
+        context = self.build_context(self.retrieve(prompt))
+
+        client = _openai_client(self.openai_api_key)
+        if stream:
+            return _stream_chat_completion(client, model="gpt-3.5-turbo", messages=self._messages(prompt, context), temperature=0)
+        response_text = _chat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=self._messages(prompt, context),
+            temperature=0
+        )
 
-        best_chunk = df.loc[df['similarity'].idxmax(), 'text']
+        return response_text
 
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
-        response = client.chat.completions.create(
+    @traced()
+    async def afind_prompt_in_knowledge(self, prompt, stream=False):
+        """Async counterpart of find_prompt_in_knowledge, using AsyncOpenAI. With stream=True, returns an async iterator."""
+        context = self.build_context(await self.aretrieve(prompt))
+
+        client = _async_openai_client(self.openai_api_key)
+        if stream:
+            return _astream_chat_completion(client, model="gpt-3.5-turbo", messages=self._messages(prompt, context), temperature=0)
+        response_text = await _achat_completion(
+            client,
             model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": f"You are {self.persona}, a knowledge-based assistant. Forget previous context."},
-                {"role": "user", "content": f"Answer based only on this information: {best_chunk}. Prompt: {prompt}"}
-            ],
+            messages=self._messages(prompt, context),
             temperature=0
         )
+        return response_text
 
-        return response.choices[0].message.content
+    def _messages(self, prompt, context):
+        """Build the chat messages answering a prompt from retrieved context."""
+        return [
+            {"role": "system", "content": f"You are {self.persona}, a knowledge-based assistant. Forget previous context."},
+            {"role": "user", "content": f"Answer based only on this information: {context}. Prompt: {prompt}"}
+        ]
 
 
 # EvaluationAgent class definition
@@ -254,85 +920,456 @@ class EvaluationAgent:
     """
     An agent that evaluates the responses of a worker agent against specific criteria.
     It iteratively refines the worker agent's response until it meets the criteria or max iterations is reached.
+
+    By default a rejected response costs two LLM calls: the verdict, then the instructions to fix
+    it. With ``merged_judge=True`` a single JSON call returns the verdict, the reasons and the
+    instructions together. ``unchanged_threshold`` stops the loop early once a refined response
+    is (almost) identical to the previous one, since judging it again would not change the outcome.
+    ``validators`` (see ``validators.py``) run locally first: a response they reject gets generated
+    fix instructions without any LLM call, and only responses passing them reach the LLM judge.
+    With ``candidates > 1`` the first round generates and judges that many candidates concurrently
+    and returns the first accepted one; the refinement loop only runs if none pass.
+    A ``token_sink`` receives worker responses piece by piece as they are generated; of parallel
+    candidates, only the returned one is sent to it, in one piece.
+    Each iteration can be handed to an ``on_iteration`` callback as it completes, and a loop
+    can be resumed from those records (``history``) instead of starting over.
     """
     
-    def __init__(self, openai_api_key, persona, evaluation_criteria, agent_to_evaluate, max_interactions=10):
-        """Initialize the EvaluationAgent with given attributes."""
+    def __init__(self, openai_api_key, persona, evaluation_criteria, agent_to_evaluate, max_interactions=10,
+                 merged_judge=False, unchanged_threshold=None, validators=None, candidates=1, token_sink=None):
+        """
+        Initialize the EvaluationAgent with given attributes.
+
+        Parameters:
+        openai_api_key (str): API key for accessing OpenAI.
+        persona (str): Persona of the evaluator.
+        evaluation_criteria (str): Criteria the worker's response must meet.
+        agent_to_evaluate: Worker agent with a respond (and optionally arespond) method.
+        max_interactions (int): Maximum worker/evaluator rounds. Defaults to 10.
+        merged_judge (bool): Get verdict and fix instructions from one structured call. Defaults to False.
+        unchanged_threshold (float): Stop when consecutive responses are at least this similar (0 to 1).
+                                     Defaults to None (never stop early).
+        validators (list): Local checks, each returning a list of problems, run before the LLM judge.
+                           Defaults to None (none).
+        candidates (int): Responses generated and judged in parallel in the first round. Defaults to 1.
+        token_sink (callable): Called with each piece of text of a worker response as it streams in,
+                               for workers whose respond accepts stream. Defaults to None (no streaming).
+        """
         # TODO: 1 - Declare class attributes here
         self.openai_api_key = openai_api_key
         self.persona = persona
         self.evaluation_criteria = evaluation_criteria
         self.agent_to_evaluate = agent_to_evaluate
         self.max_interactions = max_interactions
+        self.merged_judge = merged_judge
+        self.unchanged_threshold = unchanged_threshold
+        self.validators = list(validators or [])
+        self.candidates = max(1, candidates)
+        self.token_sink = token_sink
+
+    def _evaluation_messages(self, response_from_worker):
+        """Build the messages asking the LLM whether a worker response meets the criteria."""
+        eval_prompt = (
+            f"Does the following answer: {response_from_worker}\n"
+            f"Meet this criteria: {self.evaluation_criteria}\n"  # TODO: 4 - Insert evaluation criteria here
+            f"Respond Yes or No, and the reason why it does or doesn't meet the criteria."
+        )
+        # TODO: 5 - Define the message structure sent to the LLM for evaluation (use temperature=0)
+        return [
+            {"role": "system", "content": self.persona},
+            {"role": "user", "content": eval_prompt}
+        ]
+
+    def _instruction_messages(self, evaluation):
+        """Build the messages asking the LLM how to fix a rejected response."""
+        instruction_prompt = (
+            f"Provide instructions to fix an answer based on these reasons why it is incorrect: {evaluation}"
+        )
+        # TODO: 6 - Define the message structure sent to the LLM to generate correction instructions (use temperature=0)
+        return [
+            {"role": "system", "content": self.persona},
+            {"role": "user", "content": instruction_prompt}
+        ]
+
+    def _judge_messages(self, response_from_worker):
+        """Build the messages asking for verdict, reasons and fix instructions in one JSON answer."""
+        judge_prompt = (
+            f"Does the following answer: {response_from_worker}\n"
+            f"Meet this criteria: {self.evaluation_criteria}\n"
+            f'Respond with a JSON object {{"verdict": "Yes" or "No", "reasons": "why it does or does not meet '
+            f'the criteria", "instructions": "instructions to fix the answer, or an empty string if it meets them"}}.'
+        )
+        return [
+            {"role": "system", "content": self.persona},
+            {"role": "user", "content": judge_prompt}
+        ]
 
-    def evaluate(self, initial_prompt):
+    @staticmethod
+    def _parse_judgement(response_text):
         """
-        This method manages interactions between agents to achieve a solution.
-        It iteratively gets a response from the worker agent, evaluates it, and refines if needed.
+        Read a merged judge answer.
+
+        Returns:
+        tuple: (accepted, evaluation, instructions). An answer that is not the expected JSON is
+               used as both evaluation and instructions, accepted if it starts with 'yes'.
         """
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
-        prompt_to_evaluate = initial_prompt
+        try:
+            judgement = json.loads(response_text)
+            if not isinstance(judgement, dict):
+                raise ValueError("judgement is not an object")
+        except ValueError:
+            evaluation = response_text.strip()
+            return evaluation.lower().startswith("yes"), evaluation, evaluation
+        accepted = str(judgement.get("verdict", "")).strip().lower().startswith("yes")
+        reasons = str(judgement.get("reasons", "")).strip()
+        evaluation = f"{'Yes' if accepted else 'No'}, {reasons}" if reasons else ("Yes" if accepted else "No")
+        return accepted, evaluation, str(judgement.get("instructions") or reasons).strip()
+
+    def _local_judgement(self, response_from_worker):
+        """Return a rejecting (accepted, evaluation, instructions) if a local validator fails, else None."""
+        problems = run_validators(self.validators, response_from_worker) if self.validators else []
+        if not problems:
+            return None
+        return False, "No, " + " ".join(problems), fix_instructions(problems)
+
+    def _judge(self, client, response_from_worker):
+        """Return (accepted, evaluation, instructions) for a worker response: local checks first, then one or two LLM calls."""
+        local_judgement = self._local_judgement(response_from_worker)
+        if local_judgement is not None:
+            logger.debug(" Step 2: Local checks rejected the response")
+            return local_judgement
+
+        if self.merged_judge:
+            logger.debug(" Step 2: Evaluator agent judges the response and gives fix instructions")
+            response_text = _chat_completion(
+                client,
+                model="gpt-3.5-turbo",
+                messages=self._judge_messages(response_from_worker),
+                temperature=0,
+                response_format={"type": "json_object"}
+            )
+            return self._parse_judgement(response_text)
+
+        logger.debug(" Step 2: Evaluator agent judges the response")
+        response_text = _chat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=self._evaluation_messages(response_from_worker),
+            temperature=0
+        )
+        evaluation = response_text.strip()
+        if evaluation.lower().startswith("yes"):
+            return True, evaluation, ""
 
-        for i in range(self.max_interactions):  # TODO: 2 - Set loop to iterate up to the maximum number of interactions:
-            print(f"\n--- Interaction {i+1} ---")
+        logger.debug(" Step 4: Generate instructions to correct the response")
+        response_text = _chat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=self._instruction_messages(evaluation),
+            temperature=0
+        )
+        return False, evaluation, response_text.strip()
 
-            print(" Step 1: Worker agent generates a response to the prompt")
-            print(f"Prompt:\n{prompt_to_evaluate}")
-            # TODO: 3 - Obtain a response from the worker agent
-            response_from_worker = self.agent_to_evaluate.respond(prompt_to_evaluate)
-            print(f"Worker Agent Response:\n{response_from_worker}")
+    async def _ajudge(self, client, response_from_worker):
+        """Async counterpart of _judge, for an AsyncOpenAI client."""
+        local_judgement = self._local_judgement(response_from_worker)
+        if local_judgement is not None:
+            return local_judgement
 
-            print(" Step 2: Evaluator agent judges the response")
-            eval_prompt = (
-                f"Does the following answer: {response_from_worker}\n"
-                f"Meet this criteria: {self.evaluation_criteria}\n"  # TODO: 4 - Insert evaluation criteria here
-                f"Respond Yes or No, and the reason why it does or doesn't meet the criteria."
-            )
-            response = client.chat.completions.create(
+        if self.merged_judge:
+            response_text = await _achat_completion(
+                client,
                 model="gpt-3.5-turbo",
-                # TODO: 5 - Define the message structure sent to the LLM for evaluation (use temperature=0)
-                messages=[
-                    {"role": "system", "content": self.persona},
-                    {"role": "user", "content": eval_prompt}
-                ],
-                temperature=0
+                messages=self._judge_messages(response_from_worker),
+                temperature=0,
+                response_format={"type": "json_object"}
             )
-            evaluation = response.choices[0].message.content.strip()
-            print(f"Evaluator Agent Evaluation:\n{evaluation}")
+            return self._parse_judgement(response_text)
+
+        response_text = await _achat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=self._evaluation_messages(response_from_worker),
+            temperature=0
+        )
+        evaluation = response_text.strip()
+        if evaluation.lower().startswith("yes"):
+            return True, evaluation, ""
+
+        response_text = await _achat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=self._instruction_messages(evaluation),
+            temperature=0
+        )
+        return False, evaluation, response_text.strip()
+
+    def _unchanged(self, previous_response, response_from_worker):
+        """Return whether a refined response is too similar to the previous one to be worth judging again."""
+        if self.unchanged_threshold is None or previous_response is None:
+            return False
+        if previous_response == response_from_worker:
+            return True
+        similarity = difflib.SequenceMatcher(None, previous_response, response_from_worker).ratio()
+        return similarity >= self.unchanged_threshold
+
+    @staticmethod
+    def _candidate_prompt(initial_prompt, index):
+        """
+        Return the prompt for candidate ``index``. Workers answer at temperature 0, so every
+        candidate after the first is asked for an independent take to get distinct responses.
+        """
+        if index == 0:
+            return initial_prompt
+        return (
+            f"{initial_prompt}\n\n"
+            f"(Alternative answer {index + 1}: answer independently, taking a different valid approach where possible.)"
+        )
 
-            print(" Step 3: Check if evaluation is positive")
-            if evaluation.lower().startswith("yes"):
-                print("✅ Final solution accepted.")
-                # TODO: 7 - Return a dictionary containing the final response, evaluation, and number of iterations
+    def _worker_response(self, prompt, streamed=True):
+        """
+        Get the worker's response, streaming it into token_sink when there is one and the worker can stream.
+        With ``streamed=False`` the response is only returned, e.g. for a candidate that may not be accepted.
+        """
+        respond = self.agent_to_evaluate.respond
+        if not streamed or self.token_sink is None or not _accepts_stream(respond):
+            return respond(prompt)
+        parts = []
+        for token in respond(prompt, stream=True):
+            self.token_sink(token)
+            parts.append(token)
+        return "".join(parts)
+
+    async def _aworker_response(self, worker, prompt, streamed=True):
+        """Async counterpart of _worker_response for ``worker``, the worker's arespond or respond."""
+        if not streamed or self.token_sink is None or not _accepts_stream(worker):
+            return await call_agent(worker, prompt)
+        if not inspect.iscoroutinefunction(worker):
+            return await asyncio.to_thread(self._worker_response, prompt)
+        parts = []
+        async for token in await worker(prompt, stream=True):
+            self.token_sink(token)
+            parts.append(token)
+        return "".join(parts)
+
+    def _judge_candidate(self, client, prompt):
+        """
+        Generate one candidate with the worker and judge it; returns (response, judgement).
+
+        Candidates are not streamed: their tokens would interleave in token_sink, and losing
+        candidates may still be running after one has been returned.
+        """
+        response_from_worker = self._worker_response(prompt, streamed=False)
+        return response_from_worker, self._judge(client, response_from_worker)
+
+    async def _ajudge_candidate(self, client, worker, prompt):
+        """Async counterpart of _judge_candidate."""
+        response_from_worker = await self._aworker_response(worker, prompt, streamed=False)
+        return response_from_worker, await self._ajudge(client, response_from_worker)
+
+    def _sink_candidate(self, worker, response_from_worker):
+        """Send the chosen candidate to token_sink in one piece, where a single response would have been streamed."""
+        if self.token_sink is not None and _accepts_stream(worker):
+            self.token_sink(response_from_worker)
+
+    def _best_of_candidates(self, client, initial_prompt):
+        """
+        Generate and judge the candidates in parallel threads.
+
+        A candidate whose generation or judging raises counts as rejected.
+
+        Returns:
+        tuple: (response, judgement) of the first accepted candidate, or of the first candidate that
+               did not fail if none is accepted.
+
+        Raises:
+        Exception: The first candidate's error, if every candidate failed.
+        """
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.candidates)
+        try:
+            # Each thread runs in a copy of the caller's context, e.g. the workflow step its tokens belong to
+            futures = {
+                pool.submit(
+                    contextvars.copy_context().run,
+                    self._judge_candidate, client, self._candidate_prompt(initial_prompt, index)
+                ): index
+                for index in range(self.candidates)
+            }
+            outcomes = [None] * self.candidates
+            chosen = None
+            for future in concurrent.futures.as_completed(futures):
+                outcome = outcomes[futures[future]] = self._candidate_outcome(futures[future], future)
+                if not isinstance(outcome, Exception) and outcome[1][0]:
+                    chosen = outcome
+                    break
+            chosen = chosen or self._fallback_candidate(outcomes)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._sink_candidate(self.agent_to_evaluate.respond, chosen[0])
+        return chosen
+
+    async def _abest_of_candidates(self, client, worker, initial_prompt):
+        """
+        Async counterpart of _best_of_candidates; candidates still running once one is accepted
+        are cancelled and awaited.
+        """
+        tasks = {
+            asyncio.ensure_future(self._ajudge_candidate(client, worker, self._candidate_prompt(initial_prompt, index))): index
+            for index in range(self.candidates)
+        }
+        outcomes = [None] * self.candidates
+        chosen = None
+        try:
+            pending = set(tasks)
+            while pending and chosen is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.get):
+                    outcome = outcomes[tasks[task]] = self._candidate_outcome(tasks[task], task)
+                    if chosen is None and not isinstance(outcome, Exception) and outcome[1][0]:
+                        chosen = outcome
+            chosen = chosen or self._fallback_candidate(outcomes)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._sink_candidate(worker, chosen[0])
+        return chosen
+
+    @staticmethod
+    def _candidate_outcome(index, finished):
+        """Return the (response, judgement) of a finished candidate's future or task, or the exception it failed with."""
+        try:
+            return finished.result()
+        except Exception as error:
+            logger.warning("Candidate %d failed and counts as rejected: %s", index + 1, error)
+            return error
+
+    @staticmethod
+    def _fallback_candidate(outcomes):
+        """Return the first candidate outcome that is not an error; if all are, raise the first candidate's error."""
+        for outcome in outcomes:
+            if not isinstance(outcome, Exception):
+                return outcome
+        raise outcomes[0]
+
+    @staticmethod
+    def _refined_prompt(initial_prompt, response_from_worker, instructions):
+        """Build the follow-up prompt sending correction instructions back to the worker."""
+        return (
+            f"The original prompt was: {initial_prompt}\n"
+            f"The response to that prompt was: {response_from_worker}\n"
+            f"It has been evaluated as incorrect.\n"
+            f"Make only these corrections, do not alter content validity: {instructions}"
+        )
+
+    def _resume(self, initial_prompt, history):
+        """
+        Return the state of the loop after the recorded iterations ``history``.
+
+        Returns:
+        tuple: (result, prompt_to_evaluate, previous_response, evaluation, first_iteration), where
+               result is the final result if the recorded loop had already finished, else None.
+        """
+        if not history:
+            return None, initial_prompt, None, None, 0
+        last = history[-1]
+        if last["accepted"] or last.get("unchanged") or last["iteration"] >= self.max_interactions:
+            iterations = last["iteration"] if last["accepted"] or last.get("unchanged") else self.max_interactions
+            return {"final_response": last["response"], "evaluation": last["evaluation"], "iterations": iterations}, None, None, None, None
+        prompt_to_evaluate = self._refined_prompt(initial_prompt, last["response"], last["instructions"])
+        return None, prompt_to_evaluate, last["response"], last["evaluation"], last["iteration"]
+
+    @staticmethod
+    def _record(on_iteration, iteration, response_from_worker, accepted, evaluation, instructions, unchanged=False):
+        """Hand a completed iteration to ``on_iteration``, if given, as a JSON-serializable dict."""
+        if on_iteration is None:
+            return
+        record = {"iteration": iteration, "response": response_from_worker, "accepted": accepted,
+                  "evaluation": evaluation, "instructions": instructions}
+        if unchanged:
+            record["unchanged"] = True
+        on_iteration(record)
+
+    @traced()
+    def evaluate(self, initial_prompt, history=None, on_iteration=None):
+        """
+        This method manages interactions between agents to achieve a solution.
+        It iteratively gets a response from the worker agent, evaluates it, and refines if needed.
+
+        Parameters:
+        initial_prompt (str): The prompt given to the worker agent.
+        history (list): Iterations recorded by ``on_iteration`` in an earlier, interrupted evaluation
+                        of the same prompt, to continue from. Defaults to None (start afresh).
+        on_iteration (callable): Called with a dict describing each iteration once it completes.
+                                 Defaults to None.
+        """
+        client = _openai_client(self.openai_api_key)
+        result, prompt_to_evaluate, previous_response, evaluation, first_iteration = self._resume(initial_prompt, history)
+        if result is not None:
+            logger.info("✅ Evaluation already finished in %d recorded iterations.", result["iterations"])
+            return result
+        if first_iteration:
+            logger.info("Resuming evaluation after %d recorded iterations.", first_iteration)
+
+        if self.candidates > 1 and first_iteration == 0:
+            logger.info("--- Interaction 1: %d candidates in parallel ---", self.candidates)
+            with span("evaluation.iteration", kind="evaluation", iteration=1, candidates=self.candidates) as iteration:
+                response_from_worker, (accepted, evaluation, instructions) = self._best_of_candidates(client, initial_prompt)
+                iteration.set(accepted=accepted)
+            self._record(on_iteration, 1, response_from_worker, accepted, evaluation, instructions)
+            logger.info("Evaluator Agent Evaluation:\n%s", Truncated(evaluation))
+            if accepted:
+                logger.info("✅ Final solution accepted.")
                 return {
                     "final_response": response_from_worker,
                     "evaluation": evaluation,
-                    "iterations": i + 1
+                    "iterations": 1
                 }
-            else:
-                print(" Step 4: Generate instructions to correct the response")
-                instruction_prompt = (
-                    f"Provide instructions to fix an answer based on these reasons why it is incorrect: {evaluation}"
-                )
-                response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    # TODO: 6 - Define the message structure sent to the LLM to generate correction instructions (use temperature=0)
-                    messages=[
-                        {"role": "system", "content": self.persona},
-                        {"role": "user", "content": instruction_prompt}
-                    ],
-                    temperature=0
-                )
-                instructions = response.choices[0].message.content.strip()
-                print(f"Instructions to fix:\n{instructions}")
-
-                print(" Step 5: Send feedback to worker agent for refinement")
-                prompt_to_evaluate = (
-                    f"The original prompt was: {initial_prompt}\n"
-                    f"The response to that prompt was: {response_from_worker}\n"
-                    f"It has been evaluated as incorrect.\n"
-                    f"Make only these corrections, do not alter content validity: {instructions}"
-                )
+            logger.debug("Instructions to fix:\n%s", Truncated(instructions))
+            prompt_to_evaluate = self._refined_prompt(initial_prompt, response_from_worker, instructions)
+            previous_response = response_from_worker
+            first_iteration = 1
+
+        for i in range(first_iteration, self.max_interactions):  # TODO: 2 - Set loop to iterate up to the maximum number of interactions:
+            with span("evaluation.iteration", kind="evaluation", iteration=i + 1) as iteration:
+                logger.info("--- Interaction %d ---", i + 1)
+
+                logger.debug(" Step 1: Worker agent generates a response to the prompt")
+                logger.debug("Prompt:\n%s", Truncated(prompt_to_evaluate))
+                # TODO: 3 - Obtain a response from the worker agent
+                response_from_worker = self._worker_response(prompt_to_evaluate)
+                logger.debug("Worker Agent Response:\n%s", Truncated(response_from_worker))
+
+                if self._unchanged(previous_response, response_from_worker):
+                    iteration.set(unchanged=True)
+                    self._record(on_iteration, i + 1, response_from_worker, False, evaluation, "", unchanged=True)
+                    logger.info("⏹ Response unchanged by the last corrections; stopping early.")
+                    return {
+                        "final_response": response_from_worker,
+                        "evaluation": evaluation,
+                        "iterations": i + 1
+                    }
+
+                accepted, evaluation, instructions = self._judge(client, response_from_worker)
+                iteration.set(accepted=accepted)
+                self._record(on_iteration, i + 1, response_from_worker, accepted, evaluation, instructions)
+                logger.info("Evaluator Agent Evaluation:\n%s", Truncated(evaluation))
+
+                logger.debug(" Step 3: Check if evaluation is positive")
+                if accepted:
+                    logger.info("✅ Final solution accepted.")
+                    # TODO: 7 - Return a dictionary containing the final response, evaluation, and number of iterations
+                    return {
+                        "final_response": response_from_worker,
+                        "evaluation": evaluation,
+                        "iterations": i + 1
+                    }
+                else:
+                    logger.debug("Instructions to fix:\n%s", Truncated(instructions))
+
+                    logger.debug(" Step 5: Send feedback to worker agent for refinement")
+                    prompt_to_evaluate = self._refined_prompt(initial_prompt, response_from_worker, instructions)
+                    previous_response = response_from_worker
         
         # If we've exhausted all iterations without meeting criteria
         return {
@@ -341,12 +1378,92 @@ class EvaluationAgent:
             "iterations": self.max_interactions
         }
 
+    @traced()
+    async def aevaluate(self, initial_prompt, history=None, on_iteration=None):
+        """
+        Async counterpart of evaluate, using AsyncOpenAI.
+
+        The worker's arespond is awaited when it has one; otherwise its respond runs in a worker thread.
+        """
+        client = _async_openai_client(self.openai_api_key)
+        worker = getattr(self.agent_to_evaluate, "arespond", None) or self.agent_to_evaluate.respond
+        result, prompt_to_evaluate, previous_response, evaluation, first_iteration = self._resume(initial_prompt, history)
+        if result is not None:
+            logger.info("✅ Evaluation already finished in %d recorded iterations.", result["iterations"])
+            return result
+        if first_iteration:
+            logger.info("Resuming evaluation after %d recorded iterations.", first_iteration)
+
+        if self.candidates > 1 and first_iteration == 0:
+            logger.info("--- Interaction 1: %d candidates in parallel ---", self.candidates)
+            with span("evaluation.iteration", kind="evaluation", iteration=1, candidates=self.candidates) as iteration:
+                response_from_worker, (accepted, evaluation, instructions) = await self._abest_of_candidates(
+                    client, worker, initial_prompt
+                )
+                iteration.set(accepted=accepted)
+            self._record(on_iteration, 1, response_from_worker, accepted, evaluation, instructions)
+            logger.info("Evaluator Agent Evaluation:\n%s", Truncated(evaluation))
+            if accepted:
+                logger.info("✅ Final solution accepted.")
+                return {
+                    "final_response": response_from_worker,
+                    "evaluation": evaluation,
+                    "iterations": 1
+                }
+            logger.debug("Instructions to fix:\n%s", Truncated(instructions))
+            prompt_to_evaluate = self._refined_prompt(initial_prompt, response_from_worker, instructions)
+            previous_response = response_from_worker
+            first_iteration = 1
+
+        for i in range(first_iteration, self.max_interactions):
+            with span("evaluation.iteration", kind="evaluation", iteration=i + 1) as iteration:
+                logger.info("--- Interaction %d ---", i + 1)
+                response_from_worker = await self._aworker_response(worker, prompt_to_evaluate)
+                logger.debug("Worker Agent Response:\n%s", Truncated(response_from_worker))
+
+                if self._unchanged(previous_response, response_from_worker):
+                    iteration.set(unchanged=True)
+                    self._record(on_iteration, i + 1, response_from_worker, False, evaluation, "", unchanged=True)
+                    logger.info("⏹ Response unchanged by the last corrections; stopping early.")
+                    return {
+                        "final_response": response_from_worker,
+                        "evaluation": evaluation,
+                        "iterations": i + 1
+                    }
+
+                accepted, evaluation, instructions = await self._ajudge(client, response_from_worker)
+                iteration.set(accepted=accepted)
+                self._record(on_iteration, i + 1, response_from_worker, accepted, evaluation, instructions)
+                logger.info("Evaluator Agent Evaluation:\n%s", Truncated(evaluation))
+
+                if accepted:
+                    logger.info("✅ Final solution accepted.")
+                    return {
+                        "final_response": response_from_worker,
+                        "evaluation": evaluation,
+                        "iterations": i + 1
+                    }
+
+                logger.debug("Instructions to fix:\n%s", Truncated(instructions))
+                prompt_to_evaluate = self._refined_prompt(initial_prompt, response_from_worker, instructions)
+                previous_response = response_from_worker
+
+        return {
+            "final_response": response_from_worker,
+            "evaluation": evaluation,
+            "iterations": self.max_interactions
+        }
+
 
 # RoutingAgent class definition
 class RoutingAgent:
     """
     An agent that routes user prompts to the most appropriate specialized agent
     based on semantic similarity between the prompt and agent descriptions.
+
+    Agent descriptions are embedded once and kept as a row-normalized matrix,
+    so each route costs one prompt embedding and one matrix-vector product.
+    The matrix is rebuilt only when the agent list changes.
     """
 
     def __init__(self, openai_api_key, agents=None):
@@ -355,55 +1472,149 @@ class RoutingAgent:
         # TODO: 1 - Define an attribute to hold the agents, call it agents
         self.agents = agents if agents is not None else []
 
+    @property
+    def agents(self):
+        """The registered routes, each a dict with 'name', 'description' and 'func'."""
+        return self._agents
+
+    @agents.setter
+    def agents(self, agents):
+        self._agents = agents
+        self._route_descriptions = None
+        self._route_matrix = None
+
+    def register_agent(self, name, description, func):
+        """Add a route; its description is embedded on the next call to route()."""
+        self._agents.append({"name": name, "description": description, "func": func})
+
     def get_embedding(self, text):
-        """Calculate the embedding of text using OpenAI's embedding model."""
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
+        """Calculate the embedding of text using OpenAI's embedding model (cached)."""
         # TODO: 2 - Write code to calculate the embedding of the text using the text-embedding-3-large model
-        response = client.embeddings.create(
-            model="text-embedding-3-large",
-            input=text,
-            encoding_format="float"
-        )
-        # Extract and return the embedding vector from the response
-        embedding = response.data[0].embedding
-        return embedding
+        return _embedding(self.openai_api_key, text)
+
+    def route_matrix(self):
+        """
+        Returns the unit-normalized description embeddings, one row per agent.
+
+        The matrix is recomputed only if the agent descriptions changed since the last call,
+        which also covers routes appended to the list in place.
+
+        Returns:
+        numpy.ndarray: A (num_agents, dim) float32 matrix.
+        """
+        descriptions = tuple(agent["description"] for agent in self._agents)
+        if self._route_matrix is None or descriptions != self._route_descriptions:
+            # TODO: 5 - Compute the embedding of the agent description
+            matrix = np.array([self.get_embedding(description) for description in descriptions], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self._route_matrix = matrix / norms
+            self._route_descriptions = descriptions
+        return self._route_matrix
+
+    @traced()
+    def select(self, user_input):
+        """
+        Choose the route for the user input without calling it.
+
+        Returns:
+        str: The name of the most similar route, or None if no route can be selected.
+        """
+        if not self._agents:
+            return None
+        best_agent = self._select_agent(self.get_embedding(user_input), self.route_matrix())
+        return best_agent["name"] if best_agent is not None else None
+
+    @traced()
+    async def aselect(self, user_input):
+        """Async counterpart of select."""
+        if not self._agents:
+            return None
+        input_emb = await _aembedding(self.openai_api_key, user_input)
+        route_matrix = await asyncio.to_thread(self.route_matrix)
+        best_agent = self._select_agent(input_emb, route_matrix)
+        return best_agent["name"] if best_agent is not None else None
+
+    def _named_agent(self, agent_name):
+        """Return the route called ``agent_name``."""
+        for agent in self._agents:
+            if agent["name"] == agent_name:
+                current_span().set(route=agent_name)
+                return agent
+        raise ValueError(f"No route named '{agent_name}'")
 
     # TODO: 3 - Define a method to route user prompts to the appropriate agent
-    def route(self, user_input):
+    @traced()
+    def route(self, user_input, context=None, agent_name=None):
         """
         Route the user input to the most appropriate agent based on semantic similarity.
         
         Parameters:
         user_input (str): The user's prompt to be routed.
+        context (str): Extra material, e.g. outputs of earlier workflow steps, appended to the
+                       prompt given to the selected agent but not used to choose it. Defaults to None.
+        agent_name (str): Send the input to this route instead of choosing one, e.g. the
+                          route ``select`` chose earlier. Defaults to None.
         
         Returns:
         The response from the selected agent.
         """
-        # TODO: 4 - Compute the embedding of the user input prompt
-        input_emb = self.get_embedding(user_input)
-        best_agent = None
-        best_score = -1
+        if agent_name is not None:
+            return self._named_agent(agent_name)["func"](self._agent_prompt(user_input, context))
+        if not self._agents:
+            return "Sorry, no suitable agent could be selected."
 
-        for agent in self.agents:
-            # TODO: 5 - Compute the embedding of the agent description
-            agent_emb = self.get_embedding(agent["description"])
-            if agent_emb is None:
-                continue
+        # TODO: 4 - Compute the embedding of the user input prompt
+        best_agent = self._select_agent(self.get_embedding(user_input), self.route_matrix())
+        if best_agent is None:
+            return "Sorry, no suitable agent could be selected."
+        return best_agent["func"](self._agent_prompt(user_input, context))
 
-            # Calculate cosine similarity
-            similarity = np.dot(input_emb, agent_emb) / (np.linalg.norm(input_emb) * np.linalg.norm(agent_emb))
-            print(f"Similarity with {agent['name']}: {similarity:.3f}")
+    @traced()
+    async def aroute(self, user_input, context=None, agent_name=None):
+        """
+        Async counterpart of route.
 
-            # TODO: 6 - Add logic to select the best agent based on the similarity score between the user prompt and the agent descriptions
-            if similarity > best_score:
-                best_score = similarity
-                best_agent = agent
+        The prompt is embedded with AsyncOpenAI. Route functions that are coroutines are
+        awaited; blocking ones run in a worker thread so other routes keep making progress.
+        """
+        if agent_name is not None:
+            return await call_agent(self._named_agent(agent_name)["func"], self._agent_prompt(user_input, context))
+        if not self._agents:
+            return "Sorry, no suitable agent could be selected."
 
+        input_emb = await _aembedding(self.openai_api_key, user_input)
+        route_matrix = await asyncio.to_thread(self.route_matrix)
+        best_agent = self._select_agent(input_emb, route_matrix)
         if best_agent is None:
             return "Sorry, no suitable agent could be selected."
+        return await call_agent(best_agent["func"], self._agent_prompt(user_input, context))
+
+    @staticmethod
+    def _agent_prompt(user_input, context):
+        """Return the prompt handed to the selected agent: the input, followed by the context if any."""
+        return f"{user_input}\n\n{context}" if context else user_input
+
+    def _select_agent(self, input_embedding, route_matrix):
+        """Return the route whose description is most similar to the input, or None for a zero embedding."""
+        input_emb = np.asarray(input_embedding, dtype=np.float32)
+        input_norm = np.linalg.norm(input_emb)
+        if input_norm == 0:
+            return None
+
+        # Cosine similarity against every route at once
+        similarities = route_matrix @ (input_emb / input_norm)
+        if logger.isEnabledFor(logging.DEBUG):
+            for agent, similarity in zip(self._agents, similarities):
+                logger.debug("Similarity with %s: %.3f", agent["name"], similarity)
+
+        # TODO: 6 - Add logic to select the best agent based on the similarity score between the user prompt and the agent descriptions
+        best_index = int(np.argmax(similarities))
+        best_agent, best_score = self._agents[best_index], similarities[best_index]
 
-        print(f"[Router] Best agent: {best_agent['name']} (score={best_score:.3f})")
-        return best_agent["func"](user_input)
+        logger.info("[Router] Best agent: %s (score=%.3f)", best_agent["name"], best_score)
+        current_span().set(route=best_agent["name"], route_score=float(best_score))
+        return best_agent
 
 
 # ActionPlanningAgent class definition
@@ -419,6 +1630,7 @@ class ActionPlanningAgent:
         self.openai_api_key = openai_api_key
         self.knowledge = knowledge
 
+    @traced()
     def extract_steps_from_prompt(self, prompt):
         """
         Extract actionable steps from the user prompt using the agent's knowledge.
@@ -430,8 +1642,31 @@ class ActionPlanningAgent:
         list: A list of actionable steps extracted from the prompt.
         """
         # TODO: 2 - Instantiate the OpenAI client using the provided API key
-        client = OpenAI(base_url="https://openai.vocareum.com/v1", api_key=self.openai_api_key)
-        
+        client = _openai_client(self.openai_api_key)
+        response_text = _chat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=self._messages(prompt),
+            temperature=0
+        )
+
+        # TODO: 4 - Extract the response text from the OpenAI API response
+        return self._parse_steps(response_text)
+
+    @traced()
+    async def aextract_steps_from_prompt(self, prompt):
+        """Async counterpart of extract_steps_from_prompt, using AsyncOpenAI."""
+        client = _async_openai_client(self.openai_api_key)
+        response_text = await _achat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=self._messages(prompt),
+            temperature=0
+        )
+        return self._parse_steps(response_text)
+
+    def _messages(self, prompt):
+        """Build the chat messages: the planning instructions and knowledge, then the prompt."""
         # TODO: 3 - Call the OpenAI API to get a response from the "gpt-3.5-turbo" model.
         # Provide the following system prompt along with the user's prompt:
         # "You are an action planning agent. Using your knowledge, you extract from the user prompt the steps requested to complete the action the user is asking for. You return the steps as a list. Only return the steps in your knowledge. Forget any previous context. This is your knowledge: {pass the knowledge here}"
@@ -440,19 +1675,107 @@ class ActionPlanningAgent:
             f"the steps requested to complete the action the user is asking for. You return the steps as a list. "
             f"Only return the steps in your knowledge. Forget any previous context. This is your knowledge: {self.knowledge}"
         )
-        
-        response = client.chat.completions.create(
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+    @traced()
+    def extract_plan_from_prompt(self, prompt):
+        """
+        Extract a structured plan from the user prompt: the steps, what each one produces and
+        which earlier steps it needs the output of.
+
+        Parameters:
+        prompt (str): The user's prompt describing a task.
+
+        Returns:
+        list: One dict per step with 'id', 'text', 'depends_on' (list of step ids) and 'artifact'.
+        """
+        client = _openai_client(self.openai_api_key)
+        response_text = _chat_completion(
+            client,
             model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0
+            messages=self._plan_messages(prompt),
+            temperature=0,
+            response_format={"type": "json_object"}
         )
+        return self._parse_plan(response_text)
+
+    @traced()
+    async def aextract_plan_from_prompt(self, prompt):
+        """Async counterpart of extract_plan_from_prompt, using AsyncOpenAI."""
+        client = _async_openai_client(self.openai_api_key)
+        response_text = await _achat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=self._plan_messages(prompt),
+            temperature=0,
+            response_format={"type": "json_object"}
+        )
+        return self._parse_plan(response_text)
 
-        # TODO: 4 - Extract the response text from the OpenAI API response
-        response_text = response.choices[0].message.content
+    def _plan_messages(self, prompt):
+        """Build the chat messages asking for the plan as JSON."""
+        system_prompt = (
+            f"You are an action planning agent. Using your knowledge, you extract from the user prompt "
+            f"the steps requested to complete the action the user is asking for. Only return the steps in your knowledge. "
+            f"Return a JSON object of the form "
+            f'{{"steps": [{{"id": "1", "text": "the step", "depends_on": ["ids of earlier steps whose output this step needs"], '
+            f'"artifact": "short name of what this step produces"}}]}}. '
+            f"List the steps in an order where every step comes after the steps it depends on. "
+            f"Forget any previous context. This is your knowledge: {self.knowledge}"
+        )
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+    @classmethod
+    def _parse_plan(cls, response_text):
+        """
+        Turn the LLM's JSON plan into a list of step dicts.
+
+        Dependencies on unknown or later steps are dropped, which keeps the plan acyclic.
+        If the answer is not a JSON plan, its lines are used as steps that each depend on
+        the previous one, i.e. the plan runs in sequence.
+        """
+        try:
+            parsed = json.loads(response_text)
+            raw_steps = parsed.get("steps") if isinstance(parsed, dict) else parsed
+            if not isinstance(raw_steps, list) or not all(isinstance(step, dict) for step in raw_steps):
+                raise ValueError("no list of steps")
+        except ValueError:
+            steps = cls._parse_steps(response_text)
+            return [
+                {"id": str(i), "text": text, "depends_on": [str(i - 1)] if i > 1 else [], "artifact": f"step {i} output"}
+                for i, text in enumerate(steps, 1)
+            ]
+
+        plan, seen = [], set()
+        for i, raw_step in enumerate(raw_steps, 1):
+            text = str(raw_step.get("text", "")).strip()
+            if not text:
+                continue
+            step_id = str(raw_step.get("id", i))
+            if step_id in seen:
+                step_id = f"{step_id}-{i}"
+            depends_on = raw_step.get("depends_on") or []
+            if not isinstance(depends_on, list):
+                depends_on = [depends_on]
+            depends_on = list(dict.fromkeys(str(dependency) for dependency in depends_on if str(dependency) in seen))
+            plan.append({
+                "id": step_id,
+                "text": text,
+                "depends_on": depends_on,
+                "artifact": str(raw_step.get("artifact") or f"step {step_id} output"),
+            })
+            seen.add(step_id)
+        return plan
 
+    @staticmethod
+    def _parse_steps(response_text):
+        """Split the LLM's answer into a list of non-empty steps."""
         # TODO: 5 - Clean and format the extracted steps by removing empty lines and unwanted text
         steps = response_text.split("\n")
         # Clean up the steps by removing empty lines and numbering
@@ -0,0 +1,211 @@
+"""
+Opt-in cache of deterministic chat completions for the agents in ``base_agents``.
+
+Every agent asks for completions with ``temperature=0`` and fixed system prompts,
+so the same (model, messages, parameters) request is sent again on every workflow
+run. When enabled, answers are keyed by a SHA-256 of the canonical JSON of the
+request and kept in two tiers: a bounded in-memory LRU and an optional SQLite
+file that survives restarts. Entries can expire after a TTL, and the SQLite tier
+can be capped at a number of entries, dropping the least recently used ones.
+
+The cache is off unless ``configure_completion_cache`` is called or the
+``COMPLETION_CACHE_PATH`` environment variable names a SQLite file.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+DEFAULT_MAX_MEMORY_ENTRIES = 1000
+
+
+def completion_key(params):
+    """Return the content hash identifying a chat completion request (model, messages and parameters)."""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    A two-tier (memory LRU + SQLite) store of chat completion texts.
+
+    Lookups check memory first, then disk; disk hits are promoted into memory.
+    Passing ``path=None`` gives a memory-only cache.
+    """
+
+    def __init__(self, path=None, max_memory_entries=DEFAULT_MAX_MEMORY_ENTRIES, max_disk_entries=None, ttl=None):
+        """
+        Initializes the cache.
+
+        Parameters:
+        path (str): SQLite file for the persistent tier, or None for memory only.
+        max_memory_entries (int): Number of completions kept in the in-memory LRU. Defaults to 1000.
+        max_disk_entries (int): Maximum completions kept in the SQLite tier. Defaults to None (unbounded).
+        ttl (float): Seconds after which an entry expires. Defaults to None (never).
+        """
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _db(self):
+        """Open the SQLite tier on first use."""
+        if self._connection is None and self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, content TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS completions_accessed_at ON completions (accessed_at)"
+            )
+            self._connection.commit()
+        return self._connection
+
+    def _expired(self, created_at, now):
+        """Return whether an entry created at ``created_at`` has outlived the TTL."""
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _remember(self, key, content, created_at):
+        """Insert into the memory tier, evicting the least recently used entries."""
+        self._memory[key] = (content, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, params):
+        """
+        Looks up a cached completion.
+
+        Parameters:
+        params (dict): The request parameters, including 'model' and 'messages'.
+
+        Returns:
+        str: The completion text, or None on a miss or an expired entry.
+        """
+        key = completion_key(params)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1], now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._memory[key]
+
+            db = self._db()
+            row = None
+            if db is not None:
+                row = db.execute("SELECT content, created_at FROM completions WHERE key = ?", (key,)).fetchone()
+                if row is not None and self._expired(row[1], now):
+                    db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                    db.commit()
+                    row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            db.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+            db.commit()
+            self._remember(key, row[0], row[1])
+            self.hits += 1
+            return row[0]
+
+    def put(self, params, content):
+        """
+        Stores a completion in both tiers.
+
+        Parameters:
+        params (dict): The request parameters, including 'model' and 'messages'.
+        content (str): The completion text.
+        """
+        key = completion_key(params)
+        now = time.time()
+        with self._lock:
+            self._remember(key, content, now)
+            db = self._db()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO completions (key, model, content, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, str(params.get("model", "")), content, now, now),
+                )
+                if self.max_disk_entries is not None:
+                    db.execute(
+                        "DELETE FROM completions WHERE key IN ("
+                        "SELECT key FROM completions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_disk_entries,),
+                    )
+                db.commit()
+
+    def stats(self):
+        """
+        Reports the cache's effectiveness.
+
+        Returns:
+        dict: 'hits', 'misses', 'hit_rate' and the number of 'memory_entries'.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            db = self._db()
+            if db is not None:
+                db.execute("DELETE FROM completions")
+                db.commit()
+
+    def close(self):
+        """Close the SQLite connection. The memory tier is kept."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __len__(self):
+        return len(self._memory)
+
+
+_shared_cache = CompletionCache(os.environ["COMPLETION_CACHE_PATH"]) if os.getenv("COMPLETION_CACHE_PATH") else None
+
+
+def get_completion_cache():
+    """Return the process-wide completion cache, or None when caching is disabled."""
+    return _shared_cache
+
+
+def configure_completion_cache(path=None, max_memory_entries=DEFAULT_MAX_MEMORY_ENTRIES, max_disk_entries=None,
+                               ttl=None, enabled=True):
+    """
+    Enable the process-wide completion cache with the given settings, or disable it with ``enabled=False``.
+
+    The previous cache's database connection is closed.
+    """
+    global _shared_cache
+    previous = _shared_cache
+    _shared_cache = CompletionCache(path, max_memory_entries, max_disk_entries, ttl) if enabled else None
+    if previous is not None:
+        previous.close()
+    return _shared_cache
@@ -0,0 +1,365 @@
+"""
+Concurrent executor for workflow steps.
+
+``WorkflowExecutor`` sends every step of a plan through one handler, typically
+``RoutingAgent.aroute``, on a single event loop. A step starts as soon as the
+steps it depends on have finished, and at most ``max_concurrency`` steps run at
+once, so the wall-clock time of a plan approaches the time of its longest
+dependency chain rather than the sum of all its steps.
+
+``run_plan`` schedules a structured plan, as returned by
+``ActionPlanningAgent.extract_plan_from_prompt``, as a DAG: each step receives
+the artifacts of the steps it depends on, and the run reports its critical path.
+With a ``run_store`` (see ``run_store.py``) every finished step's result is saved
+at once, and steps whose result is already stored are not run again, so an
+interrupted plan can be resumed.
+
+While a step runs, ``current_step`` holds its id (its 1-based position for
+``run``), so output streamed by agents, e.g. into a ``LineSink``, can be
+attributed to the step that produced it. Each step also runs in a 'workflow.step'
+tracing span, which the spans of its agent and API calls inherit the step from.
+"""
+
+import asyncio
+import contextvars
+import inspect
+import threading
+import time
+
+from .clients import aclose_shared_clients
+from .tracing import span
+
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+current_step = contextvars.ContextVar("current_step", default=None)
+
+
+async def call_agent(func, *args):
+    """Run an agent callable from async code: coroutines are awaited, blocking calls go to a worker thread."""
+    if inspect.iscoroutinefunction(func):
+        return await func(*args)
+    result = await asyncio.to_thread(func, *args)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def _check_dependencies(dependencies, count):
+    """Validate a {step index: prerequisite indices} mapping and return it with tuple values."""
+    checked = {}
+    for step, prerequisites in (dependencies or {}).items():
+        prerequisites = tuple(prerequisites)
+        for prerequisite in (step, *prerequisites):
+            if not 0 <= prerequisite < count:
+                raise ValueError(f"Dependency refers to unknown step {prerequisite}")
+        checked[step] = prerequisites
+
+    # Depth-first search for cycles, which would otherwise wait forever
+    state = {}
+    for root in checked:
+        stack = [(root, iter(checked[root]))]
+        state[root] = "visiting"
+        while stack:
+            step, prerequisites = stack[-1]
+            prerequisite = next(prerequisites, None)
+            if prerequisite is None:
+                state[step] = "done"
+                stack.pop()
+            elif state.get(prerequisite) == "visiting":
+                raise ValueError(f"Dependency cycle through step {prerequisite}")
+            elif prerequisite not in state:
+                state[prerequisite] = "visiting"
+                stack.append((prerequisite, iter(checked.get(prerequisite, ()))))
+    return checked
+
+
+def plan_dependencies(plan):
+    """
+    Converts the 'depends_on' step ids of a plan into a {step index: prerequisite indices} mapping.
+
+    Parameters:
+    plan (list): Step dicts with 'id' and 'depends_on'.
+
+    Returns:
+    dict: The dependencies, as accepted by ``WorkflowExecutor.arun``.
+    """
+    index_of = {}
+    for index, step in enumerate(plan):
+        if step["id"] in index_of:
+            raise ValueError(f"Duplicate step id {step['id']!r}")
+        index_of[step["id"]] = index
+
+    dependencies = {}
+    for index, step in enumerate(plan):
+        prerequisites = []
+        for step_id in step.get("depends_on", ()):
+            if step_id not in index_of:
+                raise ValueError(f"Step {step['id']!r} depends on unknown step {step_id!r}")
+            prerequisites.append(index_of[step_id])
+        if prerequisites:
+            dependencies[index] = prerequisites
+    return dependencies
+
+
+def critical_path(plan, durations):
+    """
+    Finds the longest chain of dependent steps, weighted by how long each step took.
+
+    Parameters:
+    plan (list): Step dicts with 'id' and 'depends_on'.
+    durations (dict): Seconds taken by each step, keyed by step id.
+
+    Returns:
+    tuple: (list of step ids along the path, total seconds).
+    """
+    dependencies = _check_dependencies(plan_dependencies(plan), len(plan))
+    finish, previous = {}, {}
+    for index in _topological_order(len(plan), dependencies):
+        best = max(dependencies.get(index, ()), key=finish.get, default=None)
+        previous[index] = best
+        finish[index] = durations.get(plan[index]["id"], 0.0) + (finish[best] if best is not None else 0.0)
+    if not finish:
+        return [], 0.0
+
+    end = max(finish, key=finish.get)
+    total, path = finish[end], []
+    while end is not None:
+        path.append(plan[end]["id"])
+        end = previous[end]
+    return path[::-1], total
+
+
+def _topological_order(count, dependencies):
+    """Return the step indices ordered so that every step comes after its prerequisites."""
+    order, placed = [], set()
+    for root in range(count):
+        stack = [root]
+        while stack:
+            index = stack[-1]
+            if index in placed:
+                stack.pop()
+                continue
+            pending = [p for p in dependencies.get(index, ()) if p not in placed]
+            if pending:
+                stack.extend(pending)
+            else:
+                stack.pop()
+                placed.add(index)
+                order.append(index)
+    return order
+
+
+def format_step_inputs(inputs):
+    """
+    Formats the artifacts handed to a plan step as text for an agent prompt.
+
+    Parameters:
+    inputs (dict): Upstream results keyed by artifact name.
+
+    Returns:
+    str: One titled section per artifact, or an empty string if there are none.
+    """
+    return "\n\n".join(f"### {artifact}\n{result}" for artifact, result in inputs.items())
+
+
+class LineSink:
+    """
+    A token sink that writes streamed text line by line, prefixed with the step producing it.
+
+    Tokens from concurrently running steps are buffered per step until a line is
+    complete, so lines from different steps never interleave mid-line.
+    """
+
+    def __init__(self, write=print):
+        """
+        Initializes the sink.
+
+        Parameters:
+        write (callable): Called with each complete, prefixed line. Defaults to print.
+        """
+        self.write = write
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _prefix(step):
+        return f"[step {step}] " if step is not None else ""
+
+    def __call__(self, token):
+        """Buffer a piece of streamed text for the current step, writing out any completed lines."""
+        step = current_step.get()
+        with self._lock:
+            *lines, self._buffers[step] = (self._buffers.get(step, "") + token).split("\n")
+            for line in lines:
+                self.write(self._prefix(step) + line)
+
+    def flush(self):
+        """Write out the unfinished last line of every step."""
+        with self._lock:
+            for step, rest in self._buffers.items():
+                if rest:
+                    self.write(self._prefix(step) + rest)
+            self._buffers.clear()
+
+
+class WorkflowExecutor:
+    """
+    Runs workflow steps concurrently under a concurrency limit.
+    """
+
+    def __init__(self, handler, max_concurrency=DEFAULT_MAX_CONCURRENCY, run_store=None):
+        """
+        Initializes the executor.
+
+        Parameters:
+        handler (callable): Called with each step; may be a coroutine function or a blocking function.
+        max_concurrency (int): Maximum number of steps running at once. Defaults to 4.
+        run_store (RunStore): Where ``run_plan`` saves each step's result and finds those of
+                              steps finished in an earlier run. Defaults to None.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.run_store = run_store
+
+    async def _execute(self, count, dependencies, call):
+        """
+        Schedules ``call(index, prerequisite_results)`` for every step index under the concurrency limit.
+
+        If a step fails, the steps still running are cancelled and the error is raised.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = []
+
+        async def run_step(index):
+            prerequisites = dependencies.get(index, ())
+            upstream = await asyncio.gather(*(tasks[prerequisite] for prerequisite in prerequisites))
+            async with semaphore:
+                return await call(index, upstream)
+
+        # Every task is created before any of them runs, so prerequisites can be looked up by index
+        tasks.extend(asyncio.ensure_future(run_step(index)) for index in range(count))
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def arun(self, steps, dependencies=None):
+        """
+        Runs every step, starting each one once its prerequisites have finished.
+
+        If a step fails, the steps still running are cancelled and the error is raised.
+
+        Parameters:
+        steps (list): The steps to run.
+        dependencies (dict): Maps a step index to the indices of the steps it must wait for.
+                             Defaults to None (all steps are independent).
+
+        Returns:
+        list: The handler's result for each step, in step order.
+        """
+        steps = list(steps)
+        dependencies = _check_dependencies(dependencies, len(steps))
+
+        async def call(index, upstream):
+            current_step.set(index + 1)
+            with span("workflow.step", kind="step", step=index + 1):
+                return await call_agent(self.handler, steps[index])
+
+        return await self._execute(len(steps), dependencies, call)
+
+    async def arun_plan(self, plan):
+        """
+        Runs a structured plan as a DAG.
+
+        Each step is passed to the handler together with the results of the steps it
+        depends on, as ``handler(step, inputs)`` where ``inputs`` maps each upstream
+        step's 'artifact' to its result. Independent steps run concurrently.
+
+        Parameters:
+        plan (list): Step dicts with 'id', 'text', 'depends_on' and 'artifact'.
+
+        Returns:
+        dict: 'results' and 'durations' (seconds) keyed by step id, the 'critical_path'
+              step ids with their total 'critical_path_seconds', 'elapsed_seconds', and the
+              ids of the steps whose stored results were reused as 'resumed'.
+        """
+        plan = list(plan)
+        dependencies = _check_dependencies(plan_dependencies(plan), len(plan))
+        durations = {}
+        resumed = []
+
+        async def call(index, upstream):
+            step = plan[index]
+            saved = self.run_store.step_result(step["id"]) if self.run_store is not None else None
+            if saved is not None:
+                durations[step["id"]] = saved.get("duration") or 0.0
+                resumed.append(step["id"])
+                return saved["result"]
+            inputs = {
+                plan[prerequisite].get("artifact") or plan[prerequisite]["id"]: result
+                for prerequisite, result in zip(dependencies.get(index, ()), upstream)
+            }
+            current_step.set(step["id"])
+            started = time.perf_counter()
+            with span("workflow.step", kind="step", step=step["id"], artifact=step.get("artifact")):
+                result = await call_agent(self.handler, step, inputs)
+            durations[step["id"]] = time.perf_counter() - started
+            if self.run_store is not None:
+                self.run_store.save_step_result(step["id"], result, durations[step["id"]])
+            return result
+
+        started = time.perf_counter()
+        results = await self._execute(len(plan), dependencies, call)
+        elapsed = time.perf_counter() - started
+        path, path_seconds = critical_path(plan, durations)
+        return {
+            "results": {step["id"]: result for step, result in zip(plan, results)},
+            "durations": durations,
+            "critical_path": path,
+            "critical_path_seconds": path_seconds,
+            "elapsed_seconds": elapsed,
+            "resumed": [step["id"] for step in plan if step["id"] in resumed],
+        }
+
+    def run(self, steps, dependencies=None):
+        """
+        Runs ``arun`` on a new event loop and closes the async API clients it opened.
+
+        Parameters:
+        steps (list): The steps to run.
+        dependencies (dict): Maps a step index to the indices of the steps it must wait for.
+                             Defaults to None (all steps are independent).
+
+        Returns:
+        list: The handler's result for each step, in step order.
+        """
+        return self._run_in_new_loop(self.arun(steps, dependencies))
+
+    def run_plan(self, plan):
+        """
+        Runs ``arun_plan`` on a new event loop and closes the async API clients it opened.
+
+        Parameters:
+        plan (list): Step dicts with 'id', 'text', 'depends_on' and 'artifact'.
+
+        Returns:
+        dict: The run report described in ``arun_plan``.
+        """
+        return self._run_in_new_loop(self.arun_plan(plan))
+
+    @staticmethod
+    def _run_in_new_loop(coroutine):
+        """Run ``coroutine`` with ``asyncio.run``, closing the pooled async clients of that loop afterwards."""
+        async def main():
+            try:
+                return await coroutine
+            finally:
+                await aclose_shared_clients(scope=asyncio.get_running_loop())
+
+        return asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Logging for the agents and the workflow.
+
+The agents log through the standard ``logging`` module, under the
+``workflow_agents`` logger, instead of printing. Messages take %-style
+arguments, so nothing is formatted unless a record is emitted, and long texts
+such as prompts and responses are wrapped in ``Truncated``, which shortens them
+only at that point.
+
+Nothing is shown until ``configure_logging`` attaches a handler. INFO shows
+evaluation progress and routing decisions, DEBUG adds prompts, worker responses
+and similarity scores, and WARNING is a quiet mode in which the agents build no
+log strings at all.
+"""
+
+import logging
+import sys
+
+
+LOGGER_NAME = "workflow_agents"
+DEFAULT_MAX_CHARS = 500
+
+_max_chars = None
+
+
+class Truncated:
+    """
+    A log argument that renders a text cut to a maximum length.
+
+    The text is only converted and cut when the record is formatted, i.e. never for
+    records below the logger's level.
+    """
+
+    __slots__ = ("text", "limit")
+
+    def __init__(self, text, limit=None):
+        """
+        Initializes the wrapper.
+
+        Parameters:
+        text (str): The text to log.
+        limit (int): Maximum characters shown. Defaults to None (the limit set by configure_logging).
+        """
+        self.text = text
+        self.limit = limit
+
+    def __str__(self):
+        text = str(self.text)
+        limit = self.limit if self.limit is not None else _max_chars
+        if limit is None or len(text) <= limit:
+            return text
+        return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+
+def configure_logging(level=logging.INFO, max_chars=DEFAULT_MAX_CHARS, stream=None, fmt="%(message)s"):
+    """
+    Shows the agents' log records on a stream.
+
+    Calling it again replaces the handler it added before, so the level or stream can be changed.
+
+    Parameters:
+    level (int or str): Lowest level shown, e.g. logging.DEBUG or 'WARNING'. Defaults to INFO.
+    max_chars (int): Length texts wrapped in Truncated are cut to, or None for no limit. Defaults to 500.
+    stream (file): Where records are written. Defaults to sys.stdout.
+    fmt (str): logging.Formatter format of each record. Defaults to the bare message.
+
+    Returns:
+    logging.Logger: The ``workflow_agents`` logger.
+    """
+    global _max_chars
+    reset_logging()
+    _max_chars = max_chars
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter(fmt))
+    handler._configured_by_workflow_agents = True
+    logger.addHandler(handler)
+    # The handler above is the output; don't repeat records through the root logger
+    logger.propagate = False
+    return logger
+
+
+def reset_logging():
+    """Undo ``configure_logging``: remove its handler and restore the logger's defaults."""
+    global _max_chars
+    _max_chars = None
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        if getattr(handler, "_configured_by_workflow_agents", False):
+            logger.removeHandler(handler)
+    logger.setLevel(logging.NOTSET)
+    logger.propagate = True
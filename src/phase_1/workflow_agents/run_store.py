@@ -0,0 +1,195 @@
+"""
+Checkpoints of workflow runs, so that an interrupted run can be resumed.
+
+A ``RunStore`` keeps one run in its own directory under a root directory:
+
+    <root>/<run_id>/run.json                      run metadata and status
+    <root>/<run_id>/plan.json                     the action plan
+    <root>/<run_id>/steps/<step>/route.json       the agent the step was routed to
+    <root>/<run_id>/steps/<step>/iterations.jsonl one line per evaluation iteration
+    <root>/<run_id>/steps/<step>/result.json      the step's final output
+    <root>/<run_id>/outputs.json                  the outputs of the whole run
+
+Everything is written as soon as it is known: JSON files are replaced
+atomically, and iterations are appended and flushed line by line, so a run
+killed at any point leaves a readable store. Resuming the run reuses the plan,
+skips the steps that have a result, sends unfinished steps to the agent they
+were routed to, and continues their evaluation loops after the last recorded
+iteration.
+"""
+
+import json
+import os
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+
+
+DEFAULT_RUNS_DIR = ".workflow_runs"
+
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _write_json(path, value):
+    """Write ``value`` as JSON to ``path`` atomically: readers see the old file or the new one, never a partial one."""
+    temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temporary, "w", encoding="utf-8") as output_file:
+        json.dump(value, output_file, ensure_ascii=False, indent=2)
+    os.replace(temporary, path)
+
+
+def _read_json(path):
+    """Return the JSON value stored at ``path``, or None if there is none."""
+    try:
+        with open(path, encoding="utf-8") as input_file:
+            return json.load(input_file)
+    except FileNotFoundError:
+        return None
+
+
+class RunStore:
+    """
+    The checkpoints of one workflow run.
+
+    Use ``create`` to start a new run and ``open`` to resume an existing one.
+    All methods are thread-safe.
+    """
+
+    def __init__(self, root, run_id):
+        """
+        Initializes the store of run ``run_id`` under ``root``; the directory must exist.
+
+        Parameters:
+        root (str): Directory holding all runs.
+        run_id (str): Identifier of the run.
+        """
+        self.root = root
+        self.run_id = run_id
+        self.path = os.path.join(root, run_id)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, root=DEFAULT_RUNS_DIR, run_id=None, **metadata):
+        """
+        Starts a new run.
+
+        Parameters:
+        root (str): Directory holding all runs. Defaults to '.workflow_runs'.
+        run_id (str): Identifier of the run. Defaults to a new one based on the current time.
+        **metadata: Extra fields stored in run.json, e.g. the workflow prompt.
+
+        Returns:
+        RunStore: The store of the new run.
+        """
+        run_id = run_id or f"{datetime.now(timezone.utc):%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        store = cls(root, run_id)
+        os.makedirs(os.path.join(store.path, "steps"))
+        _write_json(os.path.join(store.path, "run.json"),
+                    dict(metadata, run_id=run_id, status="running", created_at=_now(), updated_at=_now()))
+        return store
+
+    @classmethod
+    def open(cls, run_id, root=DEFAULT_RUNS_DIR):
+        """
+        Opens an existing run to resume it.
+
+        Parameters:
+        run_id (str): Identifier of the run.
+        root (str): Directory holding all runs. Defaults to '.workflow_runs'.
+
+        Returns:
+        RunStore: The store of the run.
+
+        Raises:
+        FileNotFoundError: If there is no such run.
+        """
+        store = cls(root, run_id)
+        if not os.path.exists(os.path.join(store.path, "run.json")):
+            raise FileNotFoundError(f"No workflow run '{run_id}' in {root}")
+        return store
+
+    def _step_path(self, step_id, name, create=False):
+        directory = os.path.join(self.path, "steps", _UNSAFE_NAME.sub("_", str(step_id)))
+        if create:
+            os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, name)
+
+    @property
+    def metadata(self):
+        """The contents of run.json."""
+        return _read_json(os.path.join(self.path, "run.json"))
+
+    def update(self, **fields):
+        """Set fields of run.json, e.g. ``status='failed'``."""
+        with self._lock:
+            metadata = self.metadata
+            metadata.update(fields, updated_at=_now())
+            _write_json(os.path.join(self.path, "run.json"), metadata)
+
+    def save_plan(self, plan):
+        """Store the action plan."""
+        _write_json(os.path.join(self.path, "plan.json"), plan)
+
+    def load_plan(self):
+        """Return the stored action plan, or None if planning did not finish."""
+        return _read_json(os.path.join(self.path, "plan.json"))
+
+    def save_route(self, step_id, agent_name):
+        """Store the name of the agent ``step_id`` was routed to."""
+        _write_json(self._step_path(step_id, "route.json", create=True), {"agent": agent_name, "saved_at": _now()})
+
+    def route(self, step_id):
+        """Return the name of the agent ``step_id`` was routed to, or None."""
+        saved = _read_json(self._step_path(step_id, "route.json"))
+        return saved["agent"] if saved else None
+
+    def record_iteration(self, step_id, iteration):
+        """Append one evaluation iteration of ``step_id`` (a JSON-serializable dict)."""
+        line = json.dumps(dict(iteration, saved_at=_now()), ensure_ascii=False)
+        path = self._step_path(step_id, "iterations.jsonl", create=True)
+        with self._lock:
+            # Start on a new line if a crash cut the last one short
+            if os.path.exists(path) and os.path.getsize(path):
+                with open(path, "rb") as input_file:
+                    input_file.seek(-1, os.SEEK_END)
+                    line = line if input_file.read(1) == b"\n" else "\n" + line
+            with open(path, "a", encoding="utf-8") as output_file:
+                output_file.write(line + "\n")
+                output_file.flush()
+                os.fsync(output_file.fileno())
+
+    def iterations(self, step_id):
+        """Return the recorded evaluation iterations of ``step_id``, oldest first."""
+        iterations = []
+        try:
+            with open(self._step_path(step_id, "iterations.jsonl"), encoding="utf-8") as input_file:
+                for line in input_file:
+                    try:
+                        iterations.append(json.loads(line))
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+        except FileNotFoundError:
+            pass
+        return iterations
+
+    def save_step_result(self, step_id, result, duration=None):
+        """Store the final output of ``step_id`` and how many seconds it took."""
+        _write_json(self._step_path(step_id, "result.json", create=True), {"result": result, "duration": duration, "saved_at": _now()})
+
+    def step_result(self, step_id):
+        """Return the stored {'result', 'duration'} of ``step_id``, or None if the step did not finish."""
+        return _read_json(self._step_path(step_id, "result.json"))
+
+    def save_outputs(self, outputs):
+        """Store the outputs of the whole run."""
+        _write_json(os.path.join(self.path, "outputs.json"), outputs)
+
+    def load_outputs(self):
+        """Return the stored outputs of the run, or None if it did not complete."""
+        return _read_json(os.path.join(self.path, "outputs.json"))
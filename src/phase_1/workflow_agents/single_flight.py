@@ -0,0 +1,138 @@
+"""
+Coalescing of identical API requests that are in flight at the same time.
+
+When concurrent workflow steps embed the same text or send the same
+deterministic chat completion, the caches in ``embedding_cache`` and
+``completion_cache`` only help once the first request has finished; until then
+every caller would send its own copy. ``SingleFlight`` lets the first caller of
+a key (the leader) make the request while later callers of the same key wait
+for, and share, its result or exception. Nothing is kept once the request has
+finished, so no cache needs to be configured.
+
+Blocking and async callers are coalesced separately: a blocking follower of an
+async leader could block the very event loop the leader runs on.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+
+
+class SingleFlight:
+    """
+    A thread-safe table of in-flight calls keyed by request.
+
+    Followers wait on the leader's ``concurrent.futures.Future``, so calls can
+    be shared across threads and event loops. If the leader is cancelled, a
+    waiting follower takes over and makes the call itself.
+    """
+
+    def __init__(self, enabled=True):
+        """
+        Initializes the table.
+
+        Parameters:
+        enabled (bool): False makes every caller run its own call. Defaults to True.
+        """
+        self.enabled = enabled
+        self.calls = 0
+        self.shared = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        """Return (future, whether the caller leads) for ``key``, registering a new call if none is in flight."""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = concurrent.futures.Future()
+            self._in_flight[key] = future
+            self.calls += 1
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            del self._in_flight[key]
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, (asyncio.CancelledError, concurrent.futures.CancelledError)):
+            future.cancel()
+        else:
+            future.set_exception(error)
+
+    def do(self, key, func):
+        """
+        Calls ``func``, unless a call of ``key`` is already in flight, whose result is then shared.
+
+        Parameters:
+        key (hashable): Identifies the request, or None to never coalesce it.
+        func (callable): Makes the request.
+
+        Returns:
+        tuple: (result, whether it was shared from another caller's call).
+        """
+        if key is None or not self.enabled:
+            return func(), False
+        key = ("sync", key)
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return future.result(), True
+                except concurrent.futures.CancelledError:
+                    continue
+            try:
+                result = func()
+            except BaseException as error:
+                self._finish(key, future, error=error)
+                raise
+            self._finish(key, future, result)
+            return result, False
+
+    async def ado(self, key, func):
+        """Async counterpart of ``do``; ``func`` returns an awaitable of the result."""
+        if key is None or not self.enabled:
+            return await func(), False
+        key = ("async", key)
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    # Shielded, so that cancelling this follower leaves the shared call running
+                    return await asyncio.shield(asyncio.wrap_future(future)), True
+                except asyncio.CancelledError:
+                    if future.cancelled():
+                        continue
+                    raise
+            try:
+                result = await func()
+            except BaseException as error:
+                self._finish(key, future, error=error)
+                raise
+            self._finish(key, future, result)
+            return result, False
+
+
+_shared_flight = SingleFlight()
+
+
+def get_single_flight():
+    """Return the process-wide table of in-flight API calls."""
+    return _shared_flight
+
+
+def configure_single_flight(enabled=True):
+    """
+    Replace the process-wide table of in-flight API calls.
+
+    Parameters:
+    enabled (bool): False turns coalescing off. Defaults to True.
+
+    Returns:
+    SingleFlight: The new table.
+    """
+    global _shared_flight
+    _shared_flight = SingleFlight(enabled)
+    return _shared_flight
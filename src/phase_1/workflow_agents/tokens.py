@@ -0,0 +1,47 @@
+"""
+Token counting helpers used to size requests and prompts.
+
+``tiktoken`` gives exact counts when it is installed. Without it, counts fall back
+to the usual ~4 characters per token estimate, which is close enough for
+budgeting batches and prompts.
+"""
+
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    """Return the tiktoken encoding for ``model``, or None if unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    """
+    Counts (or estimates) the tokens in a piece of text.
+
+    Parameters:
+    text (str): Text to measure.
+    model (str): Model whose tokenizer should be used.
+
+    Returns:
+    int: Number of tokens.
+    """
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
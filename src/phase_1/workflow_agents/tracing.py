@@ -0,0 +1,279 @@
+"""
+Structured tracing for agents and workflows.
+
+Every LLM call, embedding call, agent method, route decision, evaluation
+iteration and workflow step runs inside a span that records its duration and
+attributes such as model, token counts and cache hits. Spans nest: each one
+knows its parent and inherits the workflow 'step' and 'agent' it runs under, so
+a run can be broken down by step or by agent.
+
+Tracing is off until ``configure_tracing`` is given one or more exporters; while
+it is off, ``span`` returns a shared no-op span and costs next to nothing.
+Exporters are objects with an ``export(span)`` method (and optionally ``close()``):
+``InMemoryExporter`` keeps spans in a list, ``JsonlExporter`` appends them to a
+file, and ``SummaryExporter`` prints a per-run table of where time and tokens went.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+
+# Span kinds whose time is spent waiting on the API; summaries add up their durations
+API_KINDS = ("llm", "embedding")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_exporters = []
+
+
+class Span:
+    """
+    One timed operation with its attributes.
+
+    'step' and 'agent' are inherited from the parent span unless given explicitly.
+    """
+
+    recording = True
+
+    def __init__(self, name, kind, parent=None, **attributes):
+        self.name = name
+        self.kind = kind
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.step = attributes.pop("step", parent.step if parent is not None else None)
+        self.agent = attributes.pop("agent", parent.agent if parent is not None else None)
+        self.attributes = attributes
+        self.error = None
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes):
+        """Add or update attributes of the span."""
+        self.attributes.update(attributes)
+
+    def _finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self):
+        """Return the span as a JSON-serializable dict."""
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "trace_id": self.trace_id,
+            "step": self.step,
+            "agent": self.agent,
+            "started_at": self.started_at,
+            "duration_seconds": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stand-in yielded while tracing is off."""
+
+    recording = False
+    step = agent = None
+    attributes = {}
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+@contextmanager
+def span(name, kind="internal", activate=True, parent=None, **attributes):
+    """
+    Times the enclosed block as a child of the current span.
+
+    Parameters:
+    name (str): What the span measures, e.g. 'chat.completion'.
+    kind (str): Category used in summaries, e.g. 'llm', 'embedding', 'agent', 'step'. Defaults to 'internal'.
+    activate (bool): Make the span the parent of spans opened inside the block. Pass False for
+                     spans held open across ``yield``, whose consumer would otherwise inherit them.
+                     Defaults to True.
+    parent (Span): Span to nest under instead of the current one, e.g. one captured when a generator
+                   was created; a no-op span makes this a root span. Defaults to None (the current span).
+    **attributes: Initial attributes; 'step' and 'agent' override the inherited values.
+
+    Yields:
+    Span: The span, for setting attributes once they are known.
+    """
+    if not _exporters:
+        yield _NOOP_SPAN
+        return
+
+    if parent is None:
+        parent = _current_span.get()
+    elif not parent.recording:
+        parent = None
+    current = Span(name, kind, parent=parent, **attributes)
+    token = _current_span.set(current) if activate else None
+    try:
+        yield current
+    except Exception as error:
+        current.error = f"{type(error).__name__}: {error}"
+        raise
+    finally:
+        if token is not None:
+            _current_span.reset(token)
+        current._finish()
+        for exporter in list(_exporters):
+            exporter.export(current)
+
+
+def current_span():
+    """Return the innermost open span, or a no-op span when there is none."""
+    return _current_span.get() or _NOOP_SPAN
+
+
+def traced(name=None, kind="agent"):
+    """
+    Decorates an agent method so each call runs in a span named '<Class>.<method>'.
+
+    The span's 'agent' is the class name, so the LLM and embedding calls made by the
+    method are attributed to that agent. Works for plain and coroutine methods.
+    """
+    def decorate(method):
+        def open_span(self):
+            agent = type(self).__name__
+            return span(name or f"{agent}.{method.__name__}", kind, agent=agent)
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def wrapper(self, *args, **kwargs):
+                with open_span(self):
+                    return await method(self, *args, **kwargs)
+        else:
+            @functools.wraps(method)
+            def wrapper(self, *args, **kwargs):
+                with open_span(self):
+                    return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def configure_tracing(*exporters):
+    """
+    Send spans to the given exporters, replacing the previous ones; with no exporters, tracing is off.
+
+    The previous exporters are closed.
+    """
+    previous = list(_exporters)
+    _exporters[:] = exporters
+    for exporter in previous:
+        if exporter not in exporters and hasattr(exporter, "close"):
+            exporter.close()
+
+
+class InMemoryExporter:
+    """Keeps finished spans in a list, e.g. for tests or an end-of-run summary."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def clear(self):
+        self.spans.clear()
+
+
+class JsonlExporter:
+    """Appends each finished span as one JSON line to a file."""
+
+    def __init__(self, path):
+        """
+        Initializes the exporter.
+
+        Parameters:
+        path (str): File the spans are appended to; its directory is created if needed.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def summarize(spans, by="step"):
+    """
+    Totals API time, calls and tokens per step or per agent.
+
+    Parameters:
+    spans (list): Finished spans.
+    by (str): Span field to group on, 'step' or 'agent'. Defaults to 'step'.
+
+    Returns:
+    list: One dict per group with the group value under ``by`` and 'calls', 'cache_hits',
+          'api_seconds', 'prompt_tokens' and 'completion_tokens', most API time first.
+    """
+    rows = {}
+    for finished in spans:
+        if finished.kind not in API_KINDS:
+            continue
+        key = getattr(finished, by)
+        row = rows.setdefault(key, {by: key, "calls": 0, "cache_hits": 0, "api_seconds": 0.0,
+                                    "prompt_tokens": 0, "completion_tokens": 0})
+        attributes = finished.attributes
+        row["calls"] += 1
+        row["cache_hits"] += int(attributes.get("cache_hit", False)) + attributes.get("cache_hits", 0)
+        row["api_seconds"] += finished.duration or 0.0
+        row["prompt_tokens"] += attributes.get("prompt_tokens", 0)
+        row["completion_tokens"] += attributes.get("completion_tokens", 0)
+    return sorted(rows.values(), key=lambda row: row["api_seconds"], reverse=True)
+
+
+def format_summary(rows, by="step"):
+    """Return the rows of ``summarize`` as a fixed-width text table."""
+    header = f"{by:<28} {'calls':>6} {'cached':>7} {'api s':>8} {'prompt tok':>11} {'compl tok':>10}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        label = "-" if row[by] is None else str(row[by])
+        lines.append(
+            f"{label[:28]:<28} {row['calls']:>6} {row['cache_hits']:>7} {row['api_seconds']:>8.2f} "
+            f"{row['prompt_tokens']:>11} {row['completion_tokens']:>10}"
+        )
+    return "\n".join(lines)
+
+
+class SummaryExporter(InMemoryExporter):
+    """Collects a run's spans and writes per-step and per-agent summary tables."""
+
+    def __init__(self, write=print):
+        """
+        Initializes the exporter.
+
+        Parameters:
+        write (callable): Called with the text of the report. Defaults to print.
+        """
+        super().__init__()
+        self.write = write
+
+    def report(self):
+        """Write where the run's API time and tokens went, by step and by agent."""
+        self.write("\n\n".join(format_summary(summarize(self.spans, by), by) for by in ("step", "agent")))
@@ -0,0 +1,110 @@
+"""
+Deterministic response checks for ``EvaluationAgent``.
+
+Many evaluation criteria are structural (a sentence pattern, a set of labelled
+fields), so an obviously failing response can be rejected locally, in
+microseconds, instead of spending an LLM judge call on it. A validator is any
+callable taking the response text and returning a list of problems; an empty
+list means the response passes and goes on to the LLM judge.
+"""
+
+import re
+
+
+# A user story 'As a ..., I want ... so that ...', also with Markdown emphasis (``**As a** user``,
+# ``_As a_ user``) or wrapped across lines; letter lookarounds stand in for ``\b``, which '_' defeats
+USER_STORY_PATTERN = (
+    r"(?<![A-Za-z0-9])As[\s*_]+an?(?![A-Za-z0-9])[\s\S]+?,[\s*_]+I[\s*_]+want(?![A-Za-z0-9])"
+    r"[\s\S]+?(?<![A-Za-z0-9])so[\s*_]+that(?![A-Za-z0-9])"
+)
+
+
+class PatternValidator:
+    """
+    Requires a regular expression to match the response a minimum number of times.
+    """
+
+    def __init__(self, pattern, description, min_matches=1, flags=re.IGNORECASE | re.MULTILINE):
+        """
+        Initializes the validator.
+
+        Parameters:
+        pattern (str): Regular expression searched for in the response.
+        description (str): What a match is, used in problem messages, e.g. 'user stories'.
+        min_matches (int): Minimum number of matches required. Defaults to 1.
+        flags (int): Regular expression flags. Defaults to case-insensitive, multiline.
+        """
+        self.pattern = re.compile(pattern, flags)
+        self.description = description
+        self.min_matches = min_matches
+
+    def __call__(self, response):
+        """Return the problems found in ``response``."""
+        found = len(self.pattern.findall(response))
+        if found < self.min_matches:
+            return [f"Expected at least {self.min_matches} {self.description}, found {found}."]
+        return []
+
+
+class RequiredFieldsValidator:
+    """
+    Requires labelled fields, e.g. 'Task ID:', to appear in the response.
+
+    With ``consistent_counts`` every field must appear the same number of times,
+    which catches items that are missing some of their fields.
+    """
+
+    def __init__(self, fields, consistent_counts=True):
+        """
+        Initializes the validator.
+
+        Parameters:
+        fields (list): Field labels that must appear, matched case-insensitively and ignoring
+                       Markdown emphasis before a trailing colon.
+        consistent_counts (bool): Require every field to appear equally often. Defaults to True.
+        """
+        self.fields = list(fields)
+        self.consistent_counts = consistent_counts
+        self._patterns = [re.compile(_field_pattern(field), re.IGNORECASE) for field in self.fields]
+
+    def __call__(self, response):
+        """Return the problems found in ``response``."""
+        counts = {field: len(pattern.findall(response)) for field, pattern in zip(self.fields, self._patterns)}
+        missing = [field for field, count in counts.items() if count == 0]
+        if missing:
+            return [f"Missing required field{'s' if len(missing) > 1 else ''}: {', '.join(missing)}."]
+        if self.consistent_counts and len(set(counts.values())) > 1:
+            expected = max(counts.values())
+            incomplete = [f"{field} ({count} of {expected})" for field, count in counts.items() if count < expected]
+            return [f"Every item must have all fields; some items lack: {', '.join(incomplete)}."]
+        return []
+
+
+def _field_pattern(field):
+    """Return a regex for a field label, allowing Markdown emphasis before its colon (``**Task ID**:``)."""
+    if field.endswith(":"):
+        return re.escape(field[:-1].rstrip()) + r"[\s*_]*:"
+    return re.escape(field)
+
+
+def run_validators(validators, response):
+    """
+    Runs every validator on a response.
+
+    Parameters:
+    validators (list): Callables returning a list of problems.
+    response (str): The response to check.
+
+    Returns:
+    list: All problems found, empty if the response passes.
+    """
+    problems = []
+    for validator in validators:
+        problems.extend(validator(response))
+    return problems
+
+
+def fix_instructions(problems):
+    """Return correction instructions for the given problems."""
+    listed = "\n".join(f"- {problem}" for problem in problems)
+    return f"Fix these problems and keep everything else unchanged:\n{listed}"
@@ -0,0 +1,280 @@
+"""
+Binary vector store for the chunk embeddings of ``RAGKnowledgePromptAgent``.
+
+Embeddings are written as one contiguous float32 (or float16) ``.npy`` array, so
+reading them back is a memory map: no parsing and no copy. Chunk text and other
+per-row metadata live in a small JSON sidecar next to it. Rows are normally stored
+unit-normalized, which turns cosine similarity search into one matrix-vector product.
+
+Rows are identified by the content hash of their chunk, which lets ``reindex``
+update a store after the knowledge changes while embedding only the new chunks.
+Rows whose chunk disappeared are tombstoned (``'deleted': True``) and skipped by
+searches until the store is compacted.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from .vector_index import top_k
+
+
+STORE_FORMAT_VERSION = 1
+SUPPORTED_DTYPES = ("float32", "float16")
+
+
+def store_paths(path):
+    """Return the (vectors, sidecar) file names for the store at ``path``."""
+    return f"{path}.npy", f"{path}.json"
+
+
+class VectorStore:
+    """
+    An array of embedding vectors with one metadata record per row.
+
+    ``vectors`` is a (count, dim) NumPy array; after ``load`` it is a read-only
+    memory map of the file on disk. ``records`` holds a dict per row and always
+    includes the chunk ``text``; records built by ``reindex`` also carry its
+    ``chunk_hash``. ``normalized`` records whether every row has unit length.
+    """
+
+    def __init__(self, vectors, records, normalized=False):
+        """
+        Initializes the store.
+
+        Parameters:
+        vectors (numpy.ndarray): A (count, dim) array of embeddings.
+        records (list): One metadata dict per row, each with a 'text' key.
+        normalized (bool): Whether the rows are already unit-normalized. Defaults to False.
+        """
+        if len(vectors) != len(records):
+            raise ValueError(f"Got {len(vectors)} vectors for {len(records)} records")
+        self.vectors = vectors
+        self.records = records
+        self.normalized = normalized
+        self._live_rows = None
+
+    @classmethod
+    def from_embeddings(cls, embeddings, records, dtype="float32", normalize=True):
+        """
+        Builds a store from a sequence of embedding vectors.
+
+        Parameters:
+        embeddings (list): One vector per record.
+        records (list): One metadata dict per vector, each with a 'text' key.
+        dtype (str): Storage precision, 'float32' or 'float16'. Defaults to 'float32'.
+        normalize (bool): Scale every row to unit length before storing. Defaults to True.
+
+        Returns:
+        VectorStore: The new store.
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported vector dtype {dtype!r}; expected one of {SUPPORTED_DTYPES}")
+        if not len(embeddings):
+            return cls(np.empty((0, 0), dtype=dtype), list(records), normalized=normalize)
+        vectors = np.vstack(embeddings).astype(np.float32)
+        if normalize:
+            vectors = normalize_rows(vectors)
+        return cls(np.ascontiguousarray(vectors, dtype=dtype), list(records), normalized=normalize)
+
+    @property
+    def texts(self):
+        """The chunk text of every row, in row order."""
+        return [record["text"] for record in self.records]
+
+    @property
+    def tombstones(self):
+        """Number of deleted rows still present in the store."""
+        return len(self.records) - len(self.live_rows())
+
+    def live_rows(self):
+        """
+        Returns the rows that are not tombstoned.
+
+        Returns:
+        numpy.ndarray: Row numbers in ascending order.
+        """
+        if self._live_rows is None:
+            self._live_rows = np.array(
+                [row for row, record in enumerate(self.records) if not record.get("deleted")], dtype=np.int64
+            )
+        return self._live_rows
+
+    def compact(self):
+        """
+        Returns a copy of the store without its tombstoned rows.
+
+        Returns:
+        VectorStore: The compacted store.
+        """
+        rows = self.live_rows()
+        return VectorStore(
+            np.ascontiguousarray(self.vectors[rows]), [self.records[row] for row in rows], normalized=self.normalized
+        )
+
+    @property
+    def dim(self):
+        """Dimensionality of the stored vectors."""
+        return self.vectors.shape[1] if self.vectors.ndim == 2 else 0
+
+    def similarities(self, query):
+        """
+        Scores every row against ``query`` by cosine similarity.
+
+        Parameters:
+        query (list): The query embedding.
+
+        Returns:
+        numpy.ndarray: One float32 similarity per row.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if len(self.records) == 0 or query_norm == 0:
+            return np.zeros(len(self.records), dtype=np.float32)
+        scores = self.vectors @ (query / query_norm).astype(self.vectors.dtype, copy=False)
+        scores = scores.astype(np.float32, copy=False)
+        if not self.normalized:
+            norms = np.linalg.norm(self.vectors.astype(np.float32), axis=1)
+            norms[norms == 0] = 1.0
+            scores = scores / norms
+        return scores
+
+    def search(self, query, k=1, min_similarity=None):
+        """
+        Finds the ``k`` rows most similar to ``query``.
+
+        Parameters:
+        query (list): The query embedding.
+        k (int): Maximum number of results. Defaults to 1.
+        min_similarity (float): Drop results scoring below this value. Defaults to None (keep all).
+
+        Returns:
+        list: (row, similarity) pairs, best first.
+        """
+        scores = self.similarities(query)
+        if not self.tombstones:
+            return top_k(scores, k, min_similarity)
+        rows = self.live_rows()
+        return top_k(scores[rows], k, min_similarity, rows=rows)
+
+    def save(self, path):
+        """
+        Writes the store to ``<path>.npy`` and ``<path>.json``.
+
+        Each file is written to a temporary name and then renamed into place, so a
+        store memory-mapped from the same path stays readable while it is replaced.
+
+        Parameters:
+        path (str): File path without extension.
+        """
+        vectors_path, sidecar_path = store_paths(path)
+        directory = os.path.dirname(vectors_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_vectors_path, temporary_sidecar_path = store_paths(f"{path}.tmp")
+        np.save(temporary_vectors_path, np.ascontiguousarray(self.vectors))
+        sidecar = {
+            "version": STORE_FORMAT_VERSION,
+            "dtype": str(self.vectors.dtype),
+            "count": len(self.records),
+            "dim": self.dim,
+            "normalized": self.normalized,
+            "records": self.records,
+        }
+        with open(temporary_sidecar_path, "w", encoding="utf-8") as sidecar_file:
+            json.dump(sidecar, sidecar_file, ensure_ascii=False, default=_json_default)
+        os.replace(temporary_vectors_path, vectors_path)
+        os.replace(temporary_sidecar_path, sidecar_path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Opens a store written by ``save``.
+
+        Parameters:
+        path (str): File path without extension.
+        mmap (bool): Memory-map the vectors instead of reading them into memory. Defaults to True.
+
+        Returns:
+        VectorStore: The loaded store.
+        """
+        vectors_path, sidecar_path = store_paths(path)
+        with open(sidecar_path, encoding="utf-8") as sidecar_file:
+            sidecar = json.load(sidecar_file)
+        if sidecar.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector store version {sidecar.get('version')!r} in {sidecar_path}")
+        vectors = np.load(vectors_path, mmap_mode="r" if mmap else None)
+        return cls(vectors, sidecar["records"], normalized=sidecar.get("normalized", False))
+
+    def __len__(self):
+        return len(self.records)
+
+
+def store_exists(path):
+    """Return whether a store has been saved at ``path``."""
+    return all(os.path.exists(file_path) for file_path in store_paths(path))
+
+
+def reindex(store, records, embed, dtype="float32", max_tombstone_ratio=1.0):
+    """
+    Updates a store so that its live rows are exactly ``records``.
+
+    Rows are matched on each record's 'chunk_hash'. Matching rows keep their vector
+    and take the new metadata (a tombstoned match is revived); rows missing from
+    ``records`` are tombstoned; only chunks without a row are embedded and appended.
+    Duplicate chunks share one row.
+
+    Parameters:
+    store (VectorStore): The current store, or None to build from scratch.
+    records (list): Chunk records, each with 'text' and 'chunk_hash'.
+    embed (callable): Maps a list of texts to one vector per text.
+    dtype (str): Storage precision for a new store. Defaults to 'float32'.
+    max_tombstone_ratio (float): Compact once tombstones exceed this multiple of the live rows. Defaults to 1.0.
+
+    Returns:
+    tuple: (updated VectorStore, number of chunks embedded).
+    """
+    unique = {}
+    for record in records:
+        unique.setdefault(record["chunk_hash"], record)
+
+    if store is None or len(store) == 0:
+        new_records = list(unique.values())
+        embeddings = embed([record["text"] for record in new_records]) if new_records else []
+        return VectorStore.from_embeddings(embeddings, new_records, dtype=dtype), len(new_records)
+
+    updated_records = []
+    for record in store.records:
+        chunk_hash = record.get("chunk_hash")
+        if chunk_hash in unique:
+            updated_records.append(dict(unique.pop(chunk_hash), deleted=False))
+        else:
+            updated_records.append(dict(record, deleted=True))
+
+    new_records = list(unique.values())
+    vectors = store.vectors
+    if new_records:
+        added = VectorStore.from_embeddings(
+            embed([record["text"] for record in new_records]), new_records,
+            dtype=str(store.vectors.dtype), normalize=store.normalized,
+        )
+        vectors = np.concatenate([np.asarray(store.vectors), added.vectors])
+    updated = VectorStore(vectors, updated_records + new_records, normalized=store.normalized)
+    if updated.tombstones > max_tombstone_ratio * len(updated.live_rows()):
+        updated = updated.compact()
+    return updated, len(new_records)
+
+
+def normalize_rows(matrix):
+    """Return ``matrix`` with every non-zero row scaled to unit length."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _json_default(value):
+    """Serialize NumPy scalars found in metadata records."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -2,14 +2,60 @@
 
 # TODO: 1 - Import the following agents: ActionPlanningAgent, KnowledgeAugmentedPromptAgent, EvaluationAgent, RoutingAgent from the workflow_agents.base_agents module
 from workflow_agents.base_agents import ActionPlanningAgent, KnowledgeAugmentedPromptAgent, EvaluationAgent, RoutingAgent
-
+from workflow_agents.clients import close_shared_clients
+from workflow_agents.completion_cache import configure_completion_cache
+from workflow_agents.executor import LineSink, WorkflowExecutor, current_step, format_step_inputs
+from workflow_agents.logs import Truncated, configure_logging
+from workflow_agents.run_store import DEFAULT_RUNS_DIR, RunStore
+from workflow_agents.tracing import JsonlExporter, SummaryExporter, configure_tracing
+from workflow_agents.validators import USER_STORY_PATTERN, PatternValidator, RequiredFieldsValidator
+
+import argparse
+import functools
+import logging
 import os
 from dotenv import load_dotenv
 
+parser = argparse.ArgumentParser(description="Turn the product spec into a development plan with a team of agents.")
+parser.add_argument("--resume", metavar="RUN_ID", help="continue an interrupted run, skipping the work it finished")
+parser.add_argument("--runs-dir", default=os.getenv("WORKFLOW_RUNS_DIR", DEFAULT_RUNS_DIR),
+                    help="directory where runs are checkpointed (default: $WORKFLOW_RUNS_DIR or %(default)s)")
+args = parser.parse_args()
+
 # TODO: 2 - Load the OpenAI key into a variable called openai_api_key
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
+# Agent progress is logged at LOG_LEVEL (DEBUG adds prompts and responses, WARNING is quiet),
+# with logged prompts and responses cut to LOG_MAX_CHARS characters
+configure_logging(os.getenv("LOG_LEVEL", "INFO"), max_chars=int(os.getenv("LOG_MAX_CHARS", "500")))
+logger = logging.getLogger("workflow_agents.workflow")
+
+# Maximum number of workflow steps executed at the same time
+WORKFLOW_CONCURRENCY = int(os.getenv("WORKFLOW_CONCURRENCY", "4"))
+
+# Maximum knowledge tokens inlined into each Knowledge Augmented Prompt Agent call; unset, the full
+# knowledge is always sent. A budget below the product spec's size (about 3000 tokens) changes the output
+KNOWLEDGE_TOKEN_BUDGET = int(os.getenv("KNOWLEDGE_TOKEN_BUDGET") or 0) or None
+
+# Evaluation stops once a refined response is at least this similar to the previous one
+EVALUATION_UNCHANGED_THRESHOLD = float(os.getenv("EVALUATION_UNCHANGED_THRESHOLD", "0.98"))
+
+# Candidate responses generated and judged in parallel in each evaluation's first round
+EVALUATION_CANDIDATES = int(os.getenv("EVALUATION_CANDIDATES", "1"))
+
+# Print worker responses line by line, tagged with their step, while they are generated (STREAM_OUTPUT=0 disables)
+token_sink = LineSink() if os.getenv("STREAM_OUTPUT", "1") == "1" else None
+
+# Trace every step, agent and API call; summarize them at the end and, when TRACE_PATH is set, write them as JSONL
+trace_summary = SummaryExporter()
+configure_tracing(trace_summary, *([JsonlExporter(os.getenv("TRACE_PATH"))] if os.getenv("TRACE_PATH") else []))
+
+# Reuse unchanged temperature=0 completions across runs when COMPLETION_CACHE_PATH is set
+completion_cache = None
+if os.getenv("COMPLETION_CACHE_PATH"):
+    completion_cache = configure_completion_cache(os.getenv("COMPLETION_CACHE_PATH"))
+
 # load the product spec
 # TODO: 3 - Load the product spec document Product-Spec-Email-Router.txt into a variable called product_spec
 with open("Product-Spec-Email-Router.txt", "r") as f:
@@ -41,7 +87,11 @@ knowledge_product_manager = (
     + product_spec
 )
 # TODO: 6 - Instantiate a product_manager_knowledge_agent using 'persona_product_manager' and the completed 'knowledge_product_manager'
-product_manager_knowledge_agent = KnowledgeAugmentedPromptAgent(openai_api_key, persona_product_manager, knowledge_product_manager)
+# The knowledge includes the whole product spec; with a KNOWLEDGE_TOKEN_BUDGET smaller than that, only
+# the spec sections relevant to each query are sent, instead of the full spec on every call
+product_manager_knowledge_agent = KnowledgeAugmentedPromptAgent(
+    openai_api_key, persona_product_manager, knowledge_product_manager, knowledge_token_budget=KNOWLEDGE_TOKEN_BUDGET
+)
 
 # Product Manager - Evaluation Agent
 # TODO: 7 - Define the persona and evaluation_criteria for a Product Manager evaluation agent and instantiate it as product_manager_evaluation_agent. This agent will assess the outputs of the product_manager_knowledge_agent.
@@ -53,7 +103,13 @@ product_manager_evaluation_agent = EvaluationAgent(
     persona_product_manager_eval, 
     evaluation_criteria_product_manager, 
     product_manager_knowledge_agent,
-    max_interactions=10
+    max_interactions=10,
+    merged_judge=True,
+    unchanged_threshold=EVALUATION_UNCHANGED_THRESHOLD,
+    candidates=EVALUATION_CANDIDATES,
+    token_sink=token_sink,
+    # Structural checks run locally; only responses passing them reach the LLM judge
+    validators=[PatternValidator(USER_STORY_PATTERN, "user stories of the form 'As a ..., I want ... so that ...'")]
 )
 
 # Program Manager - Knowledge Augmented Prompt Agent
@@ -85,7 +141,12 @@ program_manager_evaluation_agent = EvaluationAgent(
     persona_program_manager_eval,
     evaluation_criteria_program_manager,
     program_manager_knowledge_agent,
-    max_interactions=10
+    max_interactions=10,
+    merged_judge=True,
+    unchanged_threshold=EVALUATION_UNCHANGED_THRESHOLD,
+    candidates=EVALUATION_CANDIDATES,
+    token_sink=token_sink,
+    validators=[RequiredFieldsValidator(["Feature Name:", "Description:", "Key Functionality:", "User Benefit:"])]
 )
 
 # Development Engineer - Knowledge Augmented Prompt Agent
@@ -122,7 +183,15 @@ development_engineer_evaluation_agent = EvaluationAgent(
     persona_dev_engineer_eval,
     evaluation_criteria_dev_engineer,
     development_engineer_knowledge_agent,
-    max_interactions=10
+    max_interactions=10,
+    merged_judge=True,
+    unchanged_threshold=EVALUATION_UNCHANGED_THRESHOLD,
+    candidates=EVALUATION_CANDIDATES,
+    token_sink=token_sink,
+    validators=[RequiredFieldsValidator([
+        "Task ID:", "Task Title:", "Related User Story:", "Description:",
+        "Acceptance Criteria:", "Estimated Effort:", "Dependencies:"
+    ])]
 )
 
 
@@ -137,25 +206,30 @@ development_engineer_evaluation_agent = EvaluationAgent(
 #   3. Have the response evaluated by the corresponding Evaluation Agent.
 #   4. Return the final validated response.
 
-def product_manager_support_function(query):
+def evaluation_checkpoint():
+    """Return the arguments that checkpoint the running step's evaluation loop, resuming it after its recorded iterations."""
+    step_id = current_step.get()
+    return {"history": run_store.iterations(step_id), "on_iteration": functools.partial(run_store.record_iteration, step_id)}
+
+async def product_manager_support_function(query):
     """Support function for Product Manager agent."""
-    print(f"\n[Product Manager] Processing query: {query[:100]}...")
+    logger.info("[Product Manager] Processing query: %s", Truncated(query, 100))
     # Get response from the Product Manager Knowledge Agent
-    result = product_manager_evaluation_agent.evaluate(query)
+    result = await product_manager_evaluation_agent.aevaluate(query, **evaluation_checkpoint())
     return result['final_response']
 
-def program_manager_support_function(query):
+async def program_manager_support_function(query):
     """Support function for Program Manager agent."""
-    print(f"\n[Program Manager] Processing query: {query[:100]}...")
+    logger.info("[Program Manager] Processing query: %s", Truncated(query, 100))
     # Get response from the Program Manager Knowledge Agent
-    result = program_manager_evaluation_agent.evaluate(query)
+    result = await program_manager_evaluation_agent.aevaluate(query, **evaluation_checkpoint())
     return result['final_response']
 
-def development_engineer_support_function(query):
+async def development_engineer_support_function(query):
     """Support function for Development Engineer agent."""
-    print(f"\n[Development Engineer] Processing query: {query[:100]}...")
+    logger.info("[Development Engineer] Processing query: %s", Truncated(query, 100))
     # Get response from the Development Engineer Knowledge Agent
-    result = development_engineer_evaluation_agent.evaluate(query)
+    result = await development_engineer_evaluation_agent.aevaluate(query, **evaluation_checkpoint())
     return result['final_response']
 
 # Instantiate the routing agent with defined routes
@@ -164,17 +238,17 @@ routing_agent.agents = [
     {
         "name": "Product Manager",
         "description": "Responsible for defining product personas and user stories only. Does not define features or tasks. Does not group stories",
-        "func": lambda x: product_manager_support_function(x)
+        "func": product_manager_support_function
     },
     {
         "name": "Program Manager",
         "description": "Responsible for defining product features by grouping related user stories. Does not create individual user stories or engineering tasks.",
-        "func": lambda x: program_manager_support_function(x)
+        "func": program_manager_support_function
     },
     {
         "name": "Development Engineer",
         "description": "Responsible for defining detailed engineering tasks for implementing user stories. Creates technical specifications and development work items.",
-        "func": lambda x: development_engineer_support_function(x)
+        "func": development_engineer_support_function
     }
 ]
 
@@ -187,6 +261,17 @@ workflow_prompt = "What would the development tasks for this product be?"
 # ****
 print(f"Task to complete in this workflow, workflow prompt = {workflow_prompt}")
 
+# Checkpoint the plan, each step's route, every evaluation iteration and the outputs as they complete
+if args.resume:
+    run_store = RunStore.open(args.resume, root=args.runs_dir)
+    if run_store.metadata.get("workflow_prompt") != workflow_prompt:
+        parser.error(f"run {args.resume} was started for a different workflow prompt")
+    run_store.update(status="running")
+    print(f"Resuming run {run_store.run_id}")
+else:
+    run_store = RunStore.create(args.runs_dir, workflow_prompt=workflow_prompt)
+    print(f"Run id: {run_store.run_id} (if interrupted, continue it with --resume {run_store.run_id})")
+
 print("\nDefining workflow steps from the workflow prompt")
 # TODO: 12 - Implement the workflow.
 #   1. Use the 'action_planning_agent' to extract steps from the 'workflow_prompt'.
@@ -197,11 +282,15 @@ print("\nDefining workflow steps from the workflow prompt")
 #      c. Print information about the step being executed and its result.
 #   4. After the loop, print the final output of the workflow (the last completed step).
 
-# Extract workflow steps from the prompt
-workflow_steps = action_planning_agent.extract_steps_from_prompt(workflow_prompt)
-print(f"\nWorkflow Steps Identified ({len(workflow_steps)} steps):")
-for i, step in enumerate(workflow_steps, 1):
-    print(f"  {i}. {step}")
+# Extract a structured plan: each step names the steps whose output it needs
+workflow_plan = run_store.load_plan()
+if workflow_plan is None:
+    workflow_plan = action_planning_agent.extract_plan_from_prompt(workflow_prompt)
+    run_store.save_plan(workflow_plan)
+print(f"\nWorkflow Steps Identified ({len(workflow_plan)} steps):")
+for step in workflow_plan:
+    depends_on = f" (needs: {', '.join(step['depends_on'])})" if step["depends_on"] else ""
+    print(f"  {step['id']}. {step['text']} -> {step['artifact']}{depends_on}")
 
 # Initialize list to store completed steps
 completed_steps = []
@@ -210,26 +299,49 @@ print("\n" + "="*80)
 print("EXECUTING WORKFLOW STEPS")
 print("="*80)
 
-# Execute each step using the routing agent
-for i, step in enumerate(workflow_steps, 1):
-    print(f"\n{'='*80}")
-    print(f"STEP {i}/{len(workflow_steps)}: {step}")
-    print(f"{'='*80}")
-    
-    # Route the step to the appropriate agent
-    result = routing_agent.route(step)
-    
+
+async def run_workflow_step(step, inputs):
+    """Route a plan step on its own text, handing the routed agent the artifacts of the steps it depends on."""
+    # A resumed step goes back to the agent it was routed to before
+    agent_name = run_store.route(step["id"])
+    if agent_name is None:
+        agent_name = await routing_agent.aselect(step["text"])
+        if agent_name is None:
+            return "Sorry, no suitable agent could be selected."
+        run_store.save_route(step["id"], agent_name)
+    return await routing_agent.aroute(step["text"], context=format_step_inputs(inputs), agent_name=agent_name)
+
+
+# Run the plan as a DAG: steps whose inputs are ready run concurrently (at most
+# WORKFLOW_CONCURRENCY at once) and receive the outputs of their upstream steps.
+# Steps finished by an interrupted run are not run again.
+executor = WorkflowExecutor(run_workflow_step, max_concurrency=WORKFLOW_CONCURRENCY, run_store=run_store)
+try:
+    run_report = executor.run_plan(workflow_plan)
+except BaseException as error:
+    run_store.update(status="failed", error=f"{type(error).__name__}: {error}")
+    print(f"\nRun {run_store.run_id} failed; continue it with: python agentic_workflow.py --resume {run_store.run_id}")
+    raise
+finally:
+    if token_sink is not None:
+        token_sink.flush()
+if run_report["resumed"]:
+    print(f"\nReused the results of {len(run_report['resumed'])} steps finished earlier: {', '.join(run_report['resumed'])}")
+
+for i, step in enumerate(workflow_plan, 1):
+    result = run_report["results"][step["id"]]
+
     # Append result to completed steps
     completed_steps.append({
-        "step": step,
+        "step": step["text"],
         "result": result
     })
-    
-    print(f"\n[STEP {i} COMPLETED]")
-    print("-" * 80)
-    print("Result Preview:")
-    print(result[:500] + "..." if len(result) > 500 else result)
-    print("-" * 80)
+
+    # Full results are printed once, in the final output below
+    logger.info("STEP %d/%d COMPLETED in %.1fs: %s", i, len(workflow_plan), run_report["durations"][step["id"]], step["text"])
+
+print(f"\nCritical path: {' -> '.join(run_report['critical_path'])} "
+      f"({run_report['critical_path_seconds']:.1f}s of {run_report['elapsed_seconds']:.1f}s elapsed)")
 
 # Print final output
 print("\n" + "="*80)
@@ -253,3 +365,18 @@ for i, step_result in enumerate(completed_steps, 1):
 print("\n" + "="*80)
 print("END OF WORKFLOW")
 print("="*80)
+
+run_store.save_outputs({"workflow_prompt": workflow_prompt, "steps": completed_steps})
+run_store.update(status="completed")
+print(f"\nRun {run_store.run_id} saved in {run_store.path}")
+
+if completion_cache is not None:
+    stats = completion_cache.stats()
+    print(f"\nCompletion cache: {stats['hits']} hits, {stats['misses']} misses")
+
+print("\nWhere the time and tokens went (API time and tokens per step and per agent):")
+trace_summary.report()
+configure_tracing()
+
+# Release the pooled API connections
+close_shared_clients()
@@ -0,0 +1,140 @@
+"""
+Streaming text chunker for ``RAGKnowledgePromptAgent``.
+
+``iter_chunks`` consumes text as an iterable of blocks (see ``read_blocks`` for
+files) and yields chunks as soon as they are complete, so memory stays bounded
+by roughly one chunk plus one block no matter how large the document is.
+
+Chunks end at the last natural boundary inside the size limit, preferring a
+paragraph break, then a line break, then the end of a sentence, then any
+whitespace. Offsets (``start_char``/``end_char``) index the original, unmodified
+text; only the chunk ``text`` has its whitespace collapsed.
+"""
+
+import hashlib
+import re
+
+from .tokens import CHARS_PER_TOKEN, count_tokens
+
+
+READ_BLOCK_SIZE = 1 << 20
+SIZE_UNITS = ("chars", "tokens")
+
+WHITESPACE = re.compile(r"\s+")
+# Boundaries in order of preference; a chunk ends right after the match.
+BOUNDARY_PATTERNS = (
+    re.compile(r"\n[ \t]*\n\s*"),
+    re.compile(r"\n\s*"),
+    re.compile(r"[.!?][\"')\]]*\s+"),
+    WHITESPACE,
+)
+
+
+def chunk_hash(text):
+    """Return the content hash identifying a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def read_blocks(path, block_size=READ_BLOCK_SIZE, encoding="utf-8"):
+    """
+    Reads a text file lazily in fixed-size blocks.
+
+    Parameters:
+    path (str): File to read.
+    block_size (int): Characters per block. Defaults to 1 MiB.
+    encoding (str): File encoding. Defaults to 'utf-8'.
+
+    Yields:
+    str: Consecutive blocks of the file.
+    """
+    with open(path, encoding=encoding) as text_file:
+        while True:
+            block = text_file.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def _split_point(window, min_end):
+    """Return where to end a chunk of ``window``: after its last boundary past ``min_end``."""
+    for pattern in BOUNDARY_PATTERNS:
+        last_end = None
+        for match in pattern.finditer(window):
+            last_end = match.end()
+        if last_end is not None and last_end > min_end:
+            return last_end
+    return len(window)
+
+
+def _overlap_start(text, end, overlap):
+    """Return where the next chunk starts: ``overlap`` before ``end``, moved to a word start."""
+    start = max(end - overlap, 0)
+    if start == 0 or text[start - 1].isspace():
+        return start
+    match = WHITESPACE.search(text, start, end)
+    return match.end() if match else start
+
+
+def iter_chunks(blocks, chunk_size=2000, chunk_overlap=100, unit="chars", model="text-embedding-3-large"):
+    """
+    Splits streamed text into overlapping chunks in a single pass.
+
+    Parameters:
+    blocks (iterable): The text, as a string or an iterable of string blocks.
+    chunk_size (int): Maximum chunk size in ``unit``. Defaults to 2000.
+    chunk_overlap (int): Overlap between consecutive chunks in ``unit``. Defaults to 100.
+    unit (str): 'chars' or 'tokens'. Defaults to 'chars'.
+    model (str): Tokenizer model used when ``unit`` is 'tokens'.
+
+    Yields:
+    dict: Chunk metadata with 'chunk_id', 'chunk_hash', 'text', 'chunk_size', 'start_char' and 'end_char'.
+    """
+    if unit not in SIZE_UNITS:
+        raise ValueError(f"Unknown chunk size unit {unit!r}; expected one of {SIZE_UNITS}")
+    if chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+    scale = 1 if unit == "chars" else CHARS_PER_TOKEN
+    window_chars, overlap_chars = chunk_size * scale, chunk_overlap * scale
+
+    blocks = iter([blocks]) if isinstance(blocks, str) else iter(blocks)
+    buffer, buffer_offset, exhausted = "", 0, False
+    start, chunk_id = 0, 0
+
+    while True:
+        # Compact the buffer once most of it is consumed, then top it up to one full window past start
+        position = start - buffer_offset
+        if position > len(buffer) // 2:
+            buffer, buffer_offset, position = buffer[position:], start, 0
+        while not exhausted and len(buffer) - position <= window_chars:
+            try:
+                buffer += next(blocks)
+            except StopIteration:
+                exhausted = True
+
+        window = buffer[position:position + window_chars]
+        at_end = exhausted and len(buffer) - position <= window_chars
+        end = len(window) if at_end else _split_point(window, window_chars // 2)
+        if unit == "tokens":
+            tokens = count_tokens(window[:end], model)
+            while tokens > chunk_size and end > 1:
+                shrunk = window[:max(1, end * chunk_size // tokens)]
+                end = _split_point(shrunk, len(shrunk) // 2)
+                tokens = count_tokens(window[:end], model)
+                at_end = False
+
+        text = " ".join(window[:end].split())
+        if text:
+            yield {
+                "chunk_id": chunk_id,
+                "chunk_hash": chunk_hash(text),
+                "text": text,
+                "chunk_size": len(text),
+                "start_char": start,
+                "end_char": start + end,
+            }
+            chunk_id += 1
+        if at_end:
+            return
+
+        next_start = _overlap_start(window, end, overlap_chars)
+        start += next_start if next_start > 0 else end
@@ -0,0 +1,194 @@
+"""
+Shared OpenAI client pool used by every agent in ``base_agents``.
+
+Creating an ``OpenAI`` client per request throws away its httpx connection
+pool, so every call pays for a new TCP connection and TLS handshake. The pool
+below hands out one long-lived client per (client class, base URL, API key),
+letting consecutive calls reuse kept-alive connections.
+
+``AsyncOpenAI`` clients are pooled the same way, additionally keyed by a scope
+(the event loop), because their connections cannot be shared across loops.
+Clients of an event loop that has since been closed, e.g. by ``asyncio.run``,
+are dropped the next time the pool creates a client.
+
+Clients talk to the Vocareum proxy unless the ``OPENAI_BASE_URL`` environment
+variable names another endpoint, e.g. a local stand-in server for benchmarks.
+
+Pooled clients do not retry failed requests themselves; the agents send every
+request through ``rate_limits``, which retries with backoff, and the clients'
+httpx response hook hands it the rate limit headers of each response.
+"""
+
+import asyncio
+import inspect
+import os
+import threading
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from .rate_limits import aobserve_response, observe_response
+
+
+VOCAREUM_BASE_URL = "https://openai.vocareum.com/v1"
+
+
+class ClientPool:
+    """
+    A thread-safe registry of long-lived OpenAI clients.
+
+    Each client gets its own keep-alive httpx client, with the SDK's default
+    connection limits unless ``max_connections`` or
+    ``max_keepalive_connections`` size it differently.
+    """
+
+    def __init__(self, max_connections=None, max_keepalive_connections=None, keepalive_expiry=None):
+        """
+        Initializes the pool.
+
+        Parameters:
+        max_connections (int): Maximum concurrent connections per client. Defaults to the SDK default.
+        max_keepalive_connections (int): Maximum idle connections kept open per client.
+        keepalive_expiry (float): Seconds an idle connection is kept before being closed.
+        """
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self._clients = {}
+        self._http_clients = {}
+        self._lock = threading.Lock()
+
+    def _limits(self):
+        """Return the configured ``httpx.Limits``, or None to use the SDK defaults."""
+        if self.max_connections is None and self.max_keepalive_connections is None and self.keepalive_expiry is None:
+            return None
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry if self.keepalive_expiry is not None else 5.0,
+        )
+
+    def get(self, api_key, base_url=None, factory=OpenAI, scope=None):
+        """
+        Returns the shared client for the given credentials, creating it on first use.
+
+        Parameters:
+        api_key (str): API key for accessing OpenAI.
+        base_url (str): API base URL. Defaults to ``OPENAI_BASE_URL`` if set, else the Vocareum proxy.
+        factory (callable): Client class to instantiate. Defaults to ``OpenAI``.
+        scope (object): Extra key separating clients, e.g. the event loop of an async client.
+
+        Returns:
+        The pooled client instance.
+        """
+        base_url = base_url or os.getenv("OPENAI_BASE_URL") or VOCAREUM_BASE_URL
+        key = (factory, base_url, api_key, scope)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            stale = self._pop_closed_loops()
+            client = self._clients.get(key)
+            if client is None:
+                limits = self._limits()
+                options = {} if limits is None else {"limits": limits}
+                if isinstance(factory, type) and issubclass(factory, AsyncOpenAI):
+                    http_client = DefaultAsyncHttpxClient(event_hooks={"response": [aobserve_response]}, **options)
+                else:
+                    http_client = DefaultHttpxClient(event_hooks={"response": [observe_response]}, **options)
+                self._http_clients[key] = http_client
+                # Retries are left to the rate limiter, which also adapts the request rate
+                client = factory(base_url=base_url, api_key=api_key, http_client=http_client, max_retries=0)
+                self._clients[key] = client
+        self._close_now(*stale)
+        return client
+
+    def _pop_closed_loops(self):
+        """Remove the clients of closed event loops and return them with their httpx clients; call with the lock held."""
+        keys = [key for key in self._clients if isinstance(key[3], asyncio.AbstractEventLoop) and key[3].is_closed()]
+        clients = [self._clients.pop(key) for key in keys]
+        http_clients = [self._http_clients.pop(key) for key in keys if key in self._http_clients]
+        return clients, http_clients
+
+    @staticmethod
+    def _close_now(clients, http_clients):
+        """Close clients without an event loop; async ones are only dropped, as they can only be closed from their loop."""
+        for client in clients + http_clients:
+            close = getattr(client, "close", None)
+            if callable(close):
+                result = close()
+                if inspect.iscoroutine(result):
+                    result.close()
+
+    def _drain(self, scope=None):
+        """Remove the clients of ``scope`` (all clients if None) from the pool and return them with their httpx clients."""
+        with self._lock:
+            keys = [key for key in self._clients if scope is None or key[3] is scope]
+            clients = [self._clients.pop(key) for key in keys]
+            http_clients = [self._http_clients.pop(key) for key in keys if key in self._http_clients]
+        return clients, http_clients
+
+    def close(self):
+        """
+        Close every pooled client and its connections, then empty the pool.
+
+        Async clients can only be closed from their event loop; here they are just
+        dropped. Use ``aclose`` from inside the loop to close them gracefully.
+        """
+        self._close_now(*self._drain())
+
+    async def aclose(self, scope=None):
+        """
+        Close pooled clients, awaiting the async ones, and remove them from the pool.
+
+        Parameters:
+        scope (object): Only close the clients created for this scope, e.g. the current event loop. Defaults to None (all clients).
+        """
+        clients, http_clients = self._drain(scope)
+        for client in clients + http_clients:
+            close = getattr(client, "aclose", None) if isinstance(client, httpx.AsyncClient) else None
+            close = close or getattr(client, "close", None)
+            if callable(close):
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+
+    def __len__(self):
+        return len(self._clients)
+
+
+_shared_pool = ClientPool()
+
+
+def get_client_pool():
+    """Return the process-wide client pool."""
+    return _shared_pool
+
+
+def configure_client_pool(max_connections=None, max_keepalive_connections=None, keepalive_expiry=None):
+    """
+    Replace the process-wide pool with one using the given connection limits.
+
+    Clients handed out by the previous pool are closed.
+    """
+    global _shared_pool
+    previous = _shared_pool
+    _shared_pool = ClientPool(max_connections, max_keepalive_connections, keepalive_expiry)
+    previous.close()
+    return _shared_pool
+
+
+def get_client(api_key, base_url=None, factory=OpenAI, scope=None):
+    """Return the pooled client for ``api_key`` from the process-wide pool."""
+    return _shared_pool.get(api_key, base_url=base_url, factory=factory, scope=scope)
+
+
+def close_shared_clients():
+    """Close all pooled clients. Safe to call more than once, e.g. at interpreter exit."""
+    _shared_pool.close()
+
+
+async def aclose_shared_clients(scope=None):
+    """Close pooled clients (only those of ``scope`` if given) from inside an event loop, awaiting async ones."""
+    await _shared_pool.aclose(scope)
@@ -0,0 +1,181 @@
+"""
+Content-addressed embedding cache shared by the embedding agents in ``base_agents``.
+
+Embeddings are deterministic for a given (model, text), so there is no reason to
+pay for the same one twice. Entries are keyed by a SHA-256 of the model name and
+text and live in two tiers: a bounded in-memory LRU for the current process and
+an optional SQLite file, storing float32 vectors, that survives restarts.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+DEFAULT_CACHE_PATH = ".embedding_cache.sqlite"
+
+
+def embedding_key(model, text):
+    """Return the content hash identifying ``text`` embedded with ``model``."""
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    A two-tier (memory LRU + SQLite) store of embedding vectors.
+
+    Vectors are kept as float32 NumPy arrays. Lookups check memory first, then
+    disk; disk hits are promoted into memory. Passing ``path=None`` gives a
+    memory-only cache.
+    """
+
+    def __init__(self, path=None, max_memory_entries=10000):
+        """
+        Initializes the cache.
+
+        Parameters:
+        path (str): SQLite file for the persistent tier, or None for memory only.
+        max_memory_entries (int): Number of vectors kept in the in-memory LRU.
+        """
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _db(self):
+        """Open the SQLite tier on first use."""
+        if self._connection is None and self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._connection.commit()
+        return self._connection
+
+    def _remember(self, key, vector):
+        """Insert into the memory tier, evicting the least recently used entries."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, model, text):
+        """
+        Looks up a cached embedding.
+
+        Parameters:
+        model (str): Embedding model name.
+        text (str): Embedded text.
+
+        Returns:
+        numpy.ndarray: The float32 vector, or None on a miss.
+        """
+        key = embedding_key(model, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            db = self._db()
+            row = None
+            if db is not None:
+                row = db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            vector = np.frombuffer(row[0], dtype=np.float32)
+            self._remember(key, vector)
+            self.hits += 1
+            return vector
+
+    def put(self, model, text, embedding):
+        """
+        Stores an embedding in both tiers.
+
+        Parameters:
+        model (str): Embedding model name.
+        text (str): Embedded text.
+        embedding (list): The embedding vector.
+        """
+        self.put_many(model, [(text, embedding)])
+
+    def put_many(self, model, items):
+        """
+        Stores a batch of embeddings in both tiers, writing them to disk in one transaction.
+
+        Parameters:
+        model (str): Embedding model name.
+        items (iterable): (text, embedding) pairs.
+        """
+        rows = []
+        for text, embedding in items:
+            vector = np.asarray(embedding, dtype=np.float32)
+            rows.append((embedding_key(model, text), model, vector.shape[0], vector))
+        with self._lock:
+            for key, _, _, vector in rows:
+                self._remember(key, vector)
+            db = self._db()
+            if db is not None and rows:
+                with db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, model, dim, vector) VALUES (?, ?, ?, ?)",
+                        [(key, model, dim, vector.tobytes()) for key, model, dim, vector in rows],
+                    )
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            db = self._db()
+            if db is not None:
+                db.execute("DELETE FROM embeddings")
+                db.commit()
+
+    def close(self):
+        """Close the SQLite connection. The memory tier is kept."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __len__(self):
+        return len(self._memory)
+
+
+_shared_cache = EmbeddingCache(os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH) or None)
+
+
+def get_embedding_cache():
+    """Return the process-wide embedding cache."""
+    return _shared_cache
+
+
+def configure_embedding_cache(path=None, max_memory_entries=10000):
+    """
+    Replace the process-wide cache, e.g. to move the SQLite file or disable it with ``path=None``.
+
+    The previous cache's database connection is closed.
+    """
+    global _shared_cache
+    previous = _shared_cache
+    _shared_cache = EmbeddingCache(path, max_memory_entries)
+    previous.close()
+    return _shared_cache
@@ -0,0 +1,403 @@
+"""
+Client-side rate limiting, adaptive concurrency and retries for the OpenAI API.
+
+Every chat completion and embeddings request made by the agents in
+``base_agents`` goes through the process-wide ``RateLimiter``. Per model it
+keeps:
+
+- two token buckets, one for requests and one for tokens per minute, so that
+  concurrent steps stay under the provider's RPM and TPM limits instead of
+  running into 429 errors. A request's tokens are estimated up front and
+  corrected from the usage the response reports;
+- an AIMD limit on requests in flight: it grows by one per round of successful
+  requests and halves on a 429 error;
+- jittered exponential backoff for failed requests, never shorter than the
+  ``Retry-After`` the server asks for.
+
+Buckets start at ``DEFAULT_LIMITS`` and follow the ``x-ratelimit-*`` headers of
+the API's responses once they arrive, which the pooled clients hand over
+through ``observe_response``. The pooled clients do not retry on their own
+(``max_retries=0``), so all retries happen here.
+"""
+
+import asyncio
+import contextvars
+import logging
+import random
+import re
+import threading
+import time
+
+import openai
+
+
+logger = logging.getLogger(__name__)
+
+# (requests per minute, tokens per minute) assumed until the API reports the account's limits
+DEFAULT_LIMITS = {
+    "gpt-3.5-turbo": (3500, 200000),
+    "text-embedding-3-large": (3000, 1000000),
+}
+DEFAULT_INITIAL_CONCURRENCY = 8
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_MAX_RETRIES = 6
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+# Rate limit headers of the response to the latest request made in this context
+_response_headers = contextvars.ContextVar("workflow_agents_response_headers", default=None)
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def observe_response(response):
+    """httpx response hook of the pooled clients: remembers the response's rate limit headers for the limiter."""
+    _response_headers.set(response.headers)
+
+
+async def aobserve_response(response):
+    """Async counterpart of ``observe_response``, for the AsyncOpenAI clients."""
+    observe_response(response)
+
+
+def parse_duration(value):
+    """
+    Parses a reset duration of the rate limit headers, e.g. '1s', '6m0s' or '20ms'.
+
+    Returns:
+    float: Seconds, or None if ``value`` is not a duration.
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _header_number(headers, name):
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after(error):
+    """Return the seconds an API error's ``retry-after-ms`` or ``retry-after`` header asks to wait, or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is None:
+        return None
+    milliseconds = _header_number(headers, "retry-after-ms")
+    if milliseconds is not None:
+        return milliseconds / 1000
+    return _header_number(headers, "retry-after")
+
+
+def is_retryable(error):
+    """Return whether a failed request may succeed if sent again (rate limits, timeouts, connection and server errors)."""
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def _is_rate_limit(error):
+    return isinstance(error, openai.APIStatusError) and error.status_code == 429
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket refilling continuously at ``per_minute / 60`` per second.
+
+    ``reserve`` takes its amount at once, letting the level go negative, and returns
+    how long the caller must wait before sending; later callers therefore queue up
+    behind earlier ones. ``per_minute=None`` never makes anyone wait.
+    """
+
+    def __init__(self, per_minute):
+        """
+        Initializes a full bucket.
+
+        Parameters:
+        per_minute (float): Capacity and refill per minute, or None for no limit.
+        """
+        self.per_minute = per_minute
+        self.level = per_minute or 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if self.per_minute:
+            self.level = min(self.per_minute, self.level + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    def reserve(self, amount):
+        """
+        Takes ``amount`` from the bucket.
+
+        Parameters:
+        amount (float): Requests or tokens about to be used. Amounts above the capacity count as the capacity.
+
+        Returns:
+        float: Seconds to wait before using them.
+        """
+        if not self.per_minute:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.level -= min(amount, self.per_minute)
+            return max(0.0, -self.level * 60 / self.per_minute)
+
+    def refund(self, amount):
+        """Give back ``amount`` reserved but not used; a negative amount takes more."""
+        if not self.per_minute:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level = min(self.per_minute, self.level + amount)
+
+    def update(self, limit=None, remaining=None, reset=None):
+        """
+        Adopts the limit and remaining budget reported by the API.
+
+        Parameters:
+        limit (float): The account's limit per minute. Defaults to None (unchanged).
+        remaining (float): What the API says is left. The level never rises above it. Defaults to None.
+        reset (float): Seconds until the API's budget is full again, used when nothing remains. Defaults to None.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if limit:
+                self.per_minute = limit
+                self.level = min(self.level, limit)
+            if remaining is not None and remaining < self.level:
+                self.level = remaining
+                if remaining <= 0 and reset and self.per_minute:
+                    # Nothing left until the reset: owe exactly that much refill time
+                    self.level = min(self.level, -reset * self.per_minute / 60)
+
+
+class ModelLimiter:
+    """The buckets, AIMD concurrency limit and retry policy of one model."""
+
+    def __init__(self, model, requests_per_minute=None, tokens_per_minute=None,
+                 initial_concurrency=DEFAULT_INITIAL_CONCURRENCY, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 min_concurrency=1, max_retries=DEFAULT_MAX_RETRIES, base_delay=0.5, max_delay=30.0):
+        """
+        Initializes the limiter.
+
+        Parameters:
+        model (str): The model whose requests are limited.
+        requests_per_minute (float): Initial RPM limit. Defaults to None (none until reported by the API).
+        tokens_per_minute (float): Initial TPM limit. Defaults to None (none until reported by the API).
+        initial_concurrency (int): Requests allowed in flight at first. Defaults to 8.
+        max_concurrency (int): Upper bound of the adaptive limit. Defaults to 64.
+        min_concurrency (int): Lower bound of the adaptive limit. Defaults to 1.
+        max_retries (int): Retries of a failed request before its error is raised. Defaults to 6.
+        base_delay (float): Backoff ceiling of the first retry in seconds, doubled on each further one. Defaults to 0.5.
+        max_delay (float): Largest backoff ceiling in seconds. Defaults to 30.
+        """
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = float(initial_concurrency)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.in_flight = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+    def _try_enter(self):
+        """Take a slot if fewer than the current limit of requests are in flight; returns whether it did."""
+        with self._condition:
+            if self.in_flight < max(self.min_concurrency, int(self.concurrency)):
+                self.in_flight += 1
+                return True
+            return False
+
+    def _exit(self, started, error=None):
+        """Free a slot and adapt the limit: additive increase on success, multiplicative decrease on a 429."""
+        with self._condition:
+            self.in_flight -= 1
+            if error is None:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            elif _is_rate_limit(error) and started >= self._last_decrease:
+                # Only requests sent after the last decrease count; the others were sent at the old limit
+                self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+                self._last_decrease = time.monotonic()
+            self._condition.notify()
+
+    def _reserve(self, tokens):
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+    def _settle(self, reserved, response):
+        """Correct the token bucket with the usage the response reports, and adopt its rate limit headers."""
+        used = getattr(getattr(response, "usage", None), "total_tokens", None)
+        if isinstance(used, int):
+            self.tokens.refund(reserved - used)
+        headers = _response_headers.get()
+        if headers is not None:
+            self.observe(headers)
+
+    def observe(self, headers):
+        """Adopt the limits reported by the ``x-ratelimit-*`` headers of a response for this model."""
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            limit = _header_number(headers, f"x-ratelimit-limit-{kind}")
+            remaining = _header_number(headers, f"x-ratelimit-remaining-{kind}")
+            if limit is not None or remaining is not None:
+                bucket.update(limit, remaining, parse_duration(headers.get(f"x-ratelimit-reset-{kind}")))
+
+    def _backoff(self, attempt, error):
+        """Return the seconds to wait before retry number ``attempt`` (0-based): full jitter, at least Retry-After."""
+        self.retries += 1
+        if _is_rate_limit(error):
+            self.rate_limited += 1
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        delay = max(delay, retry_after(error) or 0.0)
+        logger.info("%s request failed (%s); retry %d of %d in %.2fs",
+                    self.model, type(error).__name__, attempt + 1, self.max_retries, delay)
+        return delay
+
+    def call(self, tokens, create):
+        """
+        Sends a request within the limits, retrying it when it fails transiently.
+
+        Parameters:
+        tokens (int): Estimated tokens of the request, prompt and expected completion.
+        create (callable): Sends the request and returns the response.
+
+        Returns:
+        The response of ``create``.
+        """
+        attempt = 0
+        while True:
+            with self._condition:
+                while not self._try_enter():
+                    self._condition.wait()
+            started = time.monotonic()
+            error = None
+            try:
+                time.sleep(self._reserve(tokens))
+                _response_headers.set(None)
+                response = create()
+                self._settle(tokens, response)
+                return response
+            except Exception as exc:
+                error = exc
+                if not is_retryable(exc) or attempt >= self.max_retries:
+                    raise
+            finally:
+                self._exit(started, error)
+            time.sleep(self._backoff(attempt, error))
+            attempt += 1
+
+    async def acall(self, tokens, create):
+        """Async counterpart of ``call``; ``create`` returns an awaitable of the response."""
+        attempt = 0
+        while True:
+            # The slot may be freed from another thread or event loop, so poll rather than wait on a loop primitive
+            while not self._try_enter():
+                await asyncio.sleep(0.005)
+            started = time.monotonic()
+            error = None
+            try:
+                await asyncio.sleep(self._reserve(tokens))
+                _response_headers.set(None)
+                response = await create()
+                self._settle(tokens, response)
+                return response
+            except Exception as exc:
+                error = exc
+                if not is_retryable(exc) or attempt >= self.max_retries:
+                    raise
+            finally:
+                self._exit(started, error)
+            await asyncio.sleep(self._backoff(attempt, error))
+            attempt += 1
+
+
+class RateLimiter:
+    """The per-model limiters shared by all agents of the process."""
+
+    def __init__(self, limits=None, enabled=True, **settings):
+        """
+        Initializes the limiter.
+
+        Parameters:
+        limits (dict): Maps a model to its (requests per minute, tokens per minute). Defaults to DEFAULT_LIMITS.
+        enabled (bool): False sends requests straight through, without limits or retries. Defaults to True.
+        **settings: Concurrency and retry settings passed to every ModelLimiter.
+        """
+        self.limits = DEFAULT_LIMITS if limits is None else limits
+        self.enabled = enabled
+        self.settings = settings
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def for_model(self, model):
+        """Return the limiter of ``model``, creating it on first use."""
+        limiter = self._models.get(model)
+        if limiter is None:
+            with self._lock:
+                limiter = self._models.get(model)
+                if limiter is None:
+                    limiter = ModelLimiter(model, *self.limits.get(model, (None, None)), **self.settings)
+                    self._models[model] = limiter
+        return limiter
+
+    def call(self, model, tokens, create):
+        """Send a request for ``model`` through its limiter; see ``ModelLimiter.call``."""
+        if not self.enabled:
+            return create()
+        return self.for_model(model).call(tokens, create)
+
+    async def acall(self, model, tokens, create):
+        """Async counterpart of ``call``."""
+        if not self.enabled:
+            return await create()
+        return await self.for_model(model).acall(tokens, create)
+
+
+_shared_limiter = RateLimiter()
+
+
+def get_rate_limiter():
+    """Return the process-wide rate limiter."""
+    return _shared_limiter
+
+
+def configure_rate_limiter(limits=None, enabled=True, initial_concurrency=DEFAULT_INITIAL_CONCURRENCY,
+                           max_concurrency=DEFAULT_MAX_CONCURRENCY, min_concurrency=1,
+                           max_retries=DEFAULT_MAX_RETRIES, base_delay=0.5, max_delay=30.0):
+    """
+    Replace the process-wide rate limiter.
+
+    Parameters:
+    limits (dict): Maps a model to its (requests per minute, tokens per minute). Defaults to DEFAULT_LIMITS.
+    enabled (bool): False turns limiting and retries off. Defaults to True.
+    initial_concurrency (int): Requests per model allowed in flight at first. Defaults to 8.
+    max_concurrency (int): Upper bound of the adaptive concurrency limit. Defaults to 64.
+    min_concurrency (int): Lower bound of the adaptive concurrency limit. Defaults to 1.
+    max_retries (int): Retries of a failed request. Defaults to 6.
+    base_delay (float): Backoff ceiling of the first retry in seconds. Defaults to 0.5.
+    max_delay (float): Largest backoff ceiling in seconds. Defaults to 30.
+
+    Returns:
+    RateLimiter: The new limiter.
+    """
+    global _shared_limiter
+    _shared_limiter = RateLimiter(limits, enabled, initial_concurrency=initial_concurrency,
+                                  max_concurrency=max_concurrency, min_concurrency=min_concurrency,
+                                  max_retries=max_retries, base_delay=base_delay, max_delay=max_delay)
+    return _shared_limiter
@@ -0,0 +1,252 @@
+"""
+Search indexes over a ``VectorStore`` for ``RAGKnowledgePromptAgent`` retrieval.
+
+Every backend answers the same question — the ``k`` rows most similar to a
+query embedding by cosine similarity — and exposes the same two methods:
+``build(store)`` and ``search(query, k, min_similarity)``.
+
+- ``FlatIndex`` scans every row. It is exact and needs no training.
+- ``IVFIndex`` clusters the rows with spherical k-means and, per query, only
+  scores the rows of the ``n_probe`` closest clusters. ``n_lists`` and ``n_probe``
+  trade recall for latency.
+
+Both run in-process on CPU with NumPy only. Use ``recall_at_k`` to measure how
+close an approximate backend gets to the exact one.
+"""
+
+import numpy as np
+
+
+# Rows scored per matrix product when assigning a large store to clusters.
+ASSIGN_BATCH_ROWS = 65536
+
+
+def top_k(scores, k, min_similarity=None, rows=None):
+    """
+    Picks the ``k`` best scores with ``argpartition``.
+
+    Parameters:
+    scores (numpy.ndarray): One similarity per candidate.
+    k (int): Maximum number of results.
+    min_similarity (float): Drop results scoring below this value. Defaults to None (keep all).
+    rows (numpy.ndarray): Store row of each candidate. Defaults to the candidate positions.
+
+    Returns:
+    list: (row, similarity) pairs, best first.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind="stable")]
+    if rows is None:
+        results = [(int(i), float(scores[i])) for i in top]
+    else:
+        results = [(int(rows[i]), float(scores[i])) for i in top]
+    if min_similarity is not None:
+        results = [(row, score) for row, score in results if score >= min_similarity]
+    return results
+
+
+def _unit(query):
+    """Return ``query`` as a unit float32 vector, or None if it is all zeros."""
+    query = np.asarray(query, dtype=np.float32)
+    norm = np.linalg.norm(query)
+    if norm == 0:
+        return None
+    return query / norm
+
+
+class FlatIndex:
+    """
+    Exact search: one matrix-vector product over every row of the store.
+    """
+
+    def __init__(self):
+        """Initializes an empty index."""
+        self.store = None
+
+    def build(self, store):
+        """
+        Indexes a vector store. The store's vectors are used in place.
+
+        Parameters:
+        store (VectorStore): The vectors to search.
+
+        Returns:
+        FlatIndex: This index.
+        """
+        self.store = store
+        return self
+
+    def search(self, query, k=1, min_similarity=None):
+        """
+        Finds the ``k`` rows most similar to ``query``.
+
+        Parameters:
+        query (list): The query embedding.
+        k (int): Maximum number of results. Defaults to 1.
+        min_similarity (float): Drop results scoring below this value. Defaults to None (keep all).
+
+        Returns:
+        list: (row, similarity) pairs, best first.
+        """
+        return self.store.search(query, k=k, min_similarity=min_similarity)
+
+
+class IVFIndex:
+    """
+    Approximate search with an inverted file over k-means clusters.
+
+    Rows are assigned to the nearest of ``n_lists`` centroids. A query scores
+    the centroids, then scores exactly only the rows in the ``n_probe`` best
+    lists. Raising ``n_probe`` increases recall and latency; ``n_probe == n_lists``
+    is an exact search.
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, train_size=100000, train_iterations=10, seed=0):
+        """
+        Initializes the index.
+
+        Parameters:
+        n_lists (int): Number of clusters. Defaults to about the square root of the row count.
+        n_probe (int): Clusters scanned per query. Defaults to 8.
+        train_size (int): Maximum rows sampled to train the centroids. Defaults to 100000.
+        train_iterations (int): k-means iterations. Defaults to 10.
+        seed (int): Seed for sampling and centroid initialization. Defaults to 0.
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_size = train_size
+        self.train_iterations = train_iterations
+        self.seed = seed
+        self.store = None
+        self.centroids = None
+        self.lists = []
+
+    def _unit_rows(self, rows):
+        """Return the store rows ``rows`` as unit float32 vectors."""
+        vectors = np.asarray(self.store.vectors[rows], dtype=np.float32)
+        if not self.store.normalized:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors = vectors / norms
+        return vectors
+
+    def _train(self, live_rows, n_lists):
+        """Run spherical k-means on a sample of the live rows and return the centroids."""
+        rng = np.random.default_rng(self.seed)
+        sample_rows = np.sort(rng.choice(live_rows, size=min(len(live_rows), self.train_size), replace=False))
+        sample = self._unit_rows(sample_rows)
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their previous centroid
+            filled = norms[:, 0] > 0
+            centroids[filled] = sums[filled] / norms[filled]
+        return centroids
+
+    def build(self, store):
+        """
+        Trains the centroids and assigns every live (not tombstoned) row of the store to a list.
+
+        Parameters:
+        store (VectorStore): The vectors to search.
+
+        Returns:
+        IVFIndex: This index.
+        """
+        self.store = store
+        live_rows = store.live_rows()
+        count = len(live_rows)
+        if count == 0:
+            self.centroids, self.lists = np.empty((0, store.dim), dtype=np.float32), []
+            return self
+        n_lists = self.n_lists or int(np.sqrt(count))
+        n_lists = max(1, min(n_lists, count))
+        self.centroids = self._train(live_rows, n_lists)
+
+        assignment = np.empty(count, dtype=np.int64)
+        for start in range(0, count, ASSIGN_BATCH_ROWS):
+            batch = slice(start, min(start + ASSIGN_BATCH_ROWS, count))
+            assignment[batch] = np.argmax(self._unit_rows(live_rows[batch]) @ self.centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+        self.lists = [live_rows[order[bounds[i]:bounds[i + 1]]] for i in range(n_lists)]
+        return self
+
+    def search(self, query, k=1, min_similarity=None):
+        """
+        Finds approximately the ``k`` rows most similar to ``query``.
+
+        Parameters:
+        query (list): The query embedding.
+        k (int): Maximum number of results. Defaults to 1.
+        min_similarity (float): Drop results scoring below this value. Defaults to None (keep all).
+
+        Returns:
+        list: (row, similarity) pairs, best first.
+        """
+        query = _unit(query)
+        if query is None or not self.lists:
+            return []
+        n_probe = max(1, min(self.n_probe, len(self.lists)))
+        centroid_scores = self.centroids @ query
+        probed = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+        rows = np.sort(np.concatenate([self.lists[i] for i in probed]))
+        if len(rows) == 0:
+            return []
+        return top_k(self._unit_rows(rows) @ query, k, min_similarity, rows=rows)
+
+
+INDEX_BACKENDS = {
+    "flat": FlatIndex,
+    "ivf": IVFIndex,
+}
+
+
+def create_index(backend="flat", **params):
+    """
+    Instantiates a search index backend by name.
+
+    Parameters:
+    backend (str): One of INDEX_BACKENDS. Defaults to 'flat'.
+    **params: Tuning parameters passed to the backend.
+
+    Returns:
+    An unbuilt index.
+    """
+    try:
+        index_class = INDEX_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown index backend {backend!r}; expected one of {sorted(INDEX_BACKENDS)}") from None
+    return index_class(**params)
+
+
+def recall_at_k(index, exact_index, queries, k=10):
+    """
+    Measures the fraction of the exact top-k rows an index also returns.
+
+    Parameters:
+    index: The index under test.
+    exact_index: A built exact index over the same store, e.g. FlatIndex.
+    queries (list): Query embeddings.
+    k (int): Number of results compared per query. Defaults to 10.
+
+    Returns:
+    float: Mean recall@k over the queries.
+    """
+    recalls = []
+    for query in queries:
+        expected = {row for row, _ in exact_index.search(query, k=k)}
+        if not expected:
+            continue
+        found = {row for row, _ in index.search(query, k=k)}
+        recalls.append(len(expected & found) / len(expected))
+    return float(np.mean(recalls)) if recalls else 1.0
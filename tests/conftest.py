@@ -5,8 +5,46 @@ All OpenAI API calls are mocked to avoid actual API usage during tests.
 
 import pytest
 from unittest.mock import Mock, MagicMock
+import sys
 import numpy as np
 
+from tests.fake_openai import FakeOpenAIServer
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_state():
+    """Isolate shared state per test: a fresh memory-only embedding cache, no completion cache, fresh rate limiter and in-flight call tables, tracing off, and no pooled clients or log handlers left behind."""
+    embedding_cache = sys.modules.get('workflow_agents.embedding_cache')
+    if embedding_cache is not None:
+        embedding_cache.configure_embedding_cache(path=None)
+    completion_cache = sys.modules.get('workflow_agents.completion_cache')
+    if completion_cache is not None:
+        completion_cache.configure_completion_cache(enabled=False)
+    single_flight = sys.modules.get('workflow_agents.single_flight')
+    if single_flight is not None:
+        single_flight.configure_single_flight()
+    rate_limits = sys.modules.get('workflow_agents.rate_limits')
+    if rate_limits is not None:
+        rate_limits.configure_rate_limiter()
+    tracing = sys.modules.get('workflow_agents.tracing')
+    if tracing is not None:
+        tracing.configure_tracing()
+    yield
+    logs = sys.modules.get('workflow_agents.logs')
+    if logs is not None:
+        logs.reset_logging()
+    clients = sys.modules.get('workflow_agents.clients')
+    if clients is not None:
+        clients.close_shared_clients()
+
+
+@pytest.fixture
+def fake_openai_server(monkeypatch):
+    """Serve the chat completions and embeddings API from a local fake server, and point the agents at it."""
+    with FakeOpenAIServer() as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        yield server
+
 
 @pytest.fixture
 def mock_openai_api_key():
@@ -0,0 +1,340 @@
+"""
+A local stand-in for the OpenAI chat completions and embeddings API.
+
+``FakeOpenAIServer`` serves ``POST /v1/chat/completions`` (plain and streamed)
+and ``POST /v1/embeddings`` over real HTTP on 127.0.0.1, so the agents can be
+tested and benchmarked offline with their real clients, connection pooling and
+retries. Point the agents at it through ``OPENAI_BASE_URL``:
+
+    with FakeOpenAIServer(latency=lognormal(0.3, 0.5), tokens_per_second=80) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        ...
+
+Answers are deterministic. Completions come from a responder, called with the
+request body; the default one returns filler text of ``completion_tokens``
+tokens, a small JSON plan or an accepting JSON verdict for JSON-mode requests.
+Embeddings are bag-of-words vectors built from per-word random vectors, so
+texts sharing words are similar and routing and retrieval stay meaningful.
+Latency, token throughput and injected 429 rate-limit errors are configurable.
+"""
+
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+CHARS_PER_TOKEN = 4
+EMBEDDING_DIM = 3072
+
+_WORD = re.compile(r"[a-z0-9]+")
+_FILLER = ("the", "agent", "plan", "step", "user", "story", "feature", "task", "email", "router",
+           "system", "response", "product", "value", "team", "support")
+
+
+def fixed(seconds):
+    """Latency distribution: always ``seconds``."""
+    return lambda rng: seconds
+
+
+def uniform(low, high):
+    """Latency distribution: uniform between ``low`` and ``high`` seconds."""
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal(median, sigma):
+    """Latency distribution: log-normal with the given median (seconds) and shape, like real API latencies."""
+    return lambda rng: rng.lognormvariate(math.log(median), sigma)
+
+
+def parse_latency(spec):
+    """
+    Parses a latency distribution from text.
+
+    Parameters:
+    spec (str): 'SECONDS', 'fixed:SECONDS', 'uniform:LOW,HIGH' or 'lognormal:MEDIAN,SIGMA'.
+
+    Returns:
+    callable: The distribution, taking a ``random.Random`` and returning seconds.
+    """
+    kind, _, args = spec.partition(":") if ":" in spec else ("fixed", "", spec)
+    distributions = {"fixed": fixed, "uniform": uniform, "lognormal": lognormal}
+    if kind not in distributions:
+        raise ValueError(f"Unknown latency distribution {kind!r}; expected one of {', '.join(distributions)}")
+    return distributions[kind](*(float(value) for value in args.split(",")))
+
+
+def estimate_tokens(text):
+    """Return the token count of ``text`` at ~4 characters per token."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def filler_text(seed_text, tokens):
+    """Return about ``tokens`` tokens of deterministic filler words chosen from ``seed_text``."""
+    digest = int(hashlib.sha256(seed_text.encode("utf-8")).hexdigest(), 16)
+    words, length = [], 0
+    while length < tokens * CHARS_PER_TOKEN:
+        word = _FILLER[(digest + len(words) * 7) % len(_FILLER)]
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def request_text(request):
+    """Return the concatenated message contents of a chat completion request."""
+    return "\n".join(str(message.get("content", "")) for message in request.get("messages", ()))
+
+
+def default_responder(request, completion_tokens=64):
+    """
+    Answers a chat completion request.
+
+    JSON-mode requests asking for "steps" get a three-step plan and those asking for a
+    "verdict" get an acceptance; other requests get ``completion_tokens`` of filler text.
+    """
+    text = request_text(request)
+    if (request.get("response_format") or {}).get("type") == "json_object":
+        if '"steps"' in text:
+            return json.dumps({"steps": [
+                {"id": "1", "text": "Define the user stories", "depends_on": [], "artifact": "user stories"},
+                {"id": "2", "text": "Group the stories into features", "depends_on": ["1"], "artifact": "features"},
+                {"id": "3", "text": "Define the engineering tasks", "depends_on": ["1", "2"], "artifact": "tasks"},
+            ]})
+        if '"verdict"' in text:
+            return json.dumps({"verdict": "Yes", "reasons": "The answer meets the criteria.", "instructions": ""})
+        return "{}"
+    if text.startswith("Does the following answer") or "\nDoes the following answer" in text:
+        return "Yes, the answer meets the criteria."
+    return filler_text(text, completion_tokens)
+
+
+class FakeOpenAIServer:
+    """
+    An OpenAI-compatible HTTP server answering from a local responder.
+
+    Every request waits for a latency drawn from the distribution; completions
+    additionally take ``completion_tokens / tokens_per_second``, and streamed ones
+    send their tokens at that rate.
+    """
+
+    def __init__(self, latency=None, tokens_per_second=None, completion_tokens=64, responder=None,
+                 rate_limit_every=None, rate_limit_probability=0.0, retry_after=0.01, headers=None,
+                 embedding_dim=EMBEDDING_DIM, seed=0, port=0):
+        """
+        Initializes the server; call start() or use it as a context manager.
+
+        Parameters:
+        latency (callable): Latency distribution, e.g. lognormal(0.3, 0.5). Defaults to None (no delay).
+        tokens_per_second (float): Completion generation speed. Defaults to None (instant).
+        completion_tokens (int): Length of the default responder's filler answers. Defaults to 64.
+        responder (callable): Called with the request body, returns the completion text.
+                              Defaults to ``default_responder``.
+        rate_limit_every (int): Answer every Nth request with a 429 error. Defaults to None.
+        rate_limit_probability (float): Chance of answering a request with a 429 error. Defaults to 0.
+        retry_after (float): Seconds advertised in the Retry-After headers of 429 errors. Defaults to 0.01.
+        headers (dict): Extra headers of every successful response, e.g. {'x-ratelimit-limit-requests': '60'}.
+                        Defaults to None.
+        embedding_dim (int): Length of embeddings unless the request asks for 'dimensions'. Defaults to 3072.
+        seed (int): Seed for latencies, rate limiting and word vectors. Defaults to 0.
+        port (int): Port to listen on. Defaults to 0 (any free port).
+        """
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.responder = responder
+        self.rate_limit_every = rate_limit_every
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.headers = headers or {}
+        self.embedding_dim = embedding_dim
+        self.seed = seed
+        self.port = port
+        self.stats = {}
+        self._word_vectors = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._httpd = None
+        self._thread = None
+        self.reset_stats()
+
+    @property
+    def base_url(self):
+        """The API base URL to give the OpenAI clients."""
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/v1"
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", self.port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_stats(self):
+        """Zero the request and token counters."""
+        with self._lock:
+            self.stats = {"chat_completions": 0, "embeddings": 0, "embedded_inputs": 0, "rate_limited": 0,
+                          "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, increment in increments.items():
+                self.stats[name] += increment
+
+    def _draw(self):
+        """Return (latency seconds, whether to answer with a 429) for a new request."""
+        with self._lock:
+            self._requests += 1
+            limited = bool(self.rate_limit_every and self._requests % self.rate_limit_every == 0)
+            limited = limited or (self.rate_limit_probability > 0 and self._rng.random() < self.rate_limit_probability)
+            return (self.latency(self._rng) if self.latency else 0.0), limited
+
+    def _word_vector(self, word, dim):
+        key = (word, dim)
+        vector = self._word_vectors.get(key)
+        if vector is None:
+            seed = int.from_bytes(hashlib.sha256(f"{self.seed}:{word}".encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+            self._word_vectors[key] = vector
+        return vector
+
+    def embed(self, text, dim=None):
+        """Return the deterministic unit embedding of ``text``: the normalized sum of its word vectors."""
+        dim = dim or self.embedding_dim
+        words = _WORD.findall(text.lower()) or [text]
+        vector = np.sum([self._word_vector(word, dim) for word in words], axis=0)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _generation_seconds(self, tokens):
+        return tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def handle(self, handler, path, request):
+        """Answer one API request on ``handler``."""
+        latency, limited = self._draw()
+        time.sleep(latency)
+        if limited:
+            self._count(rate_limited=1)
+            return handler.send_json(429, {"error": {
+                "message": "Rate limit reached (fake server).", "type": "requests", "code": "rate_limit_exceeded"
+            }}, {"retry-after-ms": str(int(self.retry_after * 1000)), "retry-after": str(math.ceil(self.retry_after))})
+
+        if path.endswith("/embeddings"):
+            return self._embeddings(handler, request)
+        if path.endswith("/chat/completions"):
+            return self._chat_completion(handler, request)
+        return handler.send_json(404, {"error": {"message": f"Unknown endpoint {path}", "type": "invalid_request_error"}})
+
+    def _embeddings(self, handler, request):
+        inputs = request.get("input", "")
+        inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+        data = [
+            {"object": "embedding", "index": i, "embedding": np.round(self.embed(text, request.get("dimensions")), 6).tolist()}
+            for i, text in enumerate(inputs)
+        ]
+        tokens = sum(estimate_tokens(text) for text in inputs)
+        self._count(embeddings=1, embedded_inputs=len(inputs), prompt_tokens=tokens)
+        handler.send_json(200, {
+            "object": "list", "data": data, "model": request.get("model", "text-embedding-3-large"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    def _chat_completion(self, handler, request):
+        responder = self.responder or (lambda body: default_responder(body, self.completion_tokens))
+        content = responder(request)
+        prompt_tokens, completion_tokens = estimate_tokens(request_text(request)), estimate_tokens(content)
+        self._count(chat_completions=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        base = {"id": f"chatcmpl-fake-{self._requests}", "created": int(time.time()), "model": request.get("model", "")}
+
+        if not request.get("stream"):
+            time.sleep(self._generation_seconds(completion_tokens))
+            return handler.send_json(200, dict(base, object="chat.completion", choices=[
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+            ], usage={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens}))
+
+        handler.start_stream()
+        pause = self._generation_seconds(1)
+        for start in range(0, len(content), CHARS_PER_TOKEN):
+            time.sleep(pause)
+            handler.send_event(dict(base, object="chat.completion.chunk", choices=[
+                {"index": 0, "delta": {"content": content[start:start + CHARS_PER_TOKEN]}, "finish_reason": None}
+            ]))
+        handler.send_event(dict(base, object="chat.completion.chunk", choices=[
+            {"index": 0, "delta": {}, "finish_reason": "stop"}
+        ]))
+        handler.end_stream()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler delegating to the server's ``FakeOpenAIServer``."""
+
+    # Keep-alive connections, as with the real API
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY each response waits on a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            return self.send_json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+        self.server.fake.handle(self, self.path, request)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 200:
+            headers = dict(self.server.fake.headers, **(headers or {}))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in self.server.fake.headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def send_event(self, payload):
+        self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+    def end_stream(self):
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
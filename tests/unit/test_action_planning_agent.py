@@ -4,7 +4,8 @@ All OpenAI API calls are mocked.
 """
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
 import sys
 import os
 
@@ -82,3 +83,57 @@ class TestActionPlanningAgent:
         # Should not have empty strings
         assert "" not in steps
 
+    @patch('workflow_agents.base_agents.AsyncOpenAI')
+    def test_aextract_steps_matches_sync_parsing(self, mock_async_openai, mock_openai_api_key, sample_knowledge):
+        """Test that aextract_steps_from_prompt parses steps like the sync method."""
+        mock_client = MagicMock()
+        mock_completion = MagicMock()
+        mock_completion.choices[0].message.content = "1. First step\n\n2. Second step\n"
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_completion)
+        mock_async_openai.return_value = mock_client
+
+        agent = ActionPlanningAgent(mock_openai_api_key, sample_knowledge)
+        steps = asyncio.run(agent.aextract_steps_from_prompt("Extract steps"))
+
+        assert steps == ["1. First step", "2. Second step"]
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_extract_plan_parses_json(self, mock_openai, mock_openai_api_key, sample_knowledge):
+        """Test that extract_plan_from_prompt returns structured steps and drops invalid dependencies."""
+        mock_client = MagicMock()
+        mock_completion = MagicMock()
+        mock_completion.choices[0].message.content = (
+            '{"steps": ['
+            '{"id": 1, "text": "Write stories", "depends_on": [], "artifact": "stories"},'
+            '{"id": 2, "text": "Group features", "depends_on": [1, 3], "artifact": "features"},'
+            '{"id": 3, "text": "Define tasks", "depends_on": ["1", "2"]}'
+            ']}'
+        )
+        mock_client.chat.completions.create.return_value = mock_completion
+        mock_openai.return_value = mock_client
+
+        agent = ActionPlanningAgent(mock_openai_api_key, sample_knowledge)
+        plan = agent.extract_plan_from_prompt("Plan the product")
+
+        assert [step["id"] for step in plan] == ["1", "2", "3"]
+        # The forward reference to step 3 is dropped
+        assert plan[1]["depends_on"] == ["1"]
+        assert plan[2]["depends_on"] == ["1", "2"]
+        assert plan[2]["artifact"] == "step 3 output"
+        call_kwargs = mock_client.chat.completions.create.call_args[1]
+        assert call_kwargs['response_format'] == {"type": "json_object"}
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_extract_plan_falls_back_to_sequence(self, mock_openai, mock_openai_api_key, sample_knowledge):
+        """Test that a non-JSON answer becomes a sequential plan."""
+        mock_client = MagicMock()
+        mock_completion = MagicMock()
+        mock_completion.choices[0].message.content = "1. First step\n2. Second step"
+        mock_client.chat.completions.create.return_value = mock_completion
+        mock_openai.return_value = mock_client
+
+        agent = ActionPlanningAgent(mock_openai_api_key, sample_knowledge)
+        plan = agent.extract_plan_from_prompt("Plan the product")
+
+        assert [step["text"] for step in plan] == ["1. First step", "2. Second step"]
+        assert [step["depends_on"] for step in plan] == [[], ["1"]]
@@ -0,0 +1,68 @@
+"""
+Unit tests for the streaming chunker.
+"""
+
+import pytest
+import sys
+import os
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+
+from workflow_agents.chunking import iter_chunks, read_blocks
+
+
+SAMPLE_TEXT = (
+    "The router reads every email. It decides which team should answer.\n\n"
+    "Support tickets go to the help desk!  Sales leads go to the account team.\n"
+    "Anything else is archived for review.\n\n"
+) * 20
+
+
+class TestChunking:
+    """Test cases for iter_chunks."""
+
+    def test_offsets_point_into_the_original_text(self):
+        """Test that each chunk is the whitespace-collapsed slice given by its offsets."""
+        chunks = list(iter_chunks(SAMPLE_TEXT, chunk_size=200, chunk_overlap=30))
+
+        assert len(chunks) > 5
+        assert [chunk["chunk_id"] for chunk in chunks] == list(range(len(chunks)))
+        for chunk in chunks:
+            assert chunk["end_char"] - chunk["start_char"] <= 200
+            assert chunk["text"] == " ".join(SAMPLE_TEXT[chunk["start_char"]:chunk["end_char"]].split())
+        assert chunks[-1]["end_char"] == len(SAMPLE_TEXT)
+
+    def test_chunks_end_on_natural_boundaries(self):
+        """Test that chunks end after a paragraph, line or sentence rather than mid-word."""
+        chunks = list(iter_chunks(SAMPLE_TEXT, chunk_size=200, chunk_overlap=30))
+
+        for chunk in chunks[:-1]:
+            assert chunk["text"][-1] in ".!?"
+
+    def test_streamed_blocks_match_whole_text(self):
+        """Test that feeding the text in small blocks gives the same chunks as one string."""
+        blocks = (SAMPLE_TEXT[i:i + 37] for i in range(0, len(SAMPLE_TEXT), 37))
+
+        assert list(iter_chunks(blocks, chunk_size=200, chunk_overlap=30)) == \
+            list(iter_chunks(SAMPLE_TEXT, chunk_size=200, chunk_overlap=30))
+
+    def test_token_sizing(self):
+        """Test that token-sized chunks stay within the token limit."""
+        from workflow_agents.tokens import count_tokens
+
+        chunks = list(iter_chunks(SAMPLE_TEXT, chunk_size=40, chunk_overlap=5, unit="tokens"))
+
+        assert len(chunks) > 5
+        assert all(count_tokens(chunk["text"], "text-embedding-3-large") <= 40 for chunk in chunks)
+
+    def test_read_blocks_and_invalid_arguments(self, tmp_path):
+        """Test file reading in blocks and rejection of bad settings."""
+        path = tmp_path / "knowledge.txt"
+        path.write_text(SAMPLE_TEXT, encoding="utf-8")
+
+        assert "".join(read_blocks(str(path), block_size=100)) == SAMPLE_TEXT
+        with pytest.raises(ValueError):
+            list(iter_chunks(SAMPLE_TEXT, chunk_size=10, chunk_overlap=10))
+        with pytest.raises(ValueError):
+            list(iter_chunks(SAMPLE_TEXT, unit="words"))
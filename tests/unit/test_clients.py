@@ -0,0 +1,108 @@
+"""
+Unit tests for the shared OpenAI client pool.
+No real clients are created; the client class is mocked.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import sys
+import os
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+
+from workflow_agents.clients import ClientPool, VOCAREUM_BASE_URL, get_client_pool
+from workflow_agents.base_agents import DirectPromptAgent, RoutingAgent
+
+
+class TestClientPool:
+    """Test cases for ClientPool."""
+
+    def test_reuses_client_for_same_credentials(self, mock_openai_api_key):
+        """Test that the same client is returned for the same key and base URL."""
+        factory = MagicMock()
+        pool = ClientPool()
+
+        first = pool.get(mock_openai_api_key, factory=factory)
+        second = pool.get(mock_openai_api_key, factory=factory)
+
+        assert first is second
+        factory.assert_called_once()
+        kwargs = factory.call_args[1]
+        assert (kwargs['base_url'], kwargs['api_key']) == (VOCAREUM_BASE_URL, mock_openai_api_key)
+        # Retries are left to the rate limiter
+        assert kwargs['max_retries'] == 0
+
+    def test_separate_clients_per_key(self):
+        """Test that different API keys get different clients."""
+        factory = MagicMock(side_effect=lambda **kwargs: MagicMock())
+        pool = ClientPool()
+
+        assert pool.get("key-a", factory=factory) is not pool.get("key-b", factory=factory)
+        assert len(pool) == 2
+
+    def test_configured_limits_pass_http_client(self, mock_openai_api_key):
+        """Test that connection limits give the client a dedicated httpx client."""
+        factory = MagicMock()
+        pool = ClientPool(max_connections=4, max_keepalive_connections=2)
+
+        pool.get(mock_openai_api_key, factory=factory)
+
+        http_client = factory.call_args[1]['http_client']
+        assert http_client is not None
+        pool.close()
+        assert http_client.is_closed
+
+    def test_close_empties_pool(self, mock_openai_api_key):
+        """Test that close() closes every client and empties the pool."""
+        factory = MagicMock()
+        pool = ClientPool()
+        client = pool.get(mock_openai_api_key, factory=factory)
+
+        pool.close()
+
+        client.close.assert_called_once()
+        assert len(pool) == 0
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_agents_share_one_client(self, mock_openai, mock_openai_api_key):
+        """Test that repeated calls and different agents reuse one client."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "ok"
+        mock_openai.return_value = mock_client
+
+        agent = DirectPromptAgent(mock_openai_api_key)
+        agent.respond("one")
+        agent.respond("two")
+        RoutingAgent(mock_openai_api_key).get_embedding("three")
+
+        mock_openai.assert_called_once()
+        assert mock_client.chat.completions.create.call_count == 2
+
+    def test_aclose_awaits_async_clients_of_scope(self, mock_openai_api_key):
+        """Test that aclose(scope) awaits the close of that scope's clients only."""
+        factory = MagicMock()
+        factory.return_value.close = AsyncMock()
+        pool = ClientPool()
+        scoped = pool.get(mock_openai_api_key, factory=factory, scope="loop")
+        factory.return_value = MagicMock()
+        unscoped = pool.get(mock_openai_api_key, factory=factory)
+
+        asyncio.run(pool.aclose(scope="loop"))
+
+        scoped.close.assert_awaited_once()
+        unscoped.close.assert_not_called()
+        assert len(pool) == 1
+
+    def test_clients_of_closed_event_loops_are_dropped(self, fake_openai_server, mock_openai_api_key):
+        """Test that repeated asyncio.run calls do not accumulate async clients bound to finished loops."""
+        agent = DirectPromptAgent(mock_openai_api_key)
+
+        for attempt in range(5):
+            asyncio.run(agent.arespond(f"Question {attempt}"))
+
+        # Only the client of the last loop is left, until another client is created
+        assert len(get_client_pool()) == 1
+        agent.respond("Sync question")
+        assert len(get_client_pool()) == 1
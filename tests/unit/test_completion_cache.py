@@ -0,0 +1,107 @@
+"""
+Unit tests for the completion cache.
+All OpenAI API calls are mocked.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import sys
+import os
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+
+from workflow_agents.completion_cache import CompletionCache, completion_key, configure_completion_cache
+from workflow_agents.base_agents import DirectPromptAgent, KnowledgeAugmentedPromptAgent
+
+
+def request(content, model="gpt-3.5-turbo"):
+    """Build chat completion parameters with one user message."""
+    return {"model": model, "messages": [{"role": "user", "content": content}], "temperature": 0}
+
+
+class TestCompletionCache:
+    """Test cases for CompletionCache."""
+
+    def test_key_is_canonical(self):
+        """Test that the key ignores parameter order but not model, messages or parameters."""
+        key = completion_key(request("hello"))
+        assert key == completion_key(dict(reversed(list(request("hello").items()))))
+        assert key != completion_key(request("hello!"))
+        assert key != completion_key(request("hello", model="gpt-4"))
+        assert key != completion_key(dict(request("hello"), temperature=0.5))
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        """Test that the LRU tier keeps only the most recently used entries and counts hits and misses."""
+        cache = CompletionCache(max_memory_entries=2)
+        cache.put(request("a"), "A")
+        cache.put(request("b"), "B")
+        cache.get(request("a"))
+        cache.put(request("c"), "C")
+
+        assert cache.get(request("b")) is None
+        assert cache.get(request("a")) == "A"
+        assert cache.stats() == {"hits": 2, "misses": 1, "hit_rate": pytest.approx(2 / 3), "memory_entries": 2}
+
+    def test_entries_expire_after_ttl(self, tmp_path):
+        """Test that entries older than the TTL are misses in both tiers."""
+        cache = CompletionCache(str(tmp_path / "completions.sqlite"), ttl=60)
+        with patch('workflow_agents.completion_cache.time.time', return_value=1000.0):
+            cache.put(request("a"), "A")
+        with patch('workflow_agents.completion_cache.time.time', return_value=1030.0):
+            assert cache.get(request("a")) == "A"
+        with patch('workflow_agents.completion_cache.time.time', return_value=1100.0):
+            assert cache.get(request("a")) is None
+        cache.close()
+
+    def test_disk_tier_survives_restart_and_is_bounded(self, tmp_path):
+        """Test that a new cache on the same file serves earlier entries, up to max_disk_entries."""
+        path = str(tmp_path / "completions.sqlite")
+        cache = CompletionCache(path, max_disk_entries=2)
+        for i, name in enumerate("abc"):
+            with patch('workflow_agents.completion_cache.time.time', return_value=1000.0 + i):
+                cache.put(request(name), name.upper())
+        cache.close()
+
+        reopened = CompletionCache(path)
+        assert reopened.get(request("a")) is None
+        assert reopened.get(request("c")) == "C"
+        assert reopened.hits == 1
+        reopened.close()
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_agents_reuse_cached_completions(self, mock_openai, mock_openai_api_key, sample_persona, sample_knowledge):
+        """Test that an enabled cache answers repeated agent requests without calling the API."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "Paris"
+        mock_openai.return_value = mock_client
+        agent = KnowledgeAugmentedPromptAgent(mock_openai_api_key, sample_persona, sample_knowledge)
+
+        agent.respond("What is the capital of France?")
+        agent.respond("What is the capital of France?")
+        assert mock_client.chat.completions.create.call_count == 2
+
+        cache = configure_completion_cache()
+        assert agent.respond("What is the capital of France?") == "Paris"
+        assert agent.respond("What is the capital of France?") == "Paris"
+        assert mock_client.chat.completions.create.call_count == 3
+        assert cache.hits == 1
+
+    @patch('workflow_agents.base_agents.AsyncOpenAI')
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_sync_and_async_agents_share_entries(self, mock_openai, mock_async_openai, mock_openai_api_key):
+        """Test that arespond hits an entry stored by respond."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "Paris"
+        mock_openai.return_value = mock_client
+        mock_async_client = MagicMock()
+        mock_async_client.chat.completions.create = AsyncMock()
+        mock_async_openai.return_value = mock_async_client
+
+        configure_completion_cache()
+        agent = DirectPromptAgent(mock_openai_api_key)
+        agent.respond("Capital of France?")
+
+        assert asyncio.run(agent.arespond("Capital of France?")) == "Paris"
+        mock_async_client.chat.completions.create.assert_not_awaited()
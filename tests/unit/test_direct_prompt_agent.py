@@ -4,7 +4,8 @@ All OpenAI API calls are mocked.
 """
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
 import sys
 import os
 
@@ -53,10 +54,9 @@ class TestDirectPromptAgent:
         agent.respond(sample_prompt)
         
         # Verify OpenAI was instantiated with Vocareum base URL
-        mock_openai.assert_called_once_with(
-            base_url="https://openai.vocareum.com/v1",
-            api_key=mock_openai_api_key
-        )
+        mock_openai.assert_called_once()
+        assert mock_openai.call_args[1]['base_url'] == "https://openai.vocareum.com/v1"
+        assert mock_openai.call_args[1]['api_key'] == mock_openai_api_key
         
         # Verify chat completion was called
         mock_client.chat.completions.create.assert_called_once()
@@ -85,3 +85,49 @@ class TestDirectPromptAgent:
         messages = call_kwargs['messages']
         assert all(msg['role'] != 'system' for msg in messages)
 
+    @patch('workflow_agents.base_agents.AsyncOpenAI')
+    def test_arespond_uses_async_client(self, mock_async_openai, mock_openai_api_key, sample_prompt):
+        """Test that arespond awaits AsyncOpenAI with the same messages as respond."""
+        mock_client = MagicMock()
+        mock_completion = MagicMock()
+        mock_completion.choices[0].message.content = "Paris"
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_completion)
+        mock_async_openai.return_value = mock_client
+
+        agent = DirectPromptAgent(mock_openai_api_key)
+        response = asyncio.run(agent.arespond(sample_prompt))
+
+        assert response == "Paris"
+        call_kwargs = mock_client.chat.completions.create.call_args[1]
+        assert call_kwargs['messages'] == [{"role": "user", "content": sample_prompt}]
+        assert call_kwargs['temperature'] == 0
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_respond_streams_tokens(self, mock_openai, mock_openai_api_key, sample_prompt):
+        """Test that respond(stream=True) yields the response text piece by piece."""
+        chunks = [MagicMock(choices=[MagicMock(delta=MagicMock(content=text))]) for text in ("Pa", "ris", None)]
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value = iter(chunks)
+        mock_openai.return_value = mock_client
+
+        agent = DirectPromptAgent(mock_openai_api_key)
+
+        assert list(agent.respond(sample_prompt, stream=True)) == ["Pa", "ris"]
+        assert mock_client.chat.completions.create.call_args[1]['stream'] is True
+
+    @patch('workflow_agents.base_agents.AsyncOpenAI')
+    def test_arespond_streams_tokens(self, mock_async_openai, mock_openai_api_key, sample_prompt):
+        """Test that arespond(stream=True) returns an async iterator over the response text."""
+        async def chunks():
+            for text in ("Pa", "ris"):
+                yield MagicMock(choices=[MagicMock(delta=MagicMock(content=text))])
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=chunks())
+        mock_async_openai.return_value = mock_client
+
+        async def collect():
+            return [token async for token in await agent.arespond(sample_prompt, stream=True)]
+
+        agent = DirectPromptAgent(mock_openai_api_key)
+        assert asyncio.run(collect()) == ["Pa", "ris"]
@@ -0,0 +1,85 @@
+"""
+Unit tests for the embedding cache.
+All OpenAI API calls are mocked.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import numpy as np
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+
+from workflow_agents.embedding_cache import EmbeddingCache, embedding_key
+from workflow_agents.base_agents import RAGKnowledgePromptAgent, RoutingAgent
+
+
+class TestEmbeddingCache:
+    """Test cases for EmbeddingCache."""
+
+    def test_key_depends_on_model_and_text(self):
+        """Test that the key changes with either the model or the text."""
+        key = embedding_key("model-a", "hello")
+        assert key == embedding_key("model-a", "hello")
+        assert key != embedding_key("model-b", "hello")
+        assert key != embedding_key("model-a", "hello!")
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        """Test that the LRU tier keeps only the most recently used entries."""
+        cache = EmbeddingCache(max_memory_entries=2)
+        cache.put("m", "a", [1.0])
+        cache.put("m", "b", [2.0])
+        cache.get("m", "a")
+        cache.put("m", "c", [3.0])
+
+        assert cache.get("m", "b") is None
+        assert cache.get("m", "a")[0] == 1.0
+        assert len(cache) == 2
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """Test that a new cache on the same file serves earlier entries."""
+        path = str(tmp_path / "embeddings.sqlite")
+        cache = EmbeddingCache(path)
+        cache.put("m", "text", [0.5, 0.25])
+        cache.close()
+
+        reopened = EmbeddingCache(path)
+        vector = reopened.get("m", "text")
+
+        assert vector.dtype == np.float32
+        np.testing.assert_allclose(vector, [0.5, 0.25])
+        assert reopened.hits == 1
+        reopened.close()
+
+    def test_put_many_writes_a_batch_in_one_transaction(self, tmp_path):
+        """Test that put_many stores every vector of a batch with a single commit."""
+        cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+        cache.put("m", "warm-up", [0.0])
+        statements = []
+        cache._connection.set_trace_callback(statements.append)
+
+        cache.put_many("m", [(f"text {i}", [float(i), 1.0]) for i in range(50)])
+        cache.close()
+
+        assert sum(statement.strip().upper() == "COMMIT" for statement in statements) == 1
+        reopened = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+        np.testing.assert_allclose(reopened.get("m", "text 49"), [49.0, 1.0])
+        reopened.close()
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_agents_share_cached_embeddings(self, mock_openai, mock_openai_api_key):
+        """Test that repeated text is embedded once across RAG and routing agents."""
+        mock_client = MagicMock()
+        mock_client.embeddings.create.return_value.data[0].embedding = [0.1, 0.2, 0.3]
+        mock_openai.return_value = mock_client
+
+        rag_agent = RAGKnowledgePromptAgent(mock_openai_api_key, "persona")
+        router = RoutingAgent(mock_openai_api_key)
+
+        first = rag_agent.get_embedding("same text")
+        second = router.get_embedding("same text")
+
+        mock_client.embeddings.create.assert_called_once()
+        np.testing.assert_allclose(second, first, rtol=1e-6)
@@ -4,7 +4,8 @@ All OpenAI API calls are mocked.
 """
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
 import sys
 import os
 
@@ -12,6 +13,8 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
 
 from workflow_agents.base_agents import EvaluationAgent, KnowledgeAugmentedPromptAgent
+from workflow_agents.executor import LineSink, current_step
+from workflow_agents.validators import RequiredFieldsValidator
 
 
 class TestEvaluationAgent:
@@ -140,3 +143,282 @@ class TestEvaluationAgent:
         assert result['iterations'] == max_iter
         assert mock_worker.respond.call_count == max_iter
 
+    @patch('workflow_agents.base_agents.AsyncOpenAI')
+    def test_aevaluate_awaits_worker_arespond(self, mock_async_openai, mock_openai_api_key, sample_persona, mock_evaluation_criteria, sample_prompt):
+        """Test that aevaluate awaits the worker's arespond and stops once the answer is accepted."""
+        mock_worker = MagicMock()
+        mock_worker.arespond = AsyncMock(return_value="Paris")
+
+        mock_client = MagicMock()
+        mock_completion = MagicMock()
+        mock_completion.choices[0].message.content = "Yes, the answer meets the criteria."
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_completion)
+        mock_async_openai.return_value = mock_client
+
+        agent = EvaluationAgent(mock_openai_api_key, sample_persona, mock_evaluation_criteria, mock_worker)
+        result = asyncio.run(agent.aevaluate(sample_prompt))
+
+        assert result['final_response'] == "Paris"
+        assert result['iterations'] == 1
+        mock_worker.arespond.assert_awaited_once_with(sample_prompt)
+        mock_worker.respond.assert_not_called()
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_merged_judge_uses_one_call_per_iteration(self, mock_openai, mock_openai_api_key, sample_persona, mock_evaluation_criteria, sample_prompt):
+        """Test that merged_judge gets verdict and fix instructions from a single JSON call."""
+        mock_worker = MagicMock()
+        mock_worker.respond.side_effect = ["Paris, France", "Paris"]
+
+        judgements = [
+            '{"verdict": "No", "reasons": "Not a single word", "instructions": "Answer with the city only"}',
+            '{"verdict": "Yes", "reasons": "A single city name", "instructions": ""}',
+        ]
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = [
+            MagicMock(choices=[MagicMock(message=MagicMock(content=judgement))]) for judgement in judgements
+        ]
+        mock_openai.return_value = mock_client
+
+        agent = EvaluationAgent(mock_openai_api_key, sample_persona, mock_evaluation_criteria, mock_worker, merged_judge=True)
+        result = agent.evaluate(sample_prompt)
+
+        assert result['final_response'] == "Paris"
+        assert result['evaluation'] == "Yes, A single city name"
+        assert result['iterations'] == 2
+        assert mock_client.chat.completions.create.call_count == 2
+        refined_prompt = mock_worker.respond.call_args_list[1][0][0]
+        assert "Answer with the city only" in refined_prompt
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_stops_when_response_unchanged(self, mock_openai, mock_openai_api_key, sample_persona, mock_evaluation_criteria, sample_prompt):
+        """Test that evaluation stops once the worker's response stops changing."""
+        mock_worker = MagicMock()
+        mock_worker.respond.return_value = "The same verbose answer"
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "No, too verbose."
+        mock_openai.return_value = mock_client
+
+        agent = EvaluationAgent(
+            mock_openai_api_key, sample_persona, mock_evaluation_criteria, mock_worker,
+            max_interactions=10, unchanged_threshold=0.95
+        )
+        result = agent.evaluate(sample_prompt)
+
+        assert result['iterations'] == 2
+        assert result['evaluation'] == "No, too verbose."
+        # One judgement and one set of instructions for the first response; the repeat is not judged
+        assert mock_client.chat.completions.create.call_count == 2
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_validators_reject_locally_before_llm_judge(self, mock_openai, mock_openai_api_key, sample_persona, sample_prompt):
+        """Test that a response failing a local validator is sent back without any judge call."""
+        mock_worker = MagicMock()
+        mock_worker.respond.side_effect = ["Task 1: build it", "Task ID: T1\nAcceptance Criteria: it works"]
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "Yes, it meets the criteria."
+        mock_openai.return_value = mock_client
+
+        agent = EvaluationAgent(
+            mock_openai_api_key, sample_persona, "Tasks with Task ID and Acceptance Criteria", mock_worker,
+            validators=[RequiredFieldsValidator(["Task ID:", "Acceptance Criteria:"])]
+        )
+        result = agent.evaluate(sample_prompt)
+
+        assert result['iterations'] == 2
+        assert result['final_response'] == "Task ID: T1\nAcceptance Criteria: it works"
+        # Only the second response, which passes the local checks, is judged by the LLM
+        mock_client.chat.completions.create.assert_called_once()
+        refined_prompt = mock_worker.respond.call_args_list[1][0][0]
+        assert "Missing required fields: Task ID:, Acceptance Criteria:." in refined_prompt
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_candidates_return_an_accepted_candidate(self, mock_openai, mock_openai_api_key, sample_persona, sample_prompt):
+        """Test that parallel candidates return the accepted one in a single round."""
+        mock_worker = MagicMock()
+        mock_worker.respond.side_effect = lambda prompt: "Paris" if "Alternative answer 3" in prompt else "Lyon"
+
+        def mock_create(*args, **kwargs):
+            verdict = "Yes, correct." if "answer: Paris" in kwargs['messages'][1]['content'] else "No, wrong city."
+            return MagicMock(choices=[MagicMock(message=MagicMock(content=verdict))])
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = mock_create
+        mock_openai.return_value = mock_client
+
+        agent = EvaluationAgent(mock_openai_api_key, sample_persona, "The capital of France", mock_worker, candidates=3)
+        result = agent.evaluate(sample_prompt)
+
+        assert result == {"final_response": "Paris", "evaluation": "Yes, correct.", "iterations": 1}
+        assert mock_worker.respond.call_count == 3
+        assert len({call[0][0] for call in mock_worker.respond.call_args_list}) == 3
+
+    @patch('workflow_agents.base_agents.AsyncOpenAI')
+    def test_candidates_fall_back_to_refinement(self, mock_async_openai, mock_openai_api_key, sample_persona, sample_prompt):
+        """Test that aevaluate refines the first candidate when no candidate is accepted."""
+        def worker_response(prompt):
+            if "corrections" in prompt:
+                return "Paris"
+            return "Marseille" if "Alternative" in prompt else "Lyon"
+
+        mock_worker = MagicMock()
+        mock_worker.arespond = AsyncMock(side_effect=worker_response)
+
+        async def mock_create(*args, **kwargs):
+            content = kwargs['messages'][1]['content']
+            if content.startswith("Provide instructions"):
+                text = "Answer Paris."
+            else:
+                text = "Yes, correct." if "answer: Paris" in content else "No, wrong city."
+            return MagicMock(choices=[MagicMock(message=MagicMock(content=text))])
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=mock_create)
+        mock_async_openai.return_value = mock_client
+
+        agent = EvaluationAgent(mock_openai_api_key, sample_persona, "The capital of France", mock_worker, candidates=2)
+        result = asyncio.run(agent.aevaluate(sample_prompt))
+
+        assert result['final_response'] == "Paris"
+        assert result['iterations'] == 2
+        refined_prompt = mock_worker.arespond.call_args_list[-1][0][0]
+        assert "The response to that prompt was: Lyon" in refined_prompt
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_failed_candidate_counts_as_rejected(self, mock_openai, mock_openai_api_key, sample_persona, sample_prompt):
+        """Test that a candidate whose generation raises is skipped while another candidate is accepted."""
+        def worker_response(prompt):
+            if "Alternative" not in prompt:
+                raise RuntimeError("worker timed out")
+            return "Paris" if "Alternative answer 3" in prompt else "Lyon"
+
+        def mock_create(*args, **kwargs):
+            verdict = "Yes, correct." if "answer: Paris" in kwargs['messages'][1]['content'] else "No, wrong city."
+            return MagicMock(choices=[MagicMock(message=MagicMock(content=verdict))])
+
+        mock_worker = MagicMock()
+        mock_worker.respond.side_effect = worker_response
+        mock_openai.return_value = MagicMock()
+        mock_openai.return_value.chat.completions.create.side_effect = mock_create
+
+        agent = EvaluationAgent(mock_openai_api_key, sample_persona, "The capital of France", mock_worker, candidates=3)
+
+        assert agent.evaluate(sample_prompt) == {"final_response": "Paris", "evaluation": "Yes, correct.", "iterations": 1}
+
+    @patch('workflow_agents.base_agents.AsyncOpenAI')
+    def test_all_candidates_failing_raises(self, mock_async_openai, mock_openai_api_key, sample_persona, sample_prompt):
+        """Test that aevaluate raises only when every candidate fails, and refines a surviving candidate otherwise."""
+        mock_worker = MagicMock()
+        mock_worker.arespond = AsyncMock(side_effect=RuntimeError("worker timed out"))
+        mock_async_openai.return_value = MagicMock()
+
+        agent = EvaluationAgent(mock_openai_api_key, sample_persona, "The capital of France", mock_worker, candidates=2)
+        with pytest.raises(RuntimeError, match="worker timed out"):
+            asyncio.run(agent.aevaluate(sample_prompt))
+
+        def worker_response(prompt):
+            if "corrections" in prompt:
+                return "Paris"
+            if "Alternative" in prompt:
+                raise RuntimeError("worker timed out")
+            return "Lyon"
+
+        async def mock_create(*args, **kwargs):
+            content = kwargs['messages'][1]['content']
+            if content.startswith("Provide instructions"):
+                text = "Answer Paris."
+            else:
+                text = "Yes, correct." if "answer: Paris" in content else "No, wrong city."
+            return MagicMock(choices=[MagicMock(message=MagicMock(content=text))])
+
+        mock_worker.arespond = AsyncMock(side_effect=worker_response)
+        mock_async_openai.return_value.chat.completions.create = AsyncMock(side_effect=mock_create)
+
+        result = asyncio.run(agent.aevaluate(sample_prompt))
+
+        assert (result['final_response'], result['iterations']) == ("Paris", 2)
+        assert "The response to that prompt was: Lyon" in mock_worker.arespond.call_args[0][0]
+
+    @patch('workflow_agents.base_agents.AsyncOpenAI')
+    def test_losing_candidates_are_cancelled_and_awaited(self, mock_async_openai, mock_openai_api_key, sample_persona, sample_prompt):
+        """Test that candidates still running when one is accepted have finished cancelling when aevaluate returns."""
+        cancelled = []
+
+        async def worker_response(prompt):
+            if "Alternative" not in prompt:
+                return "Paris"
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(prompt)
+                raise
+
+        async def mock_create(*args, **kwargs):
+            return MagicMock(choices=[MagicMock(message=MagicMock(content="Yes, correct."))])
+
+        mock_worker = MagicMock()
+        mock_worker.arespond = worker_response
+        mock_async_openai.return_value = MagicMock()
+        mock_async_openai.return_value.chat.completions.create = AsyncMock(side_effect=mock_create)
+        agent = EvaluationAgent(mock_openai_api_key, sample_persona, "The capital of France", mock_worker, candidates=3)
+
+        async def run():
+            result = await agent.aevaluate(sample_prompt)
+            return result, len(cancelled)
+
+        result, cancelled_on_return = asyncio.run(run())
+
+        assert result['final_response'] == "Paris"
+        assert cancelled_on_return == 2
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_token_sink_receives_streamed_worker_response(self, mock_openai, mock_openai_api_key, sample_persona, sample_knowledge, sample_prompt):
+        """Test that a streaming worker's response is forwarded to token_sink and joined for judging."""
+        def mock_create(*args, **kwargs):
+            if kwargs.get('stream'):
+                return iter(MagicMock(choices=[MagicMock(delta=MagicMock(content=text))]) for text in ("Pa", "ris"))
+            return MagicMock(choices=[MagicMock(message=MagicMock(content="Yes, correct."))])
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = mock_create
+        mock_openai.return_value = mock_client
+        worker = KnowledgeAugmentedPromptAgent(mock_openai_api_key, sample_persona, sample_knowledge)
+        tokens = []
+
+        agent = EvaluationAgent(mock_openai_api_key, sample_persona, "The capital of France", worker, token_sink=tokens.append)
+        result = agent.evaluate(sample_prompt)
+
+        assert tokens == ["Pa", "ris"]
+        assert result['final_response'] == "Paris"
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_token_sink_receives_only_the_chosen_candidate(self, mock_openai, mock_openai_api_key, sample_persona, sample_knowledge, sample_prompt):
+        """Test that parallel candidates of a streaming worker reach a LineSink as the chosen candidate's lines only."""
+        def mock_create(*args, **kwargs):
+            content = kwargs['messages'][-1]['content']
+            if content.startswith(("Does the following answer", "Provide instructions")):
+                verdict = "Yes, correct." if "alpha" in content else "No, wrong goal."
+                return MagicMock(choices=[MagicMock(message=MagicMock(content=verdict))])
+            text = "As a user, I want gamma so that delta" if "Alternative" in content else "As an admin, I want alpha\nso that delta"
+            if kwargs.get('stream'):
+                return iter(MagicMock(choices=[MagicMock(delta=MagicMock(content=word + " "))]) for word in text.split(" "))
+            return MagicMock(choices=[MagicMock(message=MagicMock(content=text))])
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = mock_create
+        mock_openai.return_value = mock_client
+        worker = KnowledgeAugmentedPromptAgent(mock_openai_api_key, sample_persona, sample_knowledge)
+        lines = []
+        sink = LineSink(write=lines.append)
+
+        agent = EvaluationAgent(mock_openai_api_key, sample_persona, "A story", worker, candidates=2, token_sink=sink)
+        step = current_step.set("1")
+        try:
+            result = agent.evaluate(sample_prompt)
+        finally:
+            current_step.reset(step)
+        sink.flush()
+
+        assert result['final_response'] == "As an admin, I want alpha\nso that delta"
+        assert lines == ["[step 1] As an admin, I want alpha", "[step 1] so that delta"]
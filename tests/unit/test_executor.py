@@ -0,0 +1,185 @@
+"""
+Unit tests for WorkflowExecutor.
+No OpenAI API calls are made.
+"""
+
+import pytest
+import asyncio
+import sys
+import os
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+
+from workflow_agents.executor import LineSink, WorkflowExecutor, critical_path, format_step_inputs, plan_dependencies
+
+
+class TestWorkflowExecutor:
+    """Test cases for WorkflowExecutor."""
+
+    def test_results_keep_step_order(self):
+        """Test that results come back in step order even when later steps finish first."""
+        async def handler(step):
+            await asyncio.sleep(0.01 * (3 - step))
+            return f"done {step}"
+
+        assert WorkflowExecutor(handler).run([0, 1, 2]) == ["done 0", "done 1", "done 2"]
+
+    def test_independent_steps_run_concurrently(self):
+        """Test that independent steps overlap, bounded by max_concurrency."""
+        running, peak = 0, 0
+
+        async def handler(step):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+            return step
+
+        start = time.perf_counter()
+        WorkflowExecutor(handler, max_concurrency=2).run(range(4))
+        elapsed = time.perf_counter() - start
+
+        assert peak == 2
+        # Two waves of 0.05s rather than four
+        assert elapsed < 0.18
+
+    def test_dependencies_wait_for_prerequisites(self):
+        """Test that a step only starts after the steps it depends on have finished."""
+        finished = []
+
+        async def handler(step):
+            await asyncio.sleep(0.02 if step == "stories" else 0)
+            finished.append(step)
+            return step
+
+        steps = ["stories", "features", "tasks"]
+        WorkflowExecutor(handler).run(steps, dependencies={1: [0], 2: [0, 1]})
+
+        assert finished == steps
+
+    def test_blocking_handler_runs_in_threads(self):
+        """Test that a synchronous handler is supported and runs concurrently."""
+        def handler(step):
+            time.sleep(0.05)
+            return step * 2
+
+        start = time.perf_counter()
+        results = WorkflowExecutor(handler, max_concurrency=4).run([1, 2, 3, 4])
+
+        assert results == [2, 4, 6, 8]
+        assert time.perf_counter() - start < 0.15
+
+    def test_failure_cancels_running_steps(self):
+        """Test that a failing step raises and cancels the steps still running."""
+        cancelled = []
+
+        async def handler(step):
+            if step == "bad":
+                raise RuntimeError("step failed")
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(step)
+                raise
+
+        with pytest.raises(RuntimeError, match="step failed"):
+            WorkflowExecutor(handler).run(["slow", "bad"])
+        assert cancelled == ["slow"]
+
+    def test_invalid_dependencies_raise(self):
+        """Test that cycles, unknown steps and a zero concurrency limit are rejected."""
+        executor = WorkflowExecutor(lambda step: step)
+
+        with pytest.raises(ValueError, match="cycle"):
+            executor.run(["a", "b"], dependencies={0: [1], 1: [0]})
+        with pytest.raises(ValueError, match="unknown step"):
+            executor.run(["a"], dependencies={0: [3]})
+        with pytest.raises(ValueError):
+            WorkflowExecutor(lambda step: step, max_concurrency=0)
+
+    def test_plan_passes_artifacts_downstream(self):
+        """Test that plan steps receive the artifacts of the steps they depend on."""
+        received = {}
+
+        async def handler(step, inputs):
+            received[step["id"]] = inputs
+            return f"{step['artifact']} ready"
+
+        plan = [
+            {"id": "1", "text": "Write stories", "depends_on": [], "artifact": "stories"},
+            {"id": "2", "text": "Group features", "depends_on": ["1"], "artifact": "features"},
+            {"id": "3", "text": "Define tasks", "depends_on": ["1", "2"], "artifact": "tasks"},
+        ]
+        report = WorkflowExecutor(handler).run_plan(plan)
+
+        assert received == {
+            "1": {},
+            "2": {"stories": "stories ready"},
+            "3": {"stories": "stories ready", "features": "features ready"},
+        }
+        assert report["results"]["3"] == "tasks ready"
+        assert report["critical_path"] == ["1", "2", "3"]
+
+    def test_plan_runs_ready_steps_in_parallel(self):
+        """Test that independent branches overlap, so elapsed time follows the critical path."""
+        async def handler(step, inputs):
+            await asyncio.sleep(0.05)
+            return step["id"]
+
+        plan = [
+            {"id": "a", "text": "a", "depends_on": [], "artifact": "a"},
+            {"id": "b", "text": "b", "depends_on": [], "artifact": "b"},
+            {"id": "c", "text": "c", "depends_on": [], "artifact": "c"},
+            {"id": "d", "text": "d", "depends_on": ["a", "b", "c"], "artifact": "d"},
+        ]
+        report = WorkflowExecutor(handler).run_plan(plan)
+
+        assert len(report["critical_path"]) == 2
+        assert report["critical_path"][1] == "d"
+        # Two levels of 0.05s rather than four steps
+        assert report["elapsed_seconds"] < 0.18
+
+    def test_critical_path_follows_longest_chain(self):
+        """Test that the critical path is weighted by step durations, not step counts."""
+        plan = [
+            {"id": "a", "depends_on": []},
+            {"id": "b", "depends_on": ["a"]},
+            {"id": "c", "depends_on": ["a"]},
+            {"id": "d", "depends_on": ["b", "c"]},
+        ]
+        path, seconds = critical_path(plan, {"a": 1.0, "b": 0.5, "c": 2.0, "d": 1.0})
+
+        assert path == ["a", "c", "d"]
+        assert seconds == pytest.approx(4.0)
+        assert critical_path([], {}) == ([], 0.0)
+
+    def test_plan_dependencies_validates_ids(self):
+        """Test that plans with duplicate or unknown step ids are rejected."""
+        with pytest.raises(ValueError, match="Duplicate"):
+            plan_dependencies([{"id": "1", "depends_on": []}, {"id": "1", "depends_on": []}])
+        with pytest.raises(ValueError, match="unknown step"):
+            plan_dependencies([{"id": "1", "depends_on": ["9"]}])
+        assert format_step_inputs({}) == ""
+
+    def test_line_sink_prefixes_lines_with_their_step(self):
+        """Test that streamed tokens are written as whole lines tagged with the step that produced them."""
+        lines = []
+        sink = LineSink(write=lines.append)
+
+        async def handler(step, inputs):
+            for token in (f"{step['id']} first ", "line\n", f"{step['id']} end"):
+                sink(token)
+                await asyncio.sleep(0)
+            return step["id"]
+
+        plan = [
+            {"id": "a", "text": "a", "depends_on": [], "artifact": "a"},
+            {"id": "b", "text": "b", "depends_on": [], "artifact": "b"},
+        ]
+        WorkflowExecutor(handler).run_plan(plan)
+        sink.flush()
+
+        assert sorted(lines) == ["[step a] a end", "[step a] a first line", "[step b] b end", "[step b] b first line"]
@@ -0,0 +1,88 @@
+"""
+End-to-end tests of the agents over HTTP against the local fake OpenAI server.
+No external API calls are made.
+"""
+
+import pytest
+import asyncio
+import sys
+import os
+import time
+
+# Add src and benchmarks directories to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'benchmarks'))
+
+from workflow_agents.base_agents import DirectPromptAgent, RoutingAgent
+from tests.fake_openai import fixed, parse_latency
+
+
+class TestFakeOpenAIServer:
+    """Test cases for the agents against FakeOpenAIServer."""
+
+    def test_sync_and_async_completions(self, fake_openai_server, mock_openai_api_key):
+        """Test that respond and arespond get the same deterministic answer over HTTP."""
+        agent = DirectPromptAgent(mock_openai_api_key)
+
+        answer = agent.respond("What is the capital of France?")
+
+        assert answer == asyncio.run(agent.arespond("What is the capital of France?"))
+        assert len(answer) >= 64 * 4
+        assert fake_openai_server.stats["chat_completions"] == 2
+
+    def test_streamed_completion_matches_plain_one(self, fake_openai_server, mock_openai_api_key):
+        """Test that a streamed answer arrives in many pieces that join to the plain answer."""
+        agent = DirectPromptAgent(mock_openai_api_key)
+
+        pieces = list(agent.respond("Stream this", stream=True))
+
+        assert len(pieces) > 10
+        assert "".join(pieces) == agent.respond("Stream this")
+
+    def test_rate_limited_requests_are_retried(self, fake_openai_server, mock_openai_api_key):
+        """Test that injected 429 errors are retried by the client and the calls still succeed."""
+        fake_openai_server.rate_limit_every = 2
+        agent = DirectPromptAgent(mock_openai_api_key)
+
+        answers = [agent.respond(f"question {i}") for i in range(3)]
+
+        assert all(answers)
+        assert fake_openai_server.stats["rate_limited"] >= 1
+
+    def test_latency_and_throughput_are_applied(self, fake_openai_server, mock_openai_api_key):
+        """Test that a completion takes the drawn latency plus its generation time."""
+        fake_openai_server.latency = fixed(0.05)
+        fake_openai_server.tokens_per_second = 640
+        agent = DirectPromptAgent(mock_openai_api_key)
+        agent.respond("warm up the connection")
+
+        start = time.perf_counter()
+        agent.respond("How long does this take?")
+
+        # 0.05s latency + 64 tokens at 640 tokens/s
+        assert time.perf_counter() - start >= 0.15
+        with pytest.raises(ValueError, match="Unknown latency"):
+            parse_latency("gamma:1,2")
+
+    def test_embeddings_route_by_shared_words(self, fake_openai_server, mock_openai_api_key):
+        """Test that bag-of-words embeddings are deterministic and route prompts to the route sharing their words."""
+        assert (fake_openai_server.embed("email routing") == fake_openai_server.embed("email routing")).all()
+        router = RoutingAgent(mock_openai_api_key, [
+            {"name": "stories", "description": "Writes user stories for a product", "func": lambda prompt: "stories"},
+            {"name": "tasks", "description": "Defines engineering tasks and estimates", "func": lambda prompt: "tasks"},
+        ])
+
+        assert router.route("Define the engineering tasks") == "tasks"
+        assert router.route("Write the user stories") == "stories"
+
+    @pytest.mark.slow
+    def test_phase_2_workflow_runs_end_to_end(self, fake_openai_server):
+        """Test that agentic_workflow.py completes a plan over HTTP, running every planned step."""
+        pytest.importorskip("dotenv")
+        from end_to_end import bench_workflow
+
+        metrics = bench_workflow(fake_openai_server, plan_steps=3, answer_tokens=32, timeout=120)
+
+        assert metrics["steps"] == 3
+        assert metrics["chat_completions"] >= 7
+        assert metrics["rate_limited"] == 0
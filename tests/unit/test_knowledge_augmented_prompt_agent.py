@@ -69,3 +69,52 @@ class TestKnowledgeAugmentedPromptAgent:
         assert 'do not use your own knowledge' in system_message.lower()
         assert incorrect_knowledge in system_message
 
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_knowledge_over_budget_sends_relevant_sections(self, mock_openai, mock_openai_api_key, sample_persona, caplog):
+        """Test that knowledge over the token budget is trimmed to the leading and most relevant sections, with a warning."""
+        topics = ["billing", "routing", "security", "reporting"]
+
+        def vector(text):
+            return [1.0 if topic in text.lower() else 0.0 for topic in topics] + [0.1]
+
+        def mock_create_embedding(*args, **kwargs):
+            inputs = kwargs['input'] if isinstance(kwargs['input'], list) else [kwargs['input']]
+            mock_response = MagicMock()
+            mock_response.data = [MagicMock(index=i, embedding=vector(text)) for i, text in enumerate(inputs)]
+            return mock_response
+
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_create_embedding
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "ok"
+        mock_openai.return_value = mock_client
+
+        knowledge = "Answer only from the product spec sections below.\n\n" + "\n\n".join(
+            f"The {topic} module handles all {topic} work for customers." for topic in topics
+        )
+        agent = KnowledgeAugmentedPromptAgent(
+            mock_openai_api_key, sample_persona, knowledge, knowledge_token_budget=30, section_tokens=20
+        )
+        agent.respond("How does routing work?")
+        agent.respond("How does routing work now?")
+
+        system_message = mock_client.chat.completions.create.call_args[1]['messages'][0]['content']
+        assert "Answer only from the product spec sections below." in system_message
+        assert "routing module" in system_message
+        assert "billing module" not in system_message
+        # Sections are embedded in one batch, once; each prompt costs one embedding
+        assert mock_client.embeddings.create.call_count == 3
+        assert [record.levelname for record in caplog.records if "exceeds the budget of 30" in record.getMessage()] == ["WARNING"]
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_knowledge_within_budget_is_inlined(self, mock_openai, mock_openai_api_key, sample_persona, sample_knowledge, sample_prompt):
+        """Test that knowledge within the budget is sent whole without embedding anything."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "Paris"
+        mock_openai.return_value = mock_client
+
+        agent = KnowledgeAugmentedPromptAgent(mock_openai_api_key, sample_persona, sample_knowledge, knowledge_token_budget=1000)
+        agent.respond(sample_prompt)
+
+        system_message = mock_client.chat.completions.create.call_args[1]['messages'][0]['content']
+        assert sample_knowledge in system_message
+        mock_client.embeddings.create.assert_not_called()
@@ -0,0 +1,78 @@
+"""
+Unit tests for agent logging.
+All OpenAI API calls are mocked.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+import io
+import logging
+import sys
+import os
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+
+from workflow_agents.base_agents import EvaluationAgent
+from workflow_agents.logs import Truncated, configure_logging
+
+
+class Counted:
+    """A log argument that counts how often it is formatted."""
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "text"
+
+
+def evaluate_once(mock_openai, mock_openai_api_key, sample_persona):
+    """Run an evaluation that is accepted in one iteration."""
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.return_value.choices[0].message.content = "Yes, correct."
+    mock_openai.return_value = mock_client
+    worker = MagicMock()
+    worker.respond.return_value = "Paris " * 200
+    EvaluationAgent(mock_openai_api_key, sample_persona, "The capital of France", worker).evaluate("Capital?")
+
+
+class TestLogging:
+    """Test cases for configure_logging and Truncated."""
+
+    def test_truncated_cuts_long_text(self):
+        """Test that Truncated shortens text past its limit and says how much was cut."""
+        assert str(Truncated("short", 10)) == "short"
+        assert str(Truncated("a" * 30, 10)) == "a" * 10 + "... [20 more chars]"
+
+        configure_logging(stream=io.StringIO(), max_chars=4)
+        assert str(Truncated("abcdefgh")) == "abcd... [4 more chars]"
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_info_shows_progress_and_debug_adds_responses(self, mock_openai, mock_openai_api_key, sample_persona):
+        """Test that INFO logs evaluation progress, and DEBUG adds the truncated worker response."""
+        stream = io.StringIO()
+        configure_logging(logging.INFO, max_chars=50, stream=stream)
+        evaluate_once(mock_openai, mock_openai_api_key, sample_persona)
+        assert "--- Interaction 1 ---" in stream.getvalue()
+        assert "Worker Agent Response" not in stream.getvalue()
+
+        stream = io.StringIO()
+        configure_logging("DEBUG", max_chars=50, stream=stream)
+        evaluate_once(mock_openai, mock_openai_api_key, sample_persona)
+        assert "Worker Agent Response:\n" + ("Paris " * 9)[:50] + "... [1150 more chars]" in stream.getvalue()
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_quiet_mode_formats_nothing(self, mock_openai, mock_openai_api_key, sample_persona, capsys):
+        """Test that at WARNING nothing is written and lazily formatted arguments are never rendered."""
+        stream = io.StringIO()
+        logger = configure_logging(logging.WARNING, stream=stream)
+        argument = Counted()
+
+        logger.info("Evaluation: %s", argument)
+        evaluate_once(mock_openai, mock_openai_api_key, sample_persona)
+
+        assert argument.formatted == 0
+        assert stream.getvalue() == ""
+        assert capsys.readouterr().out == ""
@@ -0,0 +1,322 @@
+"""
+Unit tests for RAGKnowledgePromptAgent.
+All OpenAI API calls are mocked.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import numpy as np
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+
+from workflow_agents.base_agents import RAGKnowledgePromptAgent
+from workflow_agents.vector_store import VectorStore
+
+
+SAMPLE_KNOWLEDGE = " ".join(f"word{i}" for i in range(200))
+
+
+def mock_batch_embeddings(*args, **kwargs):
+    """Return one deterministic embedding per input, like the batched embeddings endpoint."""
+    inputs = kwargs['input']
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    mock_response = MagicMock()
+    mock_response.data = []
+    for i, text in enumerate(inputs):
+        item = MagicMock()
+        item.index = i
+        item.embedding = [float(len(text)), 1.0, 0.0]
+        mock_response.data.append(item)
+    return mock_response
+
+
+class TestRAGKnowledgePromptAgent:
+    """Test cases for RAGKnowledgePromptAgent."""
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_initialization(self, mock_openai, mock_openai_api_key, sample_persona):
+        """Test that RAGKnowledgePromptAgent initializes correctly."""
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, chunk_size=500, chunk_overlap=50)
+        assert agent.openai_api_key == mock_openai_api_key
+        assert agent.persona == sample_persona
+        assert agent.chunk_size == 500
+        assert agent.chunk_overlap == 50
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_get_embeddings_batches_requests(self, mock_openai, mock_openai_api_key, sample_persona):
+        """Test that many texts are embedded in batches of the configured size."""
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_openai.return_value = mock_client
+
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, embedding_batch_size=2)
+        texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+        embeddings = agent.get_embeddings(texts)
+
+        assert mock_client.embeddings.create.call_count == 3
+        assert [embedding[0] for embedding in embeddings] == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_get_embeddings_respects_token_budget(self, mock_openai, mock_openai_api_key, sample_persona):
+        """Test that a batch is closed before it exceeds the token budget."""
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_openai.return_value = mock_client
+
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, embedding_batch_tokens=30)
+        agent.get_embeddings(["x" * 80, "y" * 80, "z" * 80])
+
+        batch_sizes = [len(call[1]['input']) for call in mock_client.embeddings.create.call_args_list]
+        assert batch_sizes == [1, 1, 1]
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_get_embeddings_skips_cached_and_duplicate_texts(self, mock_openai, mock_openai_api_key, sample_persona):
+        """Test that only distinct, uncached texts are sent to the API."""
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_openai.return_value = mock_client
+
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona)
+        agent.get_embeddings(["cached"])
+        embeddings = agent.get_embeddings(["cached", "new", "new"])
+
+        assert mock_client.embeddings.create.call_args[1]['input'] == ["new"]
+        assert len(embeddings) == 3
+        assert embeddings[1] is embeddings[2]
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_get_embeddings_places_vectors_by_index(self, mock_openai, mock_openai_api_key, sample_persona):
+        """Test that batch embeddings returned out of order are matched to their inputs by index, and short responses are rejected."""
+        def reversed_embeddings(*args, **kwargs):
+            response = mock_batch_embeddings(*args, **kwargs)
+            response.data.reverse()
+            return response
+
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = reversed_embeddings
+        mock_openai.return_value = mock_client
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona)
+
+        embeddings = agent.get_embeddings(["a", "bbb", "cc"])
+
+        assert [embedding[0] for embedding in embeddings] == [1.0, 3.0, 2.0]
+
+        def short_response(*args, **kwargs):
+            response = mock_batch_embeddings(*args, **kwargs)
+            response.data.pop()
+            return response
+
+        mock_client.embeddings.create.side_effect = short_response
+        with pytest.raises(ValueError, match="2 embeddings for 3 inputs"):
+            agent.get_embeddings(["dddd", "eeeee", "ffffff"])
+        # Nothing from the rejected response is cached
+        assert mock_client.embeddings.create.call_count == 2
+        with pytest.raises(ValueError):
+            agent.get_embeddings(["dddd"])
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_calculate_embeddings_uses_batches(self, mock_openai, mock_openai_api_key, sample_persona, tmp_path, monkeypatch):
+        """Test that chunk indexing makes one request for a small document."""
+        monkeypatch.chdir(tmp_path)
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_openai.return_value = mock_client
+
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, chunk_size=100, chunk_overlap=10)
+        chunks = agent.chunk_text(SAMPLE_KNOWLEDGE)
+        df = agent.calculate_embeddings()
+
+        assert len(df) == len(chunks) > 1
+        mock_client.embeddings.create.assert_called_once()
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_numeric_chunks_stay_text(self, mock_openai, mock_openai_api_key, sample_persona, tmp_path, monkeypatch):
+        """Test that a chunk made only of digits is embedded as text after its round trip through the chunk CSV."""
+        monkeypatch.chdir(tmp_path)
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_openai.return_value = mock_client
+
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, chunk_size=100, chunk_overlap=10)
+        agent.chunk_text("2024")
+        df = agent.calculate_embeddings()
+
+        assert list(df['text']) == ["2024"]
+        assert isinstance(df['chunk_hash'][0], str)
+        assert mock_client.embeddings.create.call_args[1]['input'] == ["2024"]
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_find_prompt_uses_vector_store(self, mock_openai, mock_openai_api_key, sample_persona, tmp_path, monkeypatch):
+        """Test that retrieval reads the binary store and answers from the most similar chunk."""
+        monkeypatch.chdir(tmp_path)
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "answer"
+        mock_openai.return_value = mock_client
+
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, chunk_size=100, chunk_overlap=10)
+        agent.chunk_text(SAMPLE_KNOWLEDGE)
+        agent.calculate_embeddings()
+
+        assert os.path.exists(f"{agent.vector_store_path}.npy")
+        assert not os.path.exists(f"embeddings-{agent.unique_filename}")
+        assert agent.find_prompt_in_knowledge("question") == "answer"
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_index_is_loaded_once_for_many_queries(self, mock_openai, mock_openai_api_key, sample_persona, tmp_path, monkeypatch):
+        """Test that repeated queries reuse the in-memory index instead of reading the disk."""
+        monkeypatch.chdir(tmp_path)
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_openai.return_value = mock_client
+
+        builder = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, chunk_size=100, chunk_overlap=10)
+        builder.chunk_text(SAMPLE_KNOWLEDGE)
+        builder.calculate_embeddings()
+
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona)
+        agent.vector_store_path = builder.vector_store_path
+        with patch('workflow_agents.base_agents.VectorStore.load', wraps=VectorStore.load) as mock_load:
+            for _ in range(3):
+                agent.find_prompt_in_knowledge("question")
+
+        mock_load.assert_called_once()
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_save_and_load_index(self, mock_openai, mock_openai_api_key, sample_persona, tmp_path, monkeypatch):
+        """Test that an index can be saved under a name and loaded by another agent."""
+        monkeypatch.chdir(tmp_path)
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_openai.return_value = mock_client
+
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, chunk_size=100, chunk_overlap=10)
+        with pytest.raises(ValueError):
+            agent.save_index()
+        chunks = agent.chunk_text(SAMPLE_KNOWLEDGE)
+        agent.calculate_embeddings()
+        path = agent.save_index(str(tmp_path / "specs"))
+
+        other = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona)
+        index = other.load_index(path)
+
+        assert len(index) == len(chunks)
+        assert other.index is index
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_chunking_new_knowledge_invalidates_index(self, mock_openai, mock_openai_api_key, sample_persona, tmp_path, monkeypatch):
+        """Test that the cached index is dropped when new knowledge is chunked."""
+        monkeypatch.chdir(tmp_path)
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_openai.return_value = mock_client
+
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, chunk_size=100, chunk_overlap=10)
+        agent.chunk_text(SAMPLE_KNOWLEDGE)
+        agent.calculate_embeddings()
+        first = agent.index
+        agent.chunk_text(" ".join(f"other{i}" for i in range(100)))
+        agent.calculate_embeddings()
+
+        assert agent.index is not first
+        live_texts = [agent.index.records[row]["text"] for row in agent.index.live_rows()]
+        assert live_texts and all("other" in text for text in live_texts)
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_find_prompt_passes_top_chunks_within_budget(self, mock_openai, mock_openai_api_key, sample_persona, tmp_path, monkeypatch):
+        """Test that the top-k chunks are sent to the LLM, limited by the context token budget."""
+        monkeypatch.chdir(tmp_path)
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_openai.return_value = mock_client
+
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, chunk_size=100, chunk_overlap=10, top_k=2)
+        agent.chunk_text(SAMPLE_KNOWLEDGE)
+        agent.calculate_embeddings()
+
+        assert len(agent.retrieve("question")) == 2
+        agent.find_prompt_in_knowledge("question")
+        user_message = mock_client.chat.completions.create.call_args[1]['messages'][1]['content']
+        assert all(text in user_message for text, _ in agent.retrieve("question"))
+
+        agent.context_tokens = 1
+        assert agent.build_context(agent.retrieve("question")) == agent.retrieve("question")[0][0]
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_ivf_backend_retrieves_chunks(self, mock_openai, mock_openai_api_key, sample_persona, tmp_path, monkeypatch):
+        """Test that the agent can retrieve through the approximate IVF index."""
+        monkeypatch.chdir(tmp_path)
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_openai.return_value = mock_client
+
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, chunk_size=100, chunk_overlap=10,
+                                        index_backend="ivf", index_params={"n_lists": 2, "n_probe": 2})
+        agent.chunk_text(SAMPLE_KNOWLEDGE)
+        agent.calculate_embeddings()
+
+        assert len(agent.retrieve("question")) == 3
+        assert len(agent.search_index.lists) == 2
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_chunk_file_streams_into_index(self, mock_openai, mock_openai_api_key, sample_persona, tmp_path, monkeypatch):
+        """Test that a knowledge file is chunked block by block and indexed with its offsets."""
+        monkeypatch.chdir(tmp_path)
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_openai.return_value = mock_client
+        path = tmp_path / "spec.txt"
+        path.write_text("".join(f"Sentence {i} about routing.\n\n" for i in range(100)), encoding="utf-8")
+
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, chunk_size=200, chunk_overlap=20)
+        count = agent.chunk_file(str(path), block_size=64)
+        agent.calculate_embeddings()
+
+        assert count == len(agent.index) > 1
+        assert agent.index.records[0]["start_char"] == 0
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_short_text_is_indexed(self, mock_openai, mock_openai_api_key, sample_persona, tmp_path, monkeypatch):
+        """Test that text shorter than one chunk is still written out and indexed."""
+        monkeypatch.chdir(tmp_path)
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_openai.return_value = mock_client
+
+        agent = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona)
+        chunks = agent.chunk_text("Line one.\nLine two.")
+        agent.calculate_embeddings()
+
+        assert chunks[0]["text"] == "Line one. Line two."
+        assert agent.index.texts == ["Line one. Line two."]
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_named_index_reembeds_only_changed_chunks(self, mock_openai, mock_openai_api_key, sample_persona, tmp_path, monkeypatch):
+        """Test that re-indexing an edited document embeds only its new chunks and tombstones removed ones."""
+        monkeypatch.chdir(tmp_path)
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_batch_embeddings
+        mock_openai.return_value = mock_client
+        paragraphs = [f"Paragraph {i} describes feature {i} of the product in some detail." for i in range(20)]
+
+        first = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, chunk_size=80, chunk_overlap=0,
+                                        index_name="spec", index_dir=str(tmp_path / "indexes"))
+        first.chunk_text("\n\n".join(paragraphs))
+        first.calculate_embeddings()
+        assert first.embedded_chunks == 20
+
+        paragraphs[7] = "Paragraph 7 now describes a completely different feature."
+        second = RAGKnowledgePromptAgent(mock_openai_api_key, sample_persona, chunk_size=80, chunk_overlap=0,
+                                         index_name="spec", index_dir=str(tmp_path / "indexes"))
+        second.chunk_text("\n\n".join(paragraphs))
+        df = second.calculate_embeddings()
+
+        assert second.embedded_chunks == 1
+        assert mock_client.embeddings.create.call_args[1]['input'] == [paragraphs[7]]
+        assert len(df) == 20
+        assert second.index.tombstones == 1
+        assert len(second.index.live_rows()) == 20
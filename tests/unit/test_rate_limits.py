@@ -0,0 +1,159 @@
+"""
+Unit tests for the client-side rate limiter.
+No external API calls are made.
+"""
+
+import pytest
+import asyncio
+import sys
+import os
+import threading
+import time
+
+import httpx
+import openai
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+
+from workflow_agents.base_agents import DirectPromptAgent
+from workflow_agents.rate_limits import ModelLimiter, TokenBucket, configure_rate_limiter, get_rate_limiter, parse_duration
+
+
+def api_error(status, headers=None):
+    """Build the SDK error the API client raises for an HTTP error status."""
+    response = httpx.Response(status, headers=headers or {}, request=httpx.Request("POST", "http://fake/v1/chat/completions"))
+    error_class = openai.RateLimitError if status == 429 else openai.BadRequestError
+    return error_class("failed", response=response, body=None)
+
+
+class TestRateLimiter:
+    """Test cases for TokenBucket and ModelLimiter."""
+
+    def test_bucket_makes_callers_wait_once_empty(self):
+        """Test that reservations beyond the bucket's level wait for its refill, and that API headers lower it."""
+        bucket = TokenBucket(per_minute=60)
+
+        assert bucket.reserve(60) == 0.0
+        assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+        bucket.refund(61)
+        bucket.update(limit=120, remaining=0, reset=2.0)
+
+        assert bucket.per_minute == 120
+        assert bucket.reserve(1) == pytest.approx(2.5, abs=0.05)
+        assert TokenBucket(None).reserve(10 ** 9) == 0.0
+
+    def test_parse_duration(self):
+        """Test parsing of the reset durations of rate limit headers."""
+        assert parse_duration("6m0s") == 360
+        assert parse_duration("20ms") == pytest.approx(0.02)
+        assert parse_duration("1.5s") == 1.5
+        assert parse_duration("2") == 2.0
+        assert parse_duration(None) is None
+
+    def test_retries_rate_limit_errors_and_halves_concurrency(self):
+        """Test that a 429 is retried after its Retry-After and halves the concurrency limit."""
+        limiter = ModelLimiter("gpt-3.5-turbo", initial_concurrency=8, base_delay=0.0)
+        responses = iter([api_error(429, {"retry-after-ms": "50"}), "ok"])
+
+        def create():
+            response = next(responses)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        started = time.monotonic()
+        assert limiter.call(10, create) == "ok"
+
+        assert time.monotonic() - started >= 0.05
+        assert (limiter.retries, limiter.rate_limited) == (1, 1)
+        assert limiter.concurrency == pytest.approx(4 + 1 / 4)
+        assert limiter.in_flight == 0
+
+    def test_other_errors_are_raised_without_retry(self):
+        """Test that client errors such as 400 are raised at once, and that retries are bounded."""
+        limiter = ModelLimiter("gpt-3.5-turbo", max_retries=2, base_delay=0.0)
+        calls = []
+
+        def bad_request():
+            calls.append(1)
+            raise api_error(400)
+
+        with pytest.raises(openai.BadRequestError):
+            limiter.call(10, bad_request)
+        assert len(calls) == 1
+
+        def rate_limited():
+            calls.append(1)
+            raise api_error(429)
+
+        with pytest.raises(openai.RateLimitError):
+            limiter.call(10, rate_limited)
+        assert len(calls) == 1 + 3
+
+    def test_limits_requests_in_flight(self):
+        """Test that no more requests than the concurrency limit run at once, and that successes raise the limit."""
+        limiter = ModelLimiter("gpt-3.5-turbo", initial_concurrency=2)
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def create():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return "ok"
+
+        threads = [threading.Thread(target=limiter.call, args=(10, create)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak[0] == 2
+        assert limiter.concurrency > 2
+
+    def test_async_call_retries(self):
+        """Test that acall retries a rate-limited request."""
+        limiter = ModelLimiter("text-embedding-3-large", base_delay=0.0)
+        outcomes = [api_error(429), "vector"]
+
+        async def create():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        assert asyncio.run(limiter.acall(10, create)) == "vector"
+        assert limiter.rate_limited == 1
+
+    def test_agents_adopt_rate_limit_headers(self, fake_openai_server, mock_openai_api_key):
+        """Test that the limits in the API's response headers replace the defaults of the requested model."""
+        fake_openai_server.headers = {
+            "x-ratelimit-limit-requests": "120", "x-ratelimit-remaining-requests": "119",
+            "x-ratelimit-limit-tokens": "40000", "x-ratelimit-remaining-tokens": "39000",
+        }
+        agent = DirectPromptAgent(mock_openai_api_key)
+
+        agent.respond("Hello")
+        asyncio.run(agent.arespond("Hello again"))
+
+        limiter = get_rate_limiter().for_model("gpt-3.5-turbo")
+        assert (limiter.requests.per_minute, limiter.tokens.per_minute) == (120, 40000)
+        assert limiter.tokens.level <= 39000
+
+    def test_concurrent_agent_calls_survive_rate_limiting(self, fake_openai_server, mock_openai_api_key):
+        """Test that concurrent requests all succeed while the server rate-limits every third one."""
+        fake_openai_server.rate_limit_every = 3
+        configure_rate_limiter(base_delay=0.01)
+        agent = DirectPromptAgent(mock_openai_api_key)
+
+        async def run():
+            return await asyncio.gather(*(agent.arespond(f"Question {i}") for i in range(12)))
+
+        answers = asyncio.run(run())
+
+        assert all(answers)
+        assert fake_openai_server.stats["chat_completions"] == 12
+        assert get_rate_limiter().for_model("gpt-3.5-turbo").rate_limited == fake_openai_server.stats["rate_limited"] > 0
@@ -4,7 +4,8 @@ All OpenAI API calls are mocked.
 """
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
 import sys
 import os
 import numpy as np
@@ -105,3 +106,97 @@ class TestRoutingAgent:
         assert agent2_called[0] == False
         assert result == "Agent 1 response"
 
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_route_embeds_descriptions_once(self, mock_openai, mock_openai_api_key):
+        """Test that descriptions are embedded once and reused across routes."""
+        mock_client = MagicMock()
+        vectors = {
+            "first prompt": [1.0, 0.0],
+            "second prompt": [0.0, 1.0],
+            "Agent A": [1.0, 0.1],
+            "Agent B": [0.1, 1.0],
+        }
+
+        def mock_create_embedding(*args, **kwargs):
+            mock_response = MagicMock()
+            mock_response.data[0].embedding = vectors[kwargs['input']]
+            return mock_response
+
+        mock_client.embeddings.create.side_effect = mock_create_embedding
+        mock_openai.return_value = mock_client
+
+        router = RoutingAgent(mock_openai_api_key, [
+            {"name": "a", "description": "Agent A", "func": lambda x: "A"},
+            {"name": "b", "description": "Agent B", "func": lambda x: "B"},
+        ])
+
+        assert router.route("first prompt") == "A"
+        assert router.route("second prompt") == "B"
+        # Two prompts plus two descriptions, never re-embedded
+        assert mock_client.embeddings.create.call_count == 4
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_route_matrix_rebuilt_when_agents_change(self, mock_openai, mock_openai_api_key):
+        """Test that assigning or registering agents invalidates the route matrix."""
+        mock_client = MagicMock()
+        mock_client.embeddings.create.return_value.data[0].embedding = [3.0, 4.0]
+        mock_openai.return_value = mock_client
+
+        router = RoutingAgent(mock_openai_api_key)
+        router.agents = [{"name": "a", "description": "Agent A", "func": lambda x: "A"}]
+        matrix = router.route_matrix()
+        np.testing.assert_allclose(np.linalg.norm(matrix, axis=1), [1.0])
+        assert router.route_matrix() is matrix
+
+        router.register_agent("b", "Agent B", lambda x: "B")
+        assert router.route_matrix().shape == (2, 2)
+
+    @patch('workflow_agents.base_agents.AsyncOpenAI')
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_aroute_awaits_async_routes(self, mock_openai, mock_async_openai, mock_openai_api_key):
+        """Test that aroute embeds the prompt asynchronously and awaits coroutine routes."""
+        vectors = {
+            "prompt": [1.0, 0.0],
+            "Agent A": [1.0, 0.1],
+            "Agent B": [0.1, 1.0],
+        }
+
+        def mock_create_embedding(*args, **kwargs):
+            mock_response = MagicMock()
+            mock_response.data[0].embedding = vectors[kwargs['input']]
+            return mock_response
+
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_create_embedding
+        mock_openai.return_value = mock_client
+        mock_async_client = MagicMock()
+        mock_async_client.embeddings.create = AsyncMock(side_effect=mock_create_embedding)
+        mock_async_openai.return_value = mock_async_client
+
+        async def route_a(prompt):
+            return f"A: {prompt}"
+
+        router = RoutingAgent(mock_openai_api_key, [
+            {"name": "a", "description": "Agent A", "func": route_a},
+            {"name": "b", "description": "Agent B", "func": lambda x: "B"},
+        ])
+
+        assert asyncio.run(router.aroute("prompt")) == "A: prompt"
+        mock_async_client.embeddings.create.assert_awaited_once()
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_route_context_reaches_agent_but_not_routing(self, mock_openai, mock_openai_api_key):
+        """Test that context is appended to the agent's prompt without being embedded."""
+        mock_client = MagicMock()
+        mock_client.embeddings.create.return_value.data[0].embedding = [1.0, 0.0]
+        mock_openai.return_value = mock_client
+
+        router = RoutingAgent(mock_openai_api_key, [
+            {"name": "a", "description": "Agent A", "func": lambda x: x},
+        ])
+        response = router.route("Define tasks", context="### stories\nAs a user...")
+
+        assert response == "Define tasks\n\n### stories\nAs a user..."
+        embedded = [call[1]['input'] for call in mock_client.embeddings.create.call_args_list]
+        assert embedded == ["Define tasks", "Agent A"]
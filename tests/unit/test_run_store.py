@@ -0,0 +1,153 @@
+"""
+Unit tests for workflow run checkpoints and resuming.
+All OpenAI API calls are mocked or served by the local fake server.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import subprocess
+
+# Add src and benchmarks directories to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'benchmarks'))
+
+from workflow_agents.base_agents import EvaluationAgent, RoutingAgent
+from workflow_agents.executor import WorkflowExecutor
+from workflow_agents.run_store import RunStore
+
+
+def completion(text):
+    """Build a mocked chat completion."""
+    return MagicMock(choices=[MagicMock(message=MagicMock(content=text))])
+
+
+class TestRunStore:
+    """Test cases for RunStore and resuming interrupted work."""
+
+    def test_checkpoints_round_trip(self, tmp_path):
+        """Test that a reopened run returns what was saved, skipping an iteration line cut short by a crash."""
+        store = RunStore.create(str(tmp_path), workflow_prompt="Plan it")
+        store.save_plan([{"id": "1", "text": "Stories", "depends_on": [], "artifact": "stories"}])
+        store.save_route("1", "Product Manager")
+        store.record_iteration("1", {"iteration": 1, "response": "draft", "accepted": False})
+        with open(os.path.join(store.path, "steps", "1", "iterations.jsonl"), "a") as iterations_file:
+            iterations_file.write('{"iteration": 2, "resp')
+        store.record_iteration("1", {"iteration": 2, "response": "final", "accepted": True})
+        store.save_step_result("1", "final", duration=1.5)
+        store.update(status="failed")
+
+        reopened = RunStore.open(store.run_id, root=str(tmp_path))
+
+        assert reopened.metadata["workflow_prompt"] == "Plan it"
+        assert reopened.metadata["status"] == "failed"
+        assert reopened.load_plan()[0]["artifact"] == "stories"
+        assert reopened.route("1") == "Product Manager"
+        assert [i["response"] for i in reopened.iterations("1")] == ["draft", "final"]
+        assert reopened.step_result("1")["result"] == "final"
+        assert (reopened.route("2"), reopened.iterations("2"), reopened.step_result("2")) == (None, [], None)
+        with pytest.raises(FileNotFoundError):
+            RunStore.open("missing", root=str(tmp_path))
+
+    def test_executor_skips_stored_steps(self, tmp_path):
+        """Test that run_plan saves each step's result and runs only the steps without one when resumed."""
+        store = RunStore.create(str(tmp_path))
+        plan = [
+            {"id": "1", "text": "first", "depends_on": [], "artifact": "first"},
+            {"id": "2", "text": "second", "depends_on": ["1"], "artifact": "second"},
+        ]
+        calls = []
+
+        def handler(step, inputs):
+            calls.append(step["id"])
+            return f"{step['text']} after {sorted(inputs.values())}"
+
+        WorkflowExecutor(handler, run_store=store).run_plan(plan)
+        os.remove(os.path.join(store.path, "steps", "2", "result.json"))
+        report = WorkflowExecutor(handler, run_store=store).run_plan(plan)
+
+        assert calls == ["1", "2", "2"]
+        assert report["resumed"] == ["1"]
+        assert report["results"]["2"] == "second after ['first after []']"
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_evaluation_resumes_after_recorded_iterations(self, mock_openai, mock_openai_api_key):
+        """Test that an evaluation continues from its recorded iterations instead of starting over."""
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        worker = MagicMock()
+        agent = EvaluationAgent(mock_openai_api_key, "Evaluator", "Be specific", worker, max_interactions=5)
+        history = []
+
+        # The first run stops during its second iteration, e.g. because the process was killed
+        mock_client.chat.completions.create.side_effect = [completion("No, too vague."), completion("Be specific.")]
+        worker.respond.side_effect = ["vague answer", KeyboardInterrupt()]
+        with pytest.raises(KeyboardInterrupt):
+            agent.evaluate("Answer", on_iteration=history.append)
+
+        worker.respond.side_effect = ["specific answer"]
+        mock_client.chat.completions.create.side_effect = [completion("Yes, specific.")]
+        result = agent.evaluate("Answer", history=history, on_iteration=history.append)
+
+        assert result == {"final_response": "specific answer", "evaluation": "Yes, specific.", "iterations": 2}
+        assert "Be specific." in worker.respond.call_args[0][0]
+        assert [i["accepted"] for i in history] == [False, True]
+        # A finished evaluation is not run again
+        assert agent.evaluate("Answer", history=history)["iterations"] == 2
+        assert worker.respond.call_count == 3
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_route_to_named_agent(self, mock_openai, mock_openai_api_key):
+        """Test that select picks a route without calling it and agent_name skips choosing one."""
+        vectors = {"Write stories": [1.0, 0.0], "Stories": [1.0, 0.1], "Tasks": [0.0, 1.0]}
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = lambda **kwargs: MagicMock(data=[MagicMock(embedding=vectors[kwargs['input']])])
+        mock_openai.return_value = mock_client
+        router = RoutingAgent(mock_openai_api_key, [
+            {"name": "stories", "description": "Stories", "func": lambda prompt: f"stories: {prompt}"},
+            {"name": "tasks", "description": "Tasks", "func": lambda prompt: f"tasks: {prompt}"},
+        ])
+
+        assert router.select("Write stories") == "stories"
+        embedded = mock_client.embeddings.create.call_count
+        assert router.route("Write stories", context="ctx", agent_name="tasks") == "tasks: Write stories\n\nctx"
+        assert mock_client.embeddings.create.call_count == embedded
+        with pytest.raises(ValueError):
+            router.route("Write stories", agent_name="missing")
+
+    @pytest.mark.slow
+    def test_phase_2_workflow_resumes_unfinished_steps(self, fake_openai_server, tmp_path):
+        """Test that agentic_workflow.py --resume redoes only the work of the step that did not finish."""
+        pytest.importorskip("dotenv")
+        from end_to_end import API_KEY, ROOT, workflow_responder
+
+        fake_openai_server.responder = workflow_responder(3, 32)
+        env = dict(os.environ, OPENAI_API_KEY=API_KEY, OPENAI_BASE_URL=fake_openai_server.base_url,
+                   LOG_LEVEL="WARNING", STREAM_OUTPUT="0", EMBEDDING_CACHE_PATH="", WORKFLOW_RUNS_DIR=str(tmp_path))
+        env.pop("COMPLETION_CACHE_PATH", None)
+
+        def run_workflow(*args):
+            before = dict(fake_openai_server.stats)
+            completed = subprocess.run([sys.executable, "agentic_workflow.py", *args], cwd=os.path.join(ROOT, "src", "phase_2"),
+                                       env=env, capture_output=True, text=True, timeout=120)
+            assert completed.returncode == 0, completed.stderr[-2000:]
+            return completed.stdout, {name: fake_openai_server.stats[name] - before[name] for name in before}
+
+        output, first = run_workflow()
+        (run_id,) = os.listdir(tmp_path)
+        store = RunStore.open(run_id, root=str(tmp_path))
+        last_step = store.load_plan()[-1]["id"]
+        # Pretend the run was killed while the last step was being evaluated
+        for name in ("result.json", "iterations.jsonl"):
+            os.remove(os.path.join(store.path, "steps", last_step, name))
+        os.remove(os.path.join(store.path, "outputs.json"))
+
+        output, resumed = run_workflow("--resume", run_id)
+
+        assert "Reused the results of 2 steps" in output
+        assert 0 < resumed["chat_completions"] < first["chat_completions"]
+        # Routing is not repeated; only the redone step's own retrieval embeds anything
+        assert resumed["embeddings"] < first["embeddings"]
+        assert store.metadata["status"] == "completed"
+        assert len(store.load_outputs()["steps"]) == 3
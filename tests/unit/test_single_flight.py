@@ -0,0 +1,121 @@
+"""
+Unit tests for coalescing identical in-flight API calls.
+No external API calls are made.
+"""
+
+import pytest
+import asyncio
+import sys
+import os
+import threading
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+
+from workflow_agents.base_agents import DirectPromptAgent, _aembedding, _flight_key
+from workflow_agents.single_flight import SingleFlight
+from tests.fake_openai import fixed
+
+
+class TestSingleFlight:
+    """Test cases for SingleFlight and its use by the agents."""
+
+    def test_concurrent_threads_share_one_call(self):
+        """Test that threads asking for the same key while it is in flight share the leader's result."""
+        flight = SingleFlight()
+        calls = []
+        results = []
+        started = threading.Event()
+
+        def slow():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return "answer"
+
+        def worker():
+            results.append(flight.do("key", slow))
+
+        leader = threading.Thread(target=worker)
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in followers:
+            thread.start()
+        for thread in [leader] + followers:
+            thread.join()
+
+        assert len(calls) == 1
+        assert sorted(results) == [("answer", False)] + [("answer", True)] * 4
+        assert (flight.calls, flight.shared) == (1, 4)
+        # Nothing is kept once the call has finished
+        assert flight.do("key", lambda: "again") == ("again", False)
+
+    def test_async_callers_share_results_and_errors(self):
+        """Test that concurrent coroutines share a call per key, including its exception."""
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch(value):
+            calls.append(value)
+            await asyncio.sleep(0.02)
+            if value == "bad":
+                raise ValueError("bad request")
+            return value
+
+        async def run():
+            return await asyncio.gather(
+                *(flight.ado(key, lambda key=key: fetch(key)) for key in ["a", "a", "b", "a", "bad", "bad"]),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+
+        assert sorted(calls) == ["a", "b", "bad"]
+        assert results[:4] == [("a", False), ("a", True), ("b", False), ("a", True)]
+        assert all(isinstance(result, ValueError) for result in results[4:])
+
+    def test_follower_takes_over_from_cancelled_leader(self):
+        """Test that a follower makes the call itself when the leader is cancelled, and that key None never coalesces."""
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def run():
+            leader = asyncio.create_task(flight.ado("key", fetch))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flight.ado("key", fetch))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await follower
+
+        assert asyncio.run(run()) == ("done", False)
+        assert flight.shared == 1
+        assert flight.do(None, lambda: 1) == (1, False)
+
+    def test_only_deterministic_completions_are_coalesced(self):
+        """Test that sampled requests, which are meant to differ, get no single-flight key."""
+        messages = [{"role": "user", "content": "Hi"}]
+
+        assert _flight_key({"model": "gpt-3.5-turbo", "messages": messages, "temperature": 0}) is not None
+        assert _flight_key({"model": "gpt-3.5-turbo", "messages": messages, "temperature": 0.7}) is None
+
+    def test_concurrent_duplicate_agent_requests_reach_the_api_once(self, fake_openai_server, mock_openai_api_key):
+        """Test that duplicate concurrent completions and embeddings are sent once each."""
+        fake_openai_server.latency = fixed(0.05)
+        agent = DirectPromptAgent(mock_openai_api_key)
+
+        async def run():
+            answers = await asyncio.gather(*(agent.arespond("Same question") for _ in range(5)))
+            vectors = await asyncio.gather(*(_aembedding(mock_openai_api_key, "Same text") for _ in range(5)))
+            return answers, vectors
+
+        answers, vectors = asyncio.run(run())
+
+        assert len(set(answers)) == 1
+        assert all(vector == vectors[0] for vector in vectors)
+        assert fake_openai_server.stats["chat_completions"] == 1
+        assert fake_openai_server.stats["embeddings"] == 1
@@ -0,0 +1,177 @@
+"""
+Unit tests for tracing.
+All OpenAI API calls are mocked.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import json
+import sys
+import os
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+
+from workflow_agents.base_agents import DirectPromptAgent, EvaluationAgent, KnowledgeAugmentedPromptAgent, RoutingAgent
+from workflow_agents.completion_cache import configure_completion_cache
+from workflow_agents.executor import WorkflowExecutor
+from workflow_agents.tracing import (
+    InMemoryExporter, JsonlExporter, SummaryExporter, configure_tracing, format_summary, span, summarize
+)
+
+
+def completion(text, prompt_tokens=12, completion_tokens=3):
+    """Build a mocked chat completion with usage."""
+    return MagicMock(
+        choices=[MagicMock(message=MagicMock(content=text))],
+        usage=MagicMock(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+    )
+
+
+class TestTracing:
+    """Test cases for spans and exporters."""
+
+    def test_spans_nest_and_inherit_step_and_agent(self):
+        """Test that child spans record their parent and inherit its step and agent."""
+        exporter = InMemoryExporter()
+        configure_tracing(exporter)
+
+        with span("workflow.step", kind="step", step="1") as step:
+            with span("Agent.respond", kind="agent", agent="Agent") as agent:
+                with span("chat.completion", kind="llm") as call:
+                    call.set(prompt_tokens=5)
+
+        assert [s.name for s in exporter.spans] == ["chat.completion", "Agent.respond", "workflow.step"]
+        assert call.parent_id == agent.span_id and agent.parent_id == step.span_id
+        assert (call.step, call.agent) == ("1", "Agent")
+        assert call.trace_id == step.span_id
+        assert call.duration >= 0
+
+    def test_span_records_errors_and_is_noop_when_off(self):
+        """Test that a failing block marks its span, and that nothing is recorded while tracing is off."""
+        with span("ignored") as noop:
+            noop.set(anything=1)
+        assert not noop.recording
+
+        exporter = InMemoryExporter()
+        configure_tracing(exporter)
+        with pytest.raises(ValueError):
+            with span("failing"):
+                raise ValueError("bad input")
+
+        assert exporter.spans[0].error == "ValueError: bad input"
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_agent_calls_record_tokens_and_cache_hits(self, mock_openai, mock_openai_api_key):
+        """Test that LLM spans carry the model, API usage and cache status, attributed to the calling agent."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value = completion("Paris")
+        mock_openai.return_value = mock_client
+        exporter = InMemoryExporter()
+        configure_tracing(exporter)
+        configure_completion_cache()
+
+        agent = DirectPromptAgent(mock_openai_api_key)
+        agent.respond("Capital of France?")
+        agent.respond("Capital of France?")
+
+        calls = [s for s in exporter.spans if s.kind == "llm"]
+        assert [c.attributes["cache_hit"] for c in calls] == [False, True]
+        assert calls[0].attributes["model"] == "gpt-3.5-turbo"
+        assert (calls[0].attributes["prompt_tokens"], calls[0].attributes["completion_tokens"]) == (12, 3)
+        assert {c.agent for c in calls} == {"DirectPromptAgent"}
+
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_route_decision_is_recorded(self, mock_openai, mock_openai_api_key):
+        """Test that the routing span records the selected route and its score."""
+        vectors = {"Capital of France?": [1.0, 0.0], "Geography": [1.0, 0.1], "Cooking": [0.0, 1.0]}
+
+        def mock_embeddings(*args, **kwargs):
+            return MagicMock(data=[MagicMock(embedding=vectors[kwargs['input']])])
+
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = mock_embeddings
+        mock_openai.return_value = mock_client
+        exporter = InMemoryExporter()
+        configure_tracing(exporter)
+
+        router = RoutingAgent(mock_openai_api_key, [
+            {"name": "geography", "description": "Geography", "func": lambda prompt: "geo"},
+            {"name": "cooking", "description": "Cooking", "func": lambda prompt: "food"},
+        ])
+        router.route("Capital of France?")
+
+        route_span = next(s for s in exporter.spans if s.name == "RoutingAgent.route")
+        assert route_span.attributes["route"] == "geography"
+        assert route_span.attributes["route_score"] == pytest.approx(0.995, abs=1e-3)
+        assert sum(s.kind == "embedding" for s in exporter.spans) == 3
+
+    @patch('workflow_agents.base_agents.AsyncOpenAI')
+    @patch('workflow_agents.base_agents.OpenAI')
+    def test_streamed_worker_calls_belong_to_the_worker(self, mock_openai, mock_async_openai, mock_openai_api_key):
+        """Test that a worker's streamed completion is a child of its respond span, not of the evaluation consuming it."""
+        def chunks(text):
+            return [MagicMock(choices=[MagicMock(delta=MagicMock(content=part))]) for part in (text[:2], text[2:])]
+
+        async def astream(text):
+            for chunk in chunks(text):
+                yield chunk
+
+        def mock_create(*args, **kwargs):
+            return iter(chunks("Paris")) if kwargs.get('stream') else completion("Yes, correct.")
+
+        async def mock_acreate(*args, **kwargs):
+            return astream("Paris") if kwargs.get('stream') else completion("Yes, correct.")
+
+        mock_openai.return_value = MagicMock()
+        mock_openai.return_value.chat.completions.create.side_effect = mock_create
+        mock_async_openai.return_value = MagicMock()
+        mock_async_openai.return_value.chat.completions.create = AsyncMock(side_effect=mock_acreate)
+        exporter = InMemoryExporter()
+        configure_tracing(exporter)
+        worker = KnowledgeAugmentedPromptAgent(mock_openai_api_key, "a geographer", "France's capital is Paris.")
+        agent = EvaluationAgent(mock_openai_api_key, "an evaluator", "The capital of France", worker, token_sink=lambda token: None)
+
+        agent.evaluate("Capital of France?")
+        asyncio.run(agent.aevaluate("Capital of France?"))
+
+        by_id = {s.span_id: s for s in exporter.spans}
+        streamed = [s for s in exporter.spans if s.attributes.get("stream")]
+        assert len(streamed) == 2
+        assert {s.agent for s in streamed} == {"KnowledgeAugmentedPromptAgent"}
+        assert {by_id[s.parent_id].name for s in streamed} == {
+            "KnowledgeAugmentedPromptAgent.respond", "KnowledgeAugmentedPromptAgent.arespond"
+        }
+
+    @patch('workflow_agents.base_agents.AsyncOpenAI')
+    def test_summary_breaks_down_plan_by_step(self, mock_async_openai, mock_openai_api_key, tmp_path):
+        """Test that API calls made by plan steps are summarized per step and written as JSONL."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=[completion("a", 100, 10), completion("b", 40, 4)])
+        mock_async_openai.return_value = mock_client
+        summary = SummaryExporter(write=MagicMock())
+        path = str(tmp_path / "traces" / "run.jsonl")
+        configure_tracing(summary, JsonlExporter(path))
+        agent = DirectPromptAgent(mock_openai_api_key)
+
+        async def handler(step, inputs):
+            return await agent.arespond(step["text"])
+
+        plan = [
+            {"id": "1", "text": "first", "depends_on": [], "artifact": "first"},
+            {"id": "2", "text": "second", "depends_on": ["1"], "artifact": "second"},
+        ]
+        WorkflowExecutor(handler).run_plan(plan)
+        configure_tracing()
+
+        rows = {row["step"]: row for row in summarize(summary.spans, by="step")}
+        assert (rows["1"]["prompt_tokens"], rows["2"]["prompt_tokens"]) == (100, 40)
+        assert summarize(summary.spans, by="agent")[0]["calls"] == 2
+        assert "DirectPromptAgent" in format_summary(summarize(summary.spans, by="agent"), by="agent")
+
+        with open(path) as trace_file:
+            records = [json.loads(line) for line in trace_file]
+        assert {record["name"] for record in records} == {"chat.completion", "DirectPromptAgent.arespond", "workflow.step"}
+        summary.report()
+        summary.write.assert_called_once()
@@ -0,0 +1,67 @@
+"""
+Unit tests for the EvaluationAgent validators.
+No OpenAI API calls are made.
+"""
+
+import pytest
+import re
+import sys
+import os
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+
+from workflow_agents.validators import (
+    USER_STORY_PATTERN, PatternValidator, RequiredFieldsValidator, fix_instructions, run_validators
+)
+
+
+class TestValidators:
+    """Test cases for the response validators."""
+
+    def test_pattern_validator_counts_matches(self):
+        """Test that PatternValidator requires the minimum number of matches."""
+        stories = PatternValidator(r"\bAs an? .+?, I want .+? so that\b", "user stories", min_matches=2)
+
+        assert stories("As a user, I want email routing so that I save time.\n"
+                       "As an admin, I want reports so that I can audit.") == []
+        assert stories("As a user, I want email routing so that I save time.") == [
+            "Expected at least 2 user stories, found 1."
+        ]
+
+    def test_user_story_pattern_accepts_markdown_and_wrapped_stories(self):
+        """Test that user stories in Markdown emphasis or wrapped across lines are counted."""
+        stories = PatternValidator(USER_STORY_PATTERN, "user stories")
+
+        assert stories("**As a** user, **I want** email routing **so that** I save time.") == []
+        assert stories("**As an admin**, I want reports so that I can audit.") == []
+        assert stories("- As a support agent,\n  I want tickets routed automatically\n  so that I answer faster.") == []
+        assert stories("_As a_ user, I want\nsearch so\nthat I find things.") == []
+        assert stories("As a user, I want email routing.\nIt will save time.") == [
+            "Expected at least 1 user stories, found 0."
+        ]
+        assert len(re.findall(USER_STORY_PATTERN, "As a user, I want A so that B.\n**As an** admin, I want C so that D.",
+                              re.IGNORECASE)) == 2
+
+    def test_required_fields_missing_and_incomplete_items(self):
+        """Test that RequiredFieldsValidator reports missing fields and items lacking some fields."""
+        tasks = RequiredFieldsValidator(["Task ID:", "Acceptance Criteria:"])
+
+        assert tasks("**Task ID**: T1\nAcceptance Criteria: works") == []
+        assert tasks("Task ID: T1") == ["Missing required field: Acceptance Criteria:."]
+        problems = tasks("Task ID: T1\nAcceptance Criteria: works\nTask ID: T2")
+        assert problems == ["Every item must have all fields; some items lack: Acceptance Criteria: (1 of 2)."]
+        assert RequiredFieldsValidator(["Task ID:", "Acceptance Criteria:"], consistent_counts=False)(
+            "Task ID: T1\nAcceptance Criteria: works\nTask ID: T2"
+        ) == []
+
+    def test_run_validators_collects_problems(self):
+        """Test that problems from every validator are collected and turned into instructions."""
+        problems = run_validators(
+            [RequiredFieldsValidator(["Feature Name:"]), PatternValidator(r"benefit", "benefits")],
+            "Nothing structured here",
+        )
+
+        assert len(problems) == 2
+        instructions = fix_instructions(problems)
+        assert all(problem in instructions for problem in problems)
@@ -0,0 +1,51 @@
+"""
+Unit tests for the vector search index backends.
+"""
+
+import pytest
+import sys
+import os
+import numpy as np
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+
+from workflow_agents.vector_index import FlatIndex, IVFIndex, create_index, recall_at_k, top_k
+from workflow_agents.vector_store import VectorStore
+
+
+def clustered_store(rows=2000, dim=16, clusters=20, seed=0):
+    """Build a store of unit vectors around random cluster centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim))
+    vectors = centres[rng.integers(0, clusters, size=rows)] + 0.3 * rng.standard_normal((rows, dim))
+    return VectorStore.from_embeddings(vectors, [{"text": str(i)} for i in range(rows)]), centres
+
+
+class TestVectorIndex:
+    """Test cases for the index backends."""
+
+    def test_top_k_orders_and_filters(self):
+        """Test that top_k returns the best scores first and applies the threshold."""
+        scores = np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32)
+        assert [row for row, _ in top_k(scores, 3)] == [1, 3, 2]
+        assert [row for row, _ in top_k(scores, 3, min_similarity=0.6)] == [1, 3]
+        assert [row for row, _ in top_k(scores, 2, rows=np.array([10, 11, 12, 13]))] == [11, 13]
+
+    def test_ivf_recall_grows_with_n_probe(self):
+        """Test that IVF matches exact search when probing every list, and stays close with few probes."""
+        store, centres = clustered_store()
+        exact = FlatIndex().build(store)
+        ivf = IVFIndex(n_lists=20, n_probe=2).build(store)
+
+        assert sum(len(rows) for rows in ivf.lists) == len(store)
+        assert recall_at_k(ivf, exact, centres, k=10) >= 0.9
+        ivf.n_probe = 20
+        assert recall_at_k(ivf, exact, centres, k=10) == 1.0
+
+    def test_create_index_by_name(self):
+        """Test backend lookup by name, with parameters passed through."""
+        assert isinstance(create_index("flat"), FlatIndex)
+        assert create_index("ivf", n_probe=3).n_probe == 3
+        with pytest.raises(ValueError):
+            create_index("hnsw")
@@ -0,0 +1,110 @@
+"""
+Unit tests for the binary vector store.
+"""
+
+import pytest
+import sys
+import os
+import numpy as np
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'phase_1'))
+
+from workflow_agents.vector_store import VectorStore, reindex, store_paths
+
+
+class TestVectorStore:
+    """Test cases for VectorStore."""
+
+    def test_round_trip_is_memory_mapped(self, tmp_path):
+        """Test that a saved store loads back as a read-only memory map with its records."""
+        path = str(tmp_path / "index")
+        records = [{"text": "first", "chunk_size": 5}, {"text": "second", "chunk_size": 6}]
+        VectorStore.from_embeddings([[1.0, 0.0], [0.0, 1.0]], records).save(path)
+
+        store = VectorStore.load(path)
+
+        assert isinstance(store.vectors, np.memmap)
+        assert store.vectors.dtype == np.float32
+        assert not store.vectors.flags.writeable
+        np.testing.assert_array_equal(store.vectors, [[1.0, 0.0], [0.0, 1.0]])
+        assert store.texts == ["first", "second"]
+        assert store.records[1]["chunk_size"] == 6
+
+    def test_float16_halves_the_vector_file(self, tmp_path):
+        """Test that float16 storage is kept on load and uses half the bytes."""
+        embeddings = np.random.rand(8, 64)
+        records = [{"text": str(i)} for i in range(8)]
+        VectorStore.from_embeddings(embeddings, records).save(str(tmp_path / "full"))
+        VectorStore.from_embeddings(embeddings, records, dtype="float16").save(str(tmp_path / "half"))
+
+        store = VectorStore.load(str(tmp_path / "half"))
+
+        assert store.vectors.dtype == np.float16
+        assert store.vectors.nbytes * 2 == VectorStore.load(str(tmp_path / "full")).vectors.nbytes
+        assert os.path.getsize(store_paths(str(tmp_path / "half"))[0]) < os.path.getsize(store_paths(str(tmp_path / "full"))[0])
+
+    def test_rejects_mismatched_lengths_and_dtypes(self):
+        """Test that invalid stores are refused."""
+        with pytest.raises(ValueError):
+            VectorStore(np.zeros((2, 3), dtype=np.float32), [{"text": "only one"}])
+        with pytest.raises(ValueError):
+            VectorStore.from_embeddings([[1.0]], [{"text": "a"}], dtype="int8")
+
+    def test_search_returns_top_k_by_cosine_similarity(self):
+        """Test that search ranks rows by cosine similarity and honours k and the threshold."""
+        embeddings = [[1.0, 0.0], [0.0, 3.0], [2.0, 2.0], [-1.0, 0.0]]
+        store = VectorStore.from_embeddings(embeddings, [{"text": str(i)} for i in range(4)])
+
+        rows = [row for row, _ in store.search([1.0, 0.1], k=3)]
+        assert rows == [0, 2, 1]
+        assert [row for row, _ in store.search([1.0, 0.1], k=3, min_similarity=0.5)] == [0, 2]
+        assert store.search([0.0, 0.0], k=2, min_similarity=0.1) == []
+
+    def test_unnormalized_store_scores_match_normalized(self):
+        """Test that stores built without normalization give the same cosine scores."""
+        embeddings = np.random.rand(20, 8)
+        records = [{"text": str(i)} for i in range(20)]
+        query = np.random.rand(8)
+
+        normalized = VectorStore.from_embeddings(embeddings, records)
+        raw = VectorStore.from_embeddings(embeddings, records, normalize=False)
+
+        np.testing.assert_allclose(raw.similarities(query), normalized.similarities(query), rtol=1e-5)
+
+    def test_reindex_embeds_only_new_chunks(self):
+        """Test that reindex keeps known rows, tombstones removed ones and skips them in search."""
+        def record(text):
+            return {"text": text, "chunk_hash": text}
+
+        embedded = []
+
+        def embed(texts):
+            embedded.extend(texts)
+            return [[float(len(text)), 1.0] for text in texts]
+
+        store, count = reindex(None, [record("a"), record("bb"), record("bb")], embed)
+        assert count == 2 and len(store) == 2
+
+        store, count = reindex(store, [record("a"), record("cccc")], embed)
+
+        assert count == 1
+        assert embedded == ["a", "bb", "cccc"]
+        assert store.tombstones == 1
+        assert all(store.records[row]["text"] != "bb" for row, _ in store.search([2.0, 1.0], k=3))
+
+        store, count = reindex(store, [record("a"), record("bb"), record("cccc")], embed)
+        assert count == 0 and store.tombstones == 0
+
+    def test_compact_drops_tombstones(self, tmp_path):
+        """Test that compaction removes deleted rows and survives a save over the loaded store."""
+        path = str(tmp_path / "index")
+        records = [{"text": "keep"}, {"text": "drop", "deleted": True}]
+        VectorStore.from_embeddings([[1.0, 0.0], [0.0, 1.0]], records).save(path)
+
+        loaded = VectorStore.load(path)
+        loaded.compact().save(path)
+
+        reloaded = VectorStore.load(path)
+        assert reloaded.texts == ["keep"]
+        assert reloaded.tombstones == 0